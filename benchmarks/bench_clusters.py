@@ -0,0 +1,75 @@
+"""Benchmark: reupload clustering cost as the index grows.
+
+Fills a ClusterIndex with distinct synthetic hits (plus a few reuploads of
+each), then times ``assign`` for new reuploads at each size. With LSH the
+per-video cost stays flat; a pairwise comparison would grow linearly.
+Also reports how many reuploads landed in their original's cluster.
+
+Usage: python benchmarks/bench_clusters.py [--sizes 1000 10000 50000]
+"""
+import argparse
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import scan_kpop_doxhunter as scan  # noqa: E402
+from scan_clusters import ClusterIndex, minhash  # noqa: E402
+from workload import make_items  # noqa: E402
+
+PROBES = 500
+
+
+def text_of(item):
+    snippet = item["snippet"]
+    return f"{scan.normalize_text(snippet['title'])} {scan.normalize_text(snippet['description'])}".strip()
+
+
+def reupload(text, rng):
+    # Petites retouches typiques d'un reupload: mot ajoute, mot retire
+    words = text.split()
+    words.insert(rng.randrange(len(words) + 1), rng.choice(["reupload", "full", "hd", "2", "leak"]))
+    del words[rng.randrange(len(words))]
+    return " ".join(words)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 50_000])
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    items = make_items(max(args.sizes), description_words=30, dox_density=0.2)
+    texts = [text_of(item) for item in items]
+    print(f"{'index size':>10s} {'assign us':>10s} {'minhash us':>11s} {'reuploads matched':>18s}")
+    with tempfile.TemporaryDirectory() as tmp:
+        index = ClusterIndex(Path(tmp, "clusters.sqlite"))
+        filled = 0
+        for size in sorted(args.sizes):
+            for i in range(filled, size):
+                index.assign(items[i]["id"]["videoId"], minhash(texts[i]))
+            filled = size
+
+            probes = [(rng.randrange(size), n) for n in range(PROBES)]
+            copies = [(i, reupload(texts[i], rng)) for i, _ in probes]
+            start = time.perf_counter()
+            signatures = [minhash(text) for _, text in copies]
+            hashed = time.perf_counter() - start
+            matched = 0
+            start = time.perf_counter()
+            for n, ((i, _), signature) in enumerate(zip(copies, signatures)):
+                cluster = index.assign(f"copy_{size}_{n}", signature)
+                matched += cluster == index.cluster_of(items[i]["id"]["videoId"])
+            assigned = time.perf_counter() - start
+            print(
+                f"{size:>10d} {assigned / PROBES * 1e6:>10.0f} {hashed / PROBES * 1e6:>11.0f} "
+                f"{matched / PROBES:>17.1%}"
+            )
+        index.close()
+
+
+if __name__ == "__main__":
+    main()
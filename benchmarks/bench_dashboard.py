@@ -0,0 +1,80 @@
+"""Benchmark: dashboard requests per second on a large Parquet report.
+
+Compares a cold load (report cache cleared before every request), warm
+paginated requests served from the in-memory report, and conditional
+requests answered with 304 Not Modified.
+
+Usage: python benchmarks/bench_dashboard.py [--rows 200000] [--requests 50]
+"""
+import argparse
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import dashboard  # noqa: E402
+from scan_report import REPORT_COLUMNS, ReportWriter, csv_to_parquet  # noqa: E402
+
+
+def write_report(directory, rows):
+    rng = random.Random(rows)
+    spool = str(Path(directory, "dox_report_20260101_0000.csv"))
+    writer = ReportWriter(spool, columns=REPORT_COLUMNS + ["pat_coords_gps"])
+    for i in range(rows):
+        score = round(0.25 + rng.random() * 0.75, 3)
+        writer.append({
+            "query": "felix bench",
+            "title": f"Felix maison Seoul {i}",
+            "display_title": f"Felix maison Seoul {i}",
+            "video_id": f"vid{i:08d}",
+            "ml_score": 0.5,
+            "rule_score": 0.4,
+            "dox_score": score,
+            "severity": rng.choice(["LOW", "MEDIUM", "HIGH", "CRITICAL"]),
+            "timestamp": "2026-01-01 00:00:00",
+            "pat_coords_gps": 0,
+        })
+    writer.close()
+    csv_to_parquet(spool, spool[:-4] + ".parquet")
+    Path(spool).unlink()
+
+
+def rate(client, urls, headers=None, cold=False):
+    start = time.perf_counter()
+    for url in urls:
+        if cold:
+            dashboard.report_cache.clear()
+        response = client.get(url, headers=headers or {})
+        assert response.status_code in (200, 304), response.status_code
+    return len(urls) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--requests", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp, patch.object(dashboard, "REPORTS_DIR", Path(tmp)):
+        write_report(tmp, args.rows)
+        client = dashboard.app.test_client()
+        pages = [f"/?page={i % 20 + 1}" for i in range(args.requests)]
+        etag = client.get("/?page=1").headers["ETag"]
+
+        print(f"report: {args.rows} rows, {args.requests} requests per case")
+        print(f"{'case':>22s} {'req/s':>9s}")
+        cold = rate(client, pages[: max(1, args.requests // 5)], cold=True)
+        print(f"{'cold (no cache)':>22s} {cold:9.1f}")
+        print(f"{'warm pages':>22s} {rate(client, pages):9.1f}")
+        sorted_pages = [f"/?sort=ml_score&severity=HIGH&page={i % 5 + 1}" for i in range(args.requests)]
+        print(f"{'warm sort+filter':>22s} {rate(client, sorted_pages):9.1f}")
+        not_modified = rate(client, ["/?page=1"] * args.requests, headers={"If-None-Match": etag})
+        print(f"{'304 If-None-Match':>22s} {not_modified:9.1f}")
+
+
+if __name__ == "__main__":
+    main()
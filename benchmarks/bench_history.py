@@ -0,0 +1,102 @@
+"""Benchmark: history queries over years of reports, store vs reading every file.
+
+Writes ``--days`` daily Parquet reports of ``--rows`` hits each (a pool of
+recurring videos, several targets), ingests them into a ``HistoryStore``,
+then times:
+
+* "first seen" of a video: indexed lookup vs ``read_parquet`` of every report;
+* a 30-day and a 365-day trend of one target;
+* a second ``ingest`` with nothing new (stat of every file).
+
+Usage: python benchmarks/bench_history.py [--days 730] [--rows 500]
+"""
+import argparse
+import random
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import pandas as pd  # noqa: E402
+
+from scan_history import HistoryStore  # noqa: E402
+from scan_report import list_reports  # noqa: E402
+
+TARGETS = ("felix", "hyunjin", "bangchan", "han")
+SEVERITIES = ("MEDIUM", "HIGH", "CRITICAL")
+
+
+def write_reports(directory, days, rows, rng):
+    start = date.today() - timedelta(days=days - 1)
+    pool = [f"vid{i:07d}" for i in range(rows * days // 5)]
+    for day in range(days):
+        when = datetime.combine(start + timedelta(days=day), datetime.min.time()) + timedelta(hours=9)
+        frame = pd.DataFrame({
+            "target": [rng.choice(TARGETS) for _ in range(rows)],
+            "title": [f"title {i}" for i in range(rows)],
+            "display_title": [f"Title {i}" for i in range(rows)],
+            "video_id": rng.sample(pool, rows),
+            "dox_score": [round(rng.uniform(0.25, 0.95), 3) for _ in range(rows)],
+            "severity": [rng.choice(SEVERITIES) for _ in range(rows)],
+            "timestamp": pd.Timestamp(when),
+        })
+        frame.to_parquet(Path(directory, f"dox_report_{when:%Y%m%d_%H%M}.parquet"), index=False)
+    return pool
+
+
+def timed(func, repeat=5):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--days", type=int, default=730)
+    parser.add_argument("--rows", type=int, default=500)
+    args = parser.parse_args()
+    rng = random.Random(0)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        reports = Path(tmp, "reports")
+        reports.mkdir()
+        pool = write_reports(reports, args.days, args.rows, rng)
+        store = HistoryStore(Path(tmp, "history.sqlite"))
+        start = time.perf_counter()
+        rows = store.ingest(reports)
+        ingest = time.perf_counter() - start
+        size = Path(tmp, "history.sqlite").stat().st_size
+        print(f"{args.days} reports, {rows} rows: ingest {ingest:.1f} s, store {size / 1e6:.1f} MB")
+
+        video = rng.choice(pool)
+
+        def scan_files():
+            seen = [
+                df["timestamp"].min()
+                for df in (pd.read_parquet(path, columns=["video_id", "timestamp"]) for path in list_reports(reports))
+                for df in [df[df["video_id"] == video]]
+                if not df.empty
+            ]
+            return min(seen) if seen else None
+
+        lookup, history = timed(lambda: store.video_history(video), repeat=50)
+        files, first = timed(scan_files, repeat=1)
+        assert history and history[0]["first_seen"] == str(first), (history[:1], first)
+        month, _ = timed(lambda: store.trend("felix", 30), repeat=50)
+        year, points = timed(lambda: store.trend("felix", 365), repeat=20)
+        noop, _ = timed(lambda: store.ingest(reports), repeat=3)
+        store.close()
+
+    print(f"first seen: {lookup * 1e3:.2f} ms (store) vs {files * 1e3:.0f} ms (read every report)")
+    print(f"trend 30 d: {month * 1e3:.2f} ms, trend 365 d: {year * 1e3:.2f} ms ({len(points)} points)")
+    print(f"ingest with nothing new: {noop * 1e3:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
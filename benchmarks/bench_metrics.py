@@ -0,0 +1,87 @@
+"""Benchmark: cost of the run instrumentation, disabled and enabled.
+
+Measures the per-call cost of ``inc``/``timer`` on ``NullMetrics`` and
+``Metrics``, then scores the same synthetic pages through
+``iter_scored_videos`` both ways. The disabled overhead is estimated as
+(instrumentation calls in a run) x (no-op call cost) / (run time).
+
+Usage: python benchmarks/bench_metrics.py [--pages 200] [--per-page 50]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import scan_kpop_doxhunter as scan  # noqa: E402
+from scan_metrics import NULL_METRICS, Metrics  # noqa: E402
+from workload import make_items  # noqa: E402
+
+
+def per_call_ns(func, calls=200_000):
+    start = time.perf_counter()
+    for _ in range(calls):
+        func()
+    return (time.perf_counter() - start) / calls * 1e9
+
+
+def timed_block(metrics):
+    def run():
+        with metrics.timer("stage_seconds", stage="rules"):
+            pass
+    return run
+
+
+def run_pipeline(pages, metrics, repeat):
+    model = scan.get_model()
+    version = scan.scoring_version()
+    best = float("inf")
+    for _ in range(repeat):
+        scan._normalize_cached.cache_clear()
+        fetches = [scan.QueryFetch("bench", pages=pages)]
+        stats = scan.ScanStats()
+        start = time.perf_counter()
+        for _row in scan.iter_scored_videos(iter(fetches), stats, set(), model, version, None, metrics):
+            pass
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--per-page", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    enabled = Metrics()
+    costs = {
+        "null inc": per_call_ns(lambda: NULL_METRICS.inc("hits_total", severity="HIGH")),
+        "null timer": per_call_ns(timed_block(NULL_METRICS)),
+        "enabled inc": per_call_ns(lambda: enabled.inc("hits_total", severity="HIGH")),
+        "enabled timer": per_call_ns(timed_block(enabled)),
+    }
+    print(f"{'call':>14s} {'ns':>8s}")
+    for name, ns in costs.items():
+        print(f"{name:>14s} {ns:8.0f}")
+
+    items = make_items(args.pages * args.per_page)
+    pages = [{"items": items[i:i + args.per_page]} for i in range(0, len(items), args.per_page)]
+    scan.get_model()
+    disabled = run_pipeline(pages, NULL_METRICS, args.repeat)
+    counting = Metrics()
+    instrumented = run_pipeline(pages, counting, args.repeat)
+    summary = counting.summary()
+    calls = (
+        sum(c["value"] for c in summary["counters"]) + sum(h["count"] for h in summary["histograms"])
+    ) / args.repeat
+    estimated = calls * max(costs["null inc"], costs["null timer"]) / 1e9
+
+    print(f"\n{len(items)} videos in {len(pages)} pages, {calls:.0f} instrumentation calls per run")
+    print(f"{'disabled':>14s} {disabled:8.3f} s  (est. no-op overhead {estimated / disabled:.3%})")
+    print(f"{'enabled':>14s} {instrumented:8.3f} s  ({instrumented / disabled - 1:+.2%} vs disabled)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Benchmark: normalize_text vs. the previous implementation.
+
+Three workloads: unique ASCII text (fast path, cache misses), unique
+accented/HTML text (slow path, cache misses) and repeated boilerplate
+descriptions (cache hits).
+
+Usage: python benchmarks/bench_normalize.py [--texts 20000]
+"""
+import argparse
+import html
+import random
+import re
+import sys
+import time
+import unicodedata
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import scan_kpop_doxhunter as scan  # noqa: E402
+
+ASCII_WORDS = "felix stray kids dance cover vlog concert fancam seoul gangnam maison live stage".split()
+MIXED_WORDS = ASCII_WORDS + "필릭스 서울 Corée adresse&nbsp;précise &amp; &#39;spotted&#39; café".split()
+
+
+def legacy_normalize_text(text):
+    text = html.unescape(text or "")
+    text = unicodedata.normalize("NFKD", text)
+    text = text.encode("ascii", "ignore").decode()
+    text = text.lower()
+    text = re.sub(r"\s+", " ", text).strip()
+    return text
+
+
+def make_texts(n, words, seed):
+    rng = random.Random(seed)
+    return [f"{i} " + " ".join(rng.choice(words) for _ in range(rng.randint(10, 80))) for i in range(n)]
+
+
+def timed(func, texts):
+    scan._normalize_cached.cache_clear()
+    start = time.perf_counter()
+    for text in texts:
+        func(text)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--texts", type=int, default=20_000)
+    args = parser.parse_args()
+
+    boilerplate = make_texts(50, MIXED_WORDS, seed=2)
+    workloads = {
+        "unique ascii": make_texts(args.texts, ASCII_WORDS, seed=0),
+        "unique accents/html": make_texts(args.texts, MIXED_WORDS, seed=1),
+        "repeated boilerplate": [boilerplate[i % len(boilerplate)] for i in range(args.texts)],
+    }
+    print(f"{'workload':>22s} {'legacy us':>10s} {'new us':>8s} {'speedup':>8s}")
+    for name, texts in workloads.items():
+        assert [scan.normalize_text(t) for t in texts] == [legacy_normalize_text(t) for t in texts]
+        legacy = timed(legacy_normalize_text, texts)
+        new = timed(scan.normalize_text, texts)
+        per = 1e6 / len(texts)
+        print(f"{name:>22s} {legacy * per:10.2f} {new * per:8.2f} {legacy / new:8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+"""Benchmark: scan pipeline stage by stage, then end to end against a stub server.
+
+Stages (best of ``--repeat`` runs over one synthetic workload): normalize,
+TF-IDF similarity, rules, DataFrame assembly, report write (CSV spool +
+Parquet) and dashboard load. ``ml_dox_hunter()`` is then run against a
+local HTTP server serving synthetic search pages, with a cold and a warm
+cache. Results are written as JSON and compared to a saved baseline; a
+stage slower than baseline * (1 + tolerance) is a regression (exit 1).
+
+Usage:
+    python benchmarks/bench_pipeline.py [--videos 5000] [--output results.json]
+    python benchmarks/bench_pipeline.py --save-baseline      # refresh the baseline
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import scan_kpop_doxhunter as scan  # noqa: E402
+from scan_report import ReportWriter, csv_to_parquet  # noqa: E402
+from workload import LANGUAGES, make_items, make_routes  # noqa: E402
+
+BASELINE_PATH = Path(__file__).resolve().parent / "baseline.json"
+TOLERANCE = 0.25
+
+
+def best_of(repeat, func):
+    """Minimum wall time of ``repeat`` calls and the last result."""
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+# ===== Etapes =====
+def run_stages(items, repeat):
+    import pandas as pd
+    from sklearn.metrics.pairwise import cosine_similarity
+
+    vectorizer, X_train = scan.get_model()
+    snippets = [(it["id"]["videoId"], it["snippet"]["title"], it["snippet"]["description"]) for it in items]
+    timings = {}
+
+    def normalize():
+        scan._normalize_cached.cache_clear()
+        return [f"{scan.normalize_text(t)} {scan.normalize_text(d)}".strip() for _, t, d in snippets]
+
+    timings["normalize"], texts = best_of(repeat, normalize)
+    timings["tfidf_similarity"], ml_scores = best_of(
+        repeat, lambda: cosine_similarity(X_train, vectorizer.transform(texts)).max(axis=0)
+    )
+    timings["rules"], rules = best_of(repeat, lambda: [scan.compute_rule_score(text) for text in texts])
+
+    scores = scan.score_batch(texts).to_dict("records")
+    now = datetime.now()
+
+    def assemble():
+        rows = [
+            scan.make_report_row("bench", video_id, title, score, now)
+            for (video_id, title, _), score in zip(snippets, scores)
+        ]
+        return pd.DataFrame(rows, columns=scan.REPORT_COLUMNS)
+
+    timings["dataframe_assembly"], df = best_of(repeat, assemble)
+    rows = df.to_dict("records")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        report = Path(tmp, "dox_report_20260101_0000.parquet")
+
+        def write_report():
+            spool = str(report.with_suffix(".csv"))
+            writer = ReportWriter(spool, columns=scan.REPORT_COLUMNS)
+            writer.extend(rows)
+            writer.close()
+            csv_to_parquet(spool, str(report))
+            os.unlink(spool)
+
+        timings["report_write"], _ = best_of(repeat, write_report)
+
+        import dashboard
+
+        timings["dashboard_load"], _ = best_of(repeat, lambda: dashboard.prepare_report(report))
+    return timings
+
+
+# ===== Bout en bout =====
+class _StubHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        params = {k: v[0] for k, v in parse_qs(urlparse(self.path).query).items()}
+        body = self.server.routes.get((params.get("q"), params.get("pageToken")), {"items": []})
+        payload = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def run_end_to_end(args):
+    queries = [f"felix bench {i}" for i in range(args.queries)]
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubHandler)
+    server.routes = make_routes(
+        queries,
+        pages=scan.MAX_PAGES_PER_QUERY,
+        per_page=args.per_page,
+        description_words=args.description_words,
+        dox_density=args.dox_density,
+        languages=args.languages,
+    )
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address
+    saved = (scan.YOUTUBE_SEARCH_URL, scan.QUERIES, scan.REPORTS_DIR)
+    timings = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {"YOUTUBE_API_KEY": "BENCH_KEY", "STATE_DIR": str(Path(tmp, "state")), "DAILY_QUOTA_UNITS": "100000000"}
+        old_env = {key: os.environ.get(key) for key in env}
+        os.environ.update(env)
+        scan.YOUTUBE_SEARCH_URL = f"http://{host}:{port}/youtube/v3/search"
+        scan.QUERIES = queries
+        scan.REPORTS_DIR = str(Path(tmp, "reports"))
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                timings["end_to_end_cold"], _ = best_of(1, scan.ml_dox_hunter)
+                timings["end_to_end_warm"], _ = best_of(1, scan.ml_dox_hunter)
+        finally:
+            scan.YOUTUBE_SEARCH_URL, scan.QUERIES, scan.REPORTS_DIR = saved
+            for key, value in old_env.items():
+                if value is None:
+                    os.environ.pop(key, None)
+                else:
+                    os.environ[key] = value
+            server.shutdown()
+            server.server_close()
+    return timings
+
+
+# ===== Resultats =====
+def compare(results, baseline, tolerance):
+    """Print current vs. baseline per stage; returns the regressed stage names."""
+    regressions = []
+    print(f"{'stage':>20s} {'seconds':>9s} {'baseline':>9s} {'ratio':>7s}")
+    for stage, seconds in results["stages"].items():
+        base = baseline.get("stages", {}).get(stage) if baseline else None
+        if not base:
+            print(f"{stage:>20s} {seconds:9.4f} {'-':>9s} {'-':>7s}")
+            continue
+        ratio = seconds / base
+        flag = ""
+        if ratio > 1 + tolerance:
+            regressions.append(stage)
+            flag = "  REGRESSION"
+        print(f"{stage:>20s} {seconds:9.4f} {base:9.4f} {ratio:7.2f}{flag}")
+    if baseline and baseline.get("workload") != results["workload"]:
+        print("[WARN] Baseline was recorded with a different workload; ratios are not comparable.")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--videos", type=int, default=5_000, help="snippets for the stage timings")
+    parser.add_argument("--description-words", type=int, default=60)
+    parser.add_argument("--dox-density", type=float, default=0.05)
+    parser.add_argument("--languages", nargs="+", default=list(LANGUAGES), choices=list(LANGUAGES))
+    parser.add_argument("--queries", type=int, default=8, help="queries served by the stub server")
+    parser.add_argument("--per-page", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="write the results JSON here")
+    parser.add_argument("--baseline", default=str(BASELINE_PATH))
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    args = parser.parse_args()
+
+    scan.get_model()  # chargement de l'artefact hors mesures
+    items = make_items(
+        args.videos, description_words=args.description_words, dox_density=args.dox_density, languages=args.languages
+    )
+    stages = run_stages(items, args.repeat)
+    stages.update(run_end_to_end(args))
+    results = {
+        "workload": {
+            "videos": args.videos,
+            "description_words": args.description_words,
+            "dox_density": args.dox_density,
+            "languages": sorted(args.languages),
+            "queries": args.queries,
+            "per_page": args.per_page,
+        },
+        "machine": {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()},
+        "stages": stages,
+    }
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2) + "\n", encoding="utf-8")
+    baseline_path = Path(args.baseline)
+    if args.save_baseline:
+        baseline_path.write_text(json.dumps(results, indent=2) + "\n", encoding="utf-8")
+        print(f"Baseline saved to {baseline_path}")
+    baseline = json.loads(baseline_path.read_text(encoding="utf-8")) if baseline_path.exists() else None
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions and not args.save_baseline:
+        print(f"Regressions (> {args.tolerance:.0%} slower): {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
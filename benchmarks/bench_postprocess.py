@@ -0,0 +1,86 @@
+"""Benchmark: row-by-row vs columnar post-processing of large batches.
+
+Scores one synthetic batch once, then times the post-processing only, for
+growing batch sizes:
+
+* severity: ``compute_severity`` per row vs ``severities`` (``np.select``);
+* rows + filter: ``iter_target_rows`` + ``is_hit`` per row (live scan path)
+  vs ``report_frame`` + ``hit_mask`` (rescore path), hits as dicts.
+
+Both paths are checked to produce the same hit rows before timing.
+
+Usage: python benchmarks/bench_postprocess.py [--sizes 1000 10000 100000]
+"""
+import argparse
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import scan_kpop_doxhunter as scan  # noqa: E402
+from workload import make_items  # noqa: E402
+
+REPEAT = 3
+
+
+def best_of(func):
+    best, result = float("inf"), None
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    args = parser.parse_args()
+
+    items = make_items(max(args.sizes), description_words=30)
+    video_ids = [item["id"]["videoId"] for item in items]
+    titles = [item["snippet"]["title"] for item in items]
+    texts = [
+        f"{scan.normalize_text(item['snippet']['title'])} {scan.normalize_text(item['snippet']['description'])}".strip()
+        for item in items
+    ]
+    all_scores = scan.score_batch(texts)
+    now = datetime.now()
+
+    print(f"{'batch':>8s} {'severity row ms':>16s} {'np.select ms':>13s} {'rows row ms':>12s} {'columnar ms':>12s} "
+          f"{'speedup':>8s} {'hits':>7s}")
+    for size in sorted(args.sizes):
+        scores = all_scores.iloc[:size].reset_index(drop=True)
+        records = scores.to_dict("records")
+        queries = ["bench"] * size
+        dox, rule = scores["dox_score"].to_numpy(), scores["rule_score"].to_numpy()
+
+        severity_rows, expected_severity = best_of(lambda: [scan.compute_severity(c, r) for c, r in zip(dox, rule)])
+        severity_cols, severity = best_of(lambda: scan.severities(dox, rule))
+        assert list(severity) == expected_severity
+
+        def row_by_row():
+            return [
+                row
+                for video_id, title, score in zip(video_ids, titles, records)
+                for row in scan.iter_target_rows("bench", video_id, title, score, now)
+                if scan.is_hit(row)
+            ]
+
+        def columnar():
+            frame = scan.report_frame(queries, video_ids[:size], titles[:size], scores, now)
+            return scan.report_records(frame[scan.hit_mask(frame)])
+
+        rows_time, expected = best_of(row_by_row)
+        cols_time, hits = best_of(columnar)
+        assert hits == expected
+        print(
+            f"{size:>8d} {severity_rows * 1e3:>16.1f} {severity_cols * 1e3:>13.1f} {rows_time * 1e3:>12.1f} "
+            f"{cols_time * 1e3:>12.1f} {rows_time / cols_time:>7.1f}x {len(hits):>7d}"
+        )
+
+
+if __name__ == "__main__":
+    main()
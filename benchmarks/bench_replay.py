@@ -0,0 +1,92 @@
+"""Benchmark: replayed multi-thousand-page scans, by fetch concurrency.
+
+Records a small cassette (``--queries`` queries x 2 pages of synthetic
+search results) through ``RecordingSession``, then replays
+``ml_dox_hunter()`` from it with ``REPLAY_PAGES`` pages per query, no
+network and no API key. Each ``MAX_FETCH_WORKERS`` value is run at full
+speed and with a simulated per-request latency, which shows where extra
+workers stop paying off.
+
+Usage: python benchmarks/bench_replay.py [--queries 10] [--pages 100] [--latency 0.05] [--workers 1 4 8]
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import scan_kpop_doxhunter as scan  # noqa: E402
+from scan_replay import RecordingSession, ReplayResponse  # noqa: E402
+from workload import make_routes  # noqa: E402
+
+
+class RoutesSession:
+    """API simulee en memoire (sert a enregistrer la cassette)."""
+
+    def __init__(self, routes):
+        self.routes = routes
+
+    def get(self, url, params=None, timeout=None):
+        body = self.routes.get((params.get("q"), params.get("pageToken")), {"items": []})
+        return ReplayResponse(200, json.dumps(body), {"Content-Type": "application/json"}, url)
+
+    def close(self):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--queries", type=int, default=10)
+    parser.add_argument("--pages", type=int, default=100, help="replayed pages per query")
+    parser.add_argument("--latency", type=float, default=0.05, help="simulated seconds per request")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8])
+    args = parser.parse_args()
+
+    queries = [f"felix bench {i}" for i in range(args.queries)]
+    with tempfile.TemporaryDirectory() as tmp:
+        cassette = str(Path(tmp, "bench.jsonl.gz"))
+        env = {
+            "STATE_DIR": str(Path(tmp, "state")),
+            "CACHE_ENABLED": "0",
+            "DAILY_QUOTA_UNITS": "100000000",
+            "YOUTUBE_API_KEY": "BENCH_KEY",
+            "MAX_PAGES_PER_QUERY": "2",
+        }
+        with patch.object(scan, "QUERIES", queries), patch.object(scan, "REPORTS_DIR", str(Path(tmp, "reports"))), \
+                patch.dict(os.environ, env), contextlib.redirect_stdout(io.StringIO()):
+            recorder = RecordingSession(RoutesSession(make_routes(queries, pages=2)), cassette)
+            scan.ml_dox_hunter(session=recorder)
+            recorder.close()
+        print(f"cassette: {Path(cassette).stat().st_size / 1e3:.0f} kB for {args.queries * 2} recorded pages")
+        print(f"{'workers':>8s} {'latency s':>10s} {'pages':>7s} {'wall s':>8s} {'pages/s':>9s}")
+
+        for latency in (0.0, args.latency):
+            for workers in args.workers:
+                replay_env = dict(
+                    env,
+                    REPLAY_CASSETTE=cassette,
+                    REPLAY_PAGES=str(args.pages),
+                    REPLAY_LATENCY=str(latency),
+                    MAX_PAGES_PER_QUERY=str(args.pages),
+                    MAX_FETCH_WORKERS=str(workers),
+                    YOUTUBE_API_KEY="",
+                )
+                reports = Path(tmp, f"reports_{latency}_{workers}")
+                with patch.object(scan, "QUERIES", queries), patch.object(scan, "REPORTS_DIR", str(reports)), \
+                        patch.dict(os.environ, replay_env), contextlib.redirect_stdout(io.StringIO()):
+                    start = time.perf_counter()
+                    scan.ml_dox_hunter()
+                    wall = time.perf_counter() - start
+                pages = args.queries * args.pages
+                print(f"{workers:>8d} {latency:>10.3f} {pages:>7d} {wall:>8.2f} {pages / wall:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Benchmark: peak Python memory of the streaming report writer vs. row count.
+
+Peak memory should stay flat as the number of rows grows (chunked appends,
+external merge sort on close). Timings include the tracemalloc overhead.
+
+Usage: python benchmarks/bench_report_memory.py [--sort-memory-rows 20000]
+"""
+import argparse
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from scan_report import ReportWriter  # noqa: E402
+
+
+def run(rows, sort_memory_rows):
+    rng = random.Random(rows)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = str(Path(tmp, "dox_report_bench.csv"))
+        tracemalloc.start()
+        start = time.perf_counter()
+        writer = ReportWriter(path, sort_memory_rows=sort_memory_rows)
+        for i in range(rows):
+            writer.append({
+                "query": "felix bench",
+                "title": f"Felix maison Seoul {i}",
+                "display_title": f"Felix maison Seoul {i}",
+                "video_id": f"vid{i:08d}",
+                "ml_score": 0.5,
+                "rule_score": 0.4,
+                "dox_score": round(rng.random(), 3),
+                "severity": "HIGH",
+                "patterns": "{'coords_gps': 0}",
+                "timestamp": "2026-01-01 00:00:00",
+            })
+        writer.close()
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return peak, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sort-memory-rows", type=int, default=20_000)
+    args = parser.parse_args()
+
+    print(f"{'rows':>10s} {'peak MiB':>10s} {'seconds':>9s}")
+    for rows in (10_000, 50_000, 200_000):
+        peak, elapsed = run(rows, args.sort_memory_rows)
+        print(f"{rows:10d} {peak / 2**20:10.1f} {elapsed:9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Benchmark: offline rescore throughput at 1, 2, 4 and N worker processes.
+
+Writes a synthetic JSONL dump (mix of dox-like and clean snippets) and
+re-scores it with each worker count. Speedup is bounded by the number of
+cores and by the parent process, which writes the report.
+
+Usage: python benchmarks/bench_rescore.py [--snippets 100000] [--chunk-size 2000]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import scan_rescore  # noqa: E402
+
+DOX_WORDS = ["adresse", "maison", "appartement", "quartier", "gps", "dox", "suivre", "37.5665,", "126.9780"]
+CLEAN_WORDS = ["dance", "practice", "stage", "live", "comeback", "fancam", "concert", "Felix", "Hyunjin", "Seoul"]
+
+
+def write_dump(path, snippets):
+    rng = random.Random(snippets)
+    with open(path, "w", encoding="utf-8") as fh:
+        for i in range(snippets):
+            words = DOX_WORDS + CLEAN_WORDS if i % 5 == 0 else CLEAN_WORDS
+            fh.write(json.dumps({
+                "video_id": f"vid{i:08d}",
+                "title": " ".join(rng.choice(words) for _ in range(8)),
+                "description": " ".join(rng.choice(words) for _ in range(rng.randint(10, 60))),
+            }) + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--snippets", type=int, default=100_000)
+    parser.add_argument("--chunk-size", type=int, default=scan_rescore.CHUNK_SIZE)
+    args = parser.parse_args()
+
+    cores = os.cpu_count() or 1
+    counts = sorted({1, 2, 4, cores})
+    with tempfile.TemporaryDirectory() as tmp:
+        dump = Path(tmp, "dump.jsonl")
+        write_dump(dump, args.snippets)
+        print(f"{args.snippets} snippets, {cores} CPU(s)")
+        print(f"{'workers':>8s} {'seconds':>9s} {'snippets/s':>11s} {'speedup':>8s}")
+        base = None
+        for workers in counts:
+            # Etat isole: pas d'ecriture dans state/clusters.sqlite, ni modele de feedback / cibles reels
+            with patch.dict(os.environ, {"STATE_DIR": str(Path(tmp, f"state_{workers}"))}):
+                start = time.perf_counter()
+                scan_rescore.rescore(
+                    [dump], output=str(Path(tmp, f"out_{workers}.parquet")), workers=workers, chunk_size=args.chunk_size
+                )
+            elapsed = time.perf_counter() - start
+            base = base or elapsed
+            print(f"{workers:8d} {elapsed:9.2f} {args.snippets / elapsed:11.0f} {base / elapsed:8.2f}")
+
+
+if __name__ == "__main__":
+    main()
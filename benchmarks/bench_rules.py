@@ -0,0 +1,72 @@
+"""Benchmark: single-pass rule engine vs. one findall per DOX_PATTERNS regex.
+
+Usage: python benchmarks/bench_rules.py [--length 5000] [--texts 200]
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import scan_kpop_doxhunter as scan  # noqa: E402
+
+FILLER_WORDS = (
+    "felix stray kids dance cover vlog concert fancam reaction lyrics subscribe "
+    "comeback stage album teaser behind the scenes music show the a de la et"
+).split()
+DOX_WORDS = (
+    "seoul gangnam dong gu maison house chez spotted outside door visit address "
+    "gps 37.5665, 126.9780 25 minutes 12 rue instagram kakao"
+).split()
+
+
+def legacy_counts(text):
+    return {name: len(regex.findall(text)) for name, regex in scan.DOX_PATTERNS.items()}
+
+
+def make_texts(n, length, density=0.05, seed=0):
+    rng = random.Random(seed)
+    texts = []
+    for _ in range(n):
+        words = []
+        size = 0
+        while size < length:
+            word = rng.choice(DOX_WORDS if rng.random() < density else FILLER_WORDS)
+            words.append(word)
+            size += len(word) + 1
+        texts.append(scan.normalize_text(" ".join(words)))
+    return texts
+
+
+def bench(fn, texts, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for text in texts:
+            fn(text)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--length", type=int, default=5000, help="characters per description")
+    parser.add_argument("--texts", type=int, default=200)
+    parser.add_argument("--density", type=float, default=0.05, help="share of dox words")
+    args = parser.parse_args()
+
+    texts = make_texts(args.texts, args.length, args.density)
+    assert all(legacy_counts(t) == scan.count_rule_matches(t) for t in texts)
+
+    legacy = bench(legacy_counts, texts)
+    engine = bench(scan.count_rule_matches, texts)
+    print(f"texts={args.texts} length={args.length} density={args.density}")
+    print(f"legacy findall x{len(scan.DOX_PATTERNS)}: {legacy * 1000:8.1f} ms")
+    print(f"single-pass engine   : {engine * 1000:8.1f} ms")
+    print(f"speedup              : {legacy / engine:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
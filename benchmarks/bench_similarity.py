@@ -0,0 +1,102 @@
+"""Benchmark: recall vs latency of the similarity indexes as the corpus grows.
+
+Builds labelled corpora of synthetic dox examples (Zipf-distributed
+vocabulary plus dox fragments) and queries them with pages of texts. Half
+the texts are edited copies of corpus examples and half are unrelated
+snippets. For each index this prints the build time, the search time per
+50-text page, recall@1 (same best example as the exact search, or an equal
+score), recall@10 and the mean error on the best score (the ``ml_score``).
+
+Usage: python benchmarks/bench_similarity.py [--sizes 1000 10000 50000] [--queries 1000]
+"""
+import argparse
+import itertools
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import numpy as np  # noqa: E402
+
+import scan_kpop_doxhunter as scan  # noqa: E402
+from scan_similarity import ExactIndex, PrunedIndex  # noqa: E402
+from workload import DOX_FRAGMENTS  # noqa: E402
+
+PAGE = 50
+K = 10
+VOCABULARY = 30_000
+
+
+# Loi de Zipf (frequence ~ 1 / rang): quelques mots tres frequents, une longue traine de mots rares
+_ZIPF = list(itertools.accumulate(1 / rank for rank in range(1, VOCABULARY + 1)))
+
+
+def make_text(rng, words):
+    return " ".join(
+        rng.choice(DOX_FRAGMENTS) if rng.random() < 0.2 else f"w{rng.choices(range(VOCABULARY), cum_weights=_ZIPF)[0]}"
+        for _ in range(words)
+    )
+
+
+def edited(text, rng):
+    words = text.split()
+    for _ in range(3):
+        words[rng.randrange(len(words))] = f"w{rng.randrange(VOCABULARY)}"
+    return " ".join(words)
+
+
+def search(index, vecs):
+    start = time.perf_counter()
+    results = [index.search(vecs[i:i + PAGE], k=K) for i in range(0, vecs.shape[0], PAGE)]
+    elapsed = time.perf_counter() - start
+    scores = np.vstack([s for s, _ in results])
+    ids = np.vstack([i for _, i in results])
+    return elapsed / len(results), scores, ids
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 50_000])
+    parser.add_argument("--queries", type=int, default=1_000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    largest = max(args.sizes)
+    corpus = [scan.normalize_text(make_text(rng, rng.randint(8, 30))) for _ in range(largest)]
+    print(
+        f"{'corpus':>8s} {'index':>7s} {'build s':>8s} {'ms/page':>8s} {'recall@1':>9s} {'recall@10':>10s} "
+        f"{'score err':>10s}"
+    )
+    for size in sorted(args.sizes):
+        vectorizer, X = scan.fit_model(corpus[:size])
+        texts = [
+            edited(corpus[rng.randrange(size)], rng) if n % 2 else scan.normalize_text(make_text(rng, 20))
+            for n in range(args.queries)
+        ]
+        vecs = vectorizer.transform(texts)
+
+        exact = None
+        for name, build in (("exact", ExactIndex), ("pruned", PrunedIndex)):
+            start = time.perf_counter()
+            index = build(X)
+            built = time.perf_counter() - start
+            per_page, scores, ids = search(index, vecs)
+            if exact is None:
+                exact = scores, ids
+            exact_scores, exact_ids = exact
+            found = exact_ids[:, 0] >= 0
+            top1 = (ids[:, 0] == exact_ids[:, 0]) | np.isclose(scores[:, 0], exact_scores[:, 0])
+            top10 = np.mean([
+                len(set(ids[i][ids[i] >= 0]) & set(exact_ids[i][exact_ids[i] >= 0])) / max(1, (exact_ids[i] >= 0).sum())
+                for i in np.flatnonzero(found)
+            ])
+            print(
+                f"{size:>8d} {name:>7s} {built:>8.2f} {per_page * 1e3:>8.1f} "
+                f"{top1[found].mean():>9.1%} {top10:>10.1%} {np.abs(scores[:, 0] - exact_scores[:, 0]).mean():>10.4f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
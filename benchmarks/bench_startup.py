@@ -0,0 +1,77 @@
+"""Benchmark: scanner startup cost (module import, --help, first model use).
+
+Each measurement runs in a fresh interpreter. ``--baseline-ref`` also times
+the module as it was at a git revision, for before/after comparisons.
+
+Usage: python benchmarks/bench_startup.py [--runs 5] [--baseline-ref baseline]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+CASES = {
+    "import module": "import scan_kpop_doxhunter",
+    "import + normalize_text": "import scan_kpop_doxhunter as s; s.normalize_text('Felix &amp; maison')",
+    "first model use": "import scan_kpop_doxhunter as s; s.get_model()",
+}
+
+
+def time_argv(argv, cwd, runs, env=None):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, *argv], cwd=cwd, env=env, check=True, capture_output=True)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def checkout_module(ref, dest):
+    for name in ("scan_kpop_doxhunter.py", "scan_cache.py", "scan_quota.py"):
+        result = subprocess.run(
+            ["git", "show", f"{ref}:{name}"], cwd=ROOT, capture_output=True, text=True
+        )
+        if result.returncode == 0:
+            Path(dest, name).write_text(result.stdout, encoding="utf-8")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--baseline-ref", help="git revision to compare against")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    with tempfile.TemporaryDirectory() as models:
+        env["MODEL_DIR"] = models
+        subprocess.run(
+            [sys.executable, str(ROOT / "scan_kpop_doxhunter.py"), "build-model"],
+            cwd=ROOT, env=env, check=True, capture_output=True,
+        )
+        current = {name: time_argv(["-c", code], ROOT, args.runs, env) for name, code in CASES.items()}
+        current["--help"] = time_argv(["scan_kpop_doxhunter.py", "--help"], ROOT, args.runs, env)
+
+    baseline = {}
+    if args.baseline_ref:
+        with tempfile.TemporaryDirectory() as old_tree:
+            checkout_module(args.baseline_ref, old_tree)
+            baseline["import module"] = time_argv(["-c", CASES["import module"]], old_tree, args.runs)
+            baseline["import + normalize_text"] = time_argv(
+                ["-c", CASES["import + normalize_text"]], old_tree, args.runs
+            )
+
+    print(f"{'case':28s} {'current':>10s} {'baseline':>10s}")
+    for name, seconds in current.items():
+        old = baseline.get(name)
+        old_txt = f"{old * 1000:8.0f}ms" if old else f"{'-':>10s}"
+        print(f"{name:28s} {seconds * 1000:8.0f}ms {old_txt}")
+
+
+if __name__ == "__main__":
+    main()
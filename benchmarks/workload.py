@@ -0,0 +1,76 @@
+"""Synthetic YouTube ``search.list`` workloads for the benchmarks.
+
+Titles and descriptions mix several languages (with accents, Hangul, kana
+and HTML entities as returned by the API); ``dox_density`` is the share of
+words drawn from dox-like fragments (addresses, GPS, stalking terms...).
+"""
+import random
+from typing import Dict, List, Optional, Sequence, Tuple
+
+LANGUAGES = {
+    "en": "felix stray kids dance cover live stage comeback fancam reaction lyrics behind the scenes".split(),
+    "fr": "vidéo danse concert coulisses réaction à la découverte du clip été fête &amp; musique".split(),
+    "es": "baile concierto reacción canción escenario niños &quot;oficial&quot; año".split(),
+    "ko": "스트레이 키즈 필릭스 무대 직캠 컴백 안무 연습 영상".split(),
+    "ja": "ストレイキッズ フィリックス ダンス ライブ 公式 動画".split(),
+}
+DOX_FRAGMENTS = [
+    "adresse", "maison", "appartement", "domicile", "habite", "quartier",
+    "address", "house", "home", "lives", "spotted", "outside", "door",
+    "seoul", "gangnam", "dong", "gu", "coree", "12 rue", "25 minutes",
+    "gps", "37.5665, 126.9780", "dox", "doxx", "suivre", "filature",
+    "주소", "집", "서울",
+]
+
+
+def make_text(rng: random.Random, words: int, dox_density: float, languages: Sequence[str]) -> str:
+    vocab = [w for lang in languages for w in LANGUAGES[lang]]
+    return " ".join(
+        rng.choice(DOX_FRAGMENTS) if rng.random() < dox_density else rng.choice(vocab) for _ in range(words)
+    )
+
+
+def make_items(
+    n: int,
+    description_words: int = 60,
+    dox_density: float = 0.05,
+    languages: Sequence[str] = tuple(LANGUAGES),
+    seed: int = 0,
+    prefix: str = "vid",
+) -> List[dict]:
+    """``n`` search result items; description length varies around ``description_words``."""
+    rng = random.Random(seed)
+    items = []
+    for i in range(n):
+        length = max(1, int(rng.gauss(description_words, description_words / 4)))
+        items.append({
+            "id": {"kind": "youtube#video", "videoId": f"{prefix}{i:08d}"},
+            "snippet": {
+                "title": make_text(rng, rng.randint(4, 12), dox_density, languages),
+                "description": make_text(rng, length, dox_density, languages),
+            },
+        })
+    return items
+
+
+def make_routes(
+    queries: Sequence[str],
+    pages: int = 2,
+    per_page: int = 50,
+    seed: int = 0,
+    **item_options,
+) -> Dict[Tuple[str, Optional[str]], dict]:
+    """Responses keyed by ``(q, pageToken)``, chained with ``nextPageToken``."""
+    routes = {}
+    for q_index, query in enumerate(queries):
+        for page in range(pages):
+            token = None if page == 0 else f"P{page + 1}"
+            body = {
+                "items": make_items(
+                    per_page, seed=seed * 1000 + q_index * 100 + page, prefix=f"q{q_index}p{page}_", **item_options
+                )
+            }
+            if page + 1 < pages:
+                body["nextPageToken"] = f"P{page + 2}"
+            routes[(query, token)] = body
+    return routes
@@ -1,33 +1,85 @@
+import hashlib
+import math
+import threading
+import time
+from datetime import datetime, timezone
 from pathlib import Path
+from urllib.parse import urlsplit
 
 import pandas as pd
 from pandas.errors import EmptyDataError
-from flask import Flask, render_template
+from flask import Flask, Response, abort, g, redirect, render_template, request, url_for
+
+from scan_history import TREND_DAYS, HistoryStore, history_path, trend_slope
+from scan_metrics import Metrics, load_summary, run_summary_to_prometheus, to_prometheus
+from scan_report import find_latest_report
+from scan_targets import DEFAULT_TARGET
 
 app = Flask(__name__)
 
 REPORTS_DIR = Path("reports")
-REQUIRED_COLUMNS = {"title", "display_title", "dox_score", "ml_score", "rule_score", "severity", "video_id"}
+REQUIRED_COLUMNS = {
+    "target", "title", "display_title", "dox_score", "ml_score", "rule_score", "severity", "video_id", "cluster_id"
+}
+# Colonnes lues pour la page principale (les autres restent sur disque)
+DISPLAY_COLUMNS = [
+    "target", "title", "display_title", "dox_score", "ml_score", "matched_example", "rule_score", "severity",
+    "video_id", "cluster_id", "fp_prob",
+]
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+SORTABLE_COLUMNS = ("dox_score", "ml_score", "rule_score", "severity", "display_title")
+SEVERITY_ORDER = ["CRITICAL", "HIGH", "MEDIUM", "LOW", "UNKNOWN"]
+MAX_CACHED_VIEWS = 32
+
+
+def load_report(path, columns=None, severities=None):
+    """Read a report, optionally only some columns and severities.
+
+    Parquet reports are memory-mapped and only the requested columns and
+    row groups are decoded; they are already sorted by dox_score. Old CSV
+    reports go through a plain ``read_csv`` compatibility path.
+    """
+    path = Path(path)
+    if path.suffix == ".parquet":
+        import pyarrow.parquet as pq
 
+        available = pq.read_schema(path).names
+        wanted = [col for col in columns if col in available] if columns else None
+        filters = None
+        if severities and "severity" in available:
+            filters = [("severity", "in", list(severities))]
+        table = pq.read_table(path, columns=wanted, filters=filters, memory_map=True)
+        return table.to_pandas()
+
+    # Compatibilite: anciens rapports CSV (patterns en dict texte, non tries)
+    df = pd.read_csv(path)
+    if columns:
+        df = df[[col for col in columns if col in df.columns]]
+    if severities and "severity" in df.columns:
+        df = df[df["severity"].isin(list(severities))]
+    if "dox_score" in df.columns:
+        df = df.sort_values("dox_score", ascending=False)
+    return df
 
-def get_latest_report():
-    csv_files = sorted(REPORTS_DIR.glob("dox_report_*.csv"))
-    if not csv_files:
+
+def get_latest_report(columns=DISPLAY_COLUMNS, severities=None):
+    latest = find_latest_report(REPORTS_DIR)
+    if latest is None:
         return None
+    return prepare_report(latest, columns=columns, severities=severities)
+
 
-    latest = csv_files[-1]
+def prepare_report(latest, columns=DISPLAY_COLUMNS, severities=None):
+    """Load a report and add the defaults/derived columns the template needs."""
     try:
-        df = pd.read_csv(latest)
-    except (OSError, EmptyDataError) as exc:
+        df = load_report(latest, columns=columns, severities=severities)
+    except (OSError, EmptyDataError, ValueError) as exc:
         print(f"[WARN] Failed to read report '{latest}': {exc}")
         return None
     if df.empty:
         return None
 
-    # Tri décroissant par score
-    if "dox_score" in df.columns:
-        df = df.sort_values("dox_score", ascending=False)
-
     # Colonnes manquantes (anciens rapports) -> valeurs par défaut
     missing = REQUIRED_COLUMNS - set(df.columns)
     if missing:
@@ -36,12 +88,29 @@ def get_latest_report():
             if col not in df.columns:
                 if col == "severity":
                     df[col] = "UNKNOWN"
+                elif col == "target":
+                    df[col] = DEFAULT_TARGET
                 elif col in ("ml_score", "rule_score"):
-                    df[col] = None
+                    df[col] = float("nan")
                 elif col == "video_id":
                     df[col] = None
                 elif col == "display_title":
                     df[col] = df["title"] if "title" in df.columns else None
+                elif col == "cluster_id":
+                    df[col] = df["video_id"]
+
+    # Exemple du corpus le plus proche (absent des rapports plus anciens)
+    if "matched_example" not in df.columns:
+        df["matched_example"] = ""
+    df["matched_example"] = df["matched_example"].fillna("")
+    # Probabilite de faux positif (modele de feedback), absente sans modele pret
+    if "fp_prob" not in df.columns:
+        df["fp_prob"] = float("nan")
+
+    # Lignes d'avant le clustering (rapport fusionne): chaque video est son propre cluster
+    blank = df["cluster_id"].isna() | (df["cluster_id"] == "")
+    if blank.any():
+        df.loc[blank, "cluster_id"] = df.loc[blank, "video_id"]
 
     # Format du score
     if "dox_score" in df.columns:
@@ -56,13 +125,313 @@ def get_latest_report():
     return df
 
 
+class ReportCache:
+    """Prepared DataFrame of the latest report, kept in memory between requests.
+
+    The entry is keyed on the latest file's path, mtime and size, so a new
+    or rewritten report invalidates it. Sorted/filtered row orders are
+    memoized per entry.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._key = None
+        self._df = None
+        self._views = {}
+
+    def get(self):
+        """Return (df, key) for the latest report; (None, None) if there is none."""
+        latest = find_latest_report(REPORTS_DIR)
+        if latest is None:
+            return None, None
+        try:
+            stat = latest.stat()
+        except OSError:
+            return None, None
+        key = (str(latest), stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            if key == self._key:
+                return self._df, key
+        with dashboard_metrics.timer("report_load_seconds"):
+            df = prepare_report(latest)
+        dashboard_metrics.inc("report_loads_total")
+        if df is not None:
+            df = df.reset_index(drop=True)
+        with self._lock:
+            self._key, self._df, self._views = key, df, {}
+        return df, key
+
+    def targets(self, key, df):
+        """Distinct target names of the report, memoized."""
+        with self._lock:
+            names = self._views.get((key, "targets"))
+        if names is None:
+            names = sorted(df["target"].dropna().unique())
+            with self._lock:
+                self._views[(key, "targets")] = names
+        return names
+
+    def view(self, key, df, sort, ascending, severities, target=None, cluster=None, collapse=False):
+        """(row positions, cluster sizes) of ``df`` filtered and sorted, memoized.
+
+        With ``collapse`` each (target, cluster) keeps only its best-scored
+        row, and the sizes array gives the number of videos it stands for
+        (None otherwise).
+        """
+        view_key = (key, sort, ascending, severities, target, cluster, collapse)
+        with self._lock:
+            cached = self._views.get(view_key)
+        if cached is not None:
+            return cached
+        frame = df
+        if severities:
+            frame = frame[frame["severity"].isin(severities)]
+        if target:
+            frame = frame[frame["target"] == target]
+        if cluster:
+            frame = frame[frame["cluster_id"] == cluster]
+        sizes = None
+        if collapse:
+            groups = ["target", "cluster_id"]
+            counts = frame.groupby(groups, sort=False)["video_id"].transform("nunique")
+            frame = frame.sort_values("dox_score", ascending=False, kind="stable").drop_duplicates(groups)
+            counts = counts.loc[frame.index]
+        if sort == "severity":
+            rank = frame["severity"].map({s: i for i, s in enumerate(SEVERITY_ORDER)}).fillna(len(SEVERITY_ORDER))
+            order = rank.sort_values(ascending=not ascending, kind="stable").index
+        else:
+            order = frame[sort].sort_values(ascending=ascending, kind="stable", na_position="last").index
+        positions = df.index.get_indexer(order)
+        if collapse:
+            sizes = counts.loc[order].to_numpy()
+        with self._lock:
+            if len(self._views) >= MAX_CACHED_VIEWS:
+                self._views.clear()
+            self._views[view_key] = (positions, sizes)
+        return positions, sizes
+
+    def clear(self):
+        with self._lock:
+            self._key, self._df, self._views = None, None, {}
+
+
+dashboard_metrics = Metrics()
+report_cache = ReportCache()
+_feedback = None
+_feedback_lock = threading.Lock()
+
+
+def get_feedback(create=False):
+    """Shared ``FeedbackLearner``; None until a first label is stored (unless ``create``)."""
+    global _feedback
+    from scan_feedback import FeedbackLearner, FeedbackStore, store_path
+
+    with _feedback_lock:
+        if _feedback is None and (create or Path(store_path()).exists()):
+            _feedback = FeedbackLearner(FeedbackStore(store_path()))
+        return _feedback
+
+
+_history = None
+_history_lock = threading.Lock()
+
+
+def get_history():
+    """Shared ``HistoryStore``, refreshed from REPORTS_DIR at most every HISTORY_REFRESH_SECONDS."""
+    global _history
+    with _history_lock:
+        if _history is None:
+            _history = HistoryStore(history_path())
+    with dashboard_metrics.timer("history_refresh_seconds"):
+        _history.refresh(REPORTS_DIR)
+    return _history
+
+
+@app.before_request
+def _start_timer():
+    g.request_started = time.perf_counter()
+
+
+@app.after_request
+def _record_request(response):
+    endpoint = request.endpoint or "unknown"
+    dashboard_metrics.inc("requests_total", endpoint=endpoint, status=response.status_code)
+    started = g.get("request_started")
+    if started is not None:
+        dashboard_metrics.observe("request_seconds", time.perf_counter() - started, endpoint=endpoint)
+    return response
+
+
+def _int_arg(name, default, low, high):
+    try:
+        value = int(request.args.get(name, default))
+    except (TypeError, ValueError):
+        return default
+    return min(max(value, low), high)
+
+
+def parse_view_args():
+    """Pagination, sort, severity/target/cluster filters and collapsing from the query string (sanitized)."""
+    sort = request.args.get("sort", "dox_score")
+    if sort not in SORTABLE_COLUMNS:
+        sort = "dox_score"
+    order = request.args.get("order", "desc")
+    if order not in ("asc", "desc"):
+        order = "desc"
+    severities = []
+    for value in request.args.getlist("severity"):
+        severities.extend(v.strip().upper() for v in value.split(",") if v.strip())
+    severities = tuple(s for s in SEVERITY_ORDER if s in severities)
+    return {
+        "page": _int_arg("page", 1, 1, 10**9),
+        "per_page": _int_arg("per_page", PAGE_SIZE, 1, MAX_PAGE_SIZE),
+        "sort": sort,
+        "order": order,
+        "severity": severities,
+        "target": request.args.get("target", "").strip() or None,
+        "cluster": request.args.get("cluster", "").strip() or None,
+        "collapse": 0 if request.args.get("collapse") in ("0", "false", "no") else 1,
+    }
+
+
+def view_url(view, **changes):
+    """URL of the index with the current view args, some of them replaced."""
+    params = dict(view, **changes)
+    params["severity"] = ",".join(params["severity"]) or None
+    params["collapse"] = None if params["collapse"] else 0
+    return url_for("index", **{k: v for k, v in params.items() if v is not None})
+
+
 @app.route("/")
 def index():
-    df = get_latest_report()
+    df, key = report_cache.get()
+    args = parse_view_args()
+    if df is None:
+        return render_template("index.html", rows=None, view=args, severities=SEVERITY_ORDER, view_url=view_url)
+
+    # Validation conditionnelle: rien a recalculer si le client a deja cette page
+    path, mtime_ns, size = key
+    feedback = get_feedback()
+    revision = feedback.store.revision() if feedback is not None else None
+    etag = hashlib.sha1(f"{path}:{mtime_ns}:{size}:{revision}:{sorted(args.items())}".encode()).hexdigest()
+    # Un label change aussi la page: Last-Modified = le plus recent du rapport et du dernier label
+    modified = max(mtime_ns / 1e9, revision[1] if revision else 0.0)
+    last_modified = datetime.fromtimestamp(modified, tz=timezone.utc).replace(microsecond=0)
+    if request.if_none_match.contains(etag) or (
+        not request.if_none_match
+        and request.if_modified_since is not None
+        and last_modified <= request.if_modified_since
+    ):
+        response = app.response_class(status=304)
+    else:
+        # Un cluster demande explicitement est affiche en entier
+        collapse = bool(args["collapse"]) and not args["cluster"]
+        positions, sizes = report_cache.view(
+            key, df, args["sort"], args["order"] == "asc", args["severity"], args["target"], args["cluster"], collapse
+        )
+        total = len(positions)
+        pages = max(1, math.ceil(total / args["per_page"]))
+        args["page"] = min(args["page"], pages)
+        start = (args["page"] - 1) * args["per_page"]
+        rows = df.iloc[positions[start:start + args["per_page"]]].to_dict("records")
+        if sizes is not None:
+            for row, size in zip(rows, sizes[start:start + args["per_page"]]):
+                row["cluster_size"] = int(size)
+        labels = feedback.store.labels_for((r["video_id"], r["target"]) for r in rows) if feedback else {}
+        for row in rows:
+            row["label"] = labels.get((row["video_id"], row["target"]))
+        response = app.make_response(render_template(
+            "index.html",
+            rows=rows,
+            total=total,
+            pages=pages,
+            view=args,
+            severities=SEVERITY_ORDER,
+            targets=report_cache.targets(key, df),
+            view_url=view_url,
+        ))
+    response.set_etag(etag)
+    response.last_modified = last_modified
+    response.cache_control.no_cache = True
+    return response
+
+
+def _same_origin() -> bool:
+    """True when a POST comes from a page of this dashboard (Origin, else Referer)."""
+    source = request.headers.get("Origin") or request.headers.get("Referer")
+    if not source or source == "null":
+        return False
+    parts = urlsplit(source)
+    return (parts.scheme, parts.netloc) == (request.scheme, request.host)
+
+
+@app.route("/label", methods=["POST"])
+def label():
+    """Store a reviewer label (tp/fp) for a report row and update the feedback model."""
+    from scan_feedback import LABELS
+
+    # CSRF: n'importe quelle page ouverte par un reviewer pourrait sinon entrainer le modele
+    if not _same_origin():
+        abort(403)
+    video_id = request.form.get("video_id", "")
+    target = request.form.get("target", "")
+    value = request.form.get("label", "")
+    if value not in LABELS:
+        abort(400)
+    df, _ = report_cache.get()
     if df is None:
-        return render_template("index.html", df=None)
+        abort(404)
+    match = df[(df["video_id"] == video_id) & (df["target"] == target)]
+    if match.empty:
+        abort(404)
+    with dashboard_metrics.timer("label_seconds"):
+        get_feedback(create=True).label(video_id, target, value, match["title"].iloc[0])
+    dashboard_metrics.inc("labels_total", label=value)
+    # Retour a la vue d'origine (chemin local uniquement)
+    back = request.form.get("next", "")
+    if not back.startswith("/") or back.startswith("//"):
+        back = url_for("index")
+    return redirect(back, code=303)
+
+
+@app.route("/history/<video_id>")
+def history(video_id):
+    """Every day a video appeared in a report, with its best score and worst severity."""
+    rows = get_history().video_history(video_id)
+    if not rows:
+        abort(404)
+    return render_template("history.html", video_id=video_id, rows=rows, first_seen=rows[0]["first_seen"])
+
+
+@app.route("/trends")
+def trends():
+    """Daily counts and scores over the last ``days`` days, for all targets or one."""
+    store = get_history()
+    target = request.args.get("target", "").strip() or None
+    days = _int_arg("days", TREND_DAYS, 1, 3660)
+    points = store.trend(target, days)
+    peak = max((p["videos"] for p in points), default=0)
+    return render_template(
+        "trends.html",
+        points=points,
+        peak=peak,
+        target=target,
+        days=days,
+        targets=store.targets(),
+        slope=trend_slope(points, "avg_score"),
+        count_slope=trend_slope(points, "videos"),
+    )
+
 
-    return render_template("index.html", df=df)
+@app.route("/metrics")
+def metrics():
+    """Prometheus text format: dashboard metrics, then the latest run summary."""
+    text = to_prometheus(dashboard_metrics.summary(), prefix="doxhunter_dashboard_")
+    latest = find_latest_report(REPORTS_DIR)
+    summary = load_summary(latest) if latest is not None else None
+    if summary:
+        text += run_summary_to_prometheus(summary)
+    return Response(text, mimetype="text/plain; version=0.0.4")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,185 @@
+"""Persistent SQLite cache for YouTube search pages and scored videos.
+
+Search pages are keyed by their request parameters (query, pageToken, ...)
+without the API key, scored videos by ``videoId``. Both tables have a TTL
+and a row cap; expired rows are ignored on read and purged by ``evict()``.
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+PAGE_TTL_SECONDS = 6 * 3600  # les resultats de recherche bougent vite
+VIDEO_TTL_SECONDS = 7 * 24 * 3600
+MAX_PAGES = 5_000
+MAX_VIDEOS = 200_000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    key TEXT PRIMARY KEY,
+    query TEXT,
+    page_token TEXT,
+    body TEXT NOT NULL,
+    fetched_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS pages_fetched_at ON pages (fetched_at);
+CREATE TABLE IF NOT EXISTS videos (
+    video_id TEXT PRIMARY KEY,
+    text_hash TEXT NOT NULL,
+    scoring_version TEXT NOT NULL,
+    snippet TEXT,
+    ml_score REAL,
+    rule_score REAL,
+    dox_score REAL,
+    severity TEXT,
+    patterns TEXT,
+    targets TEXT,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS videos_updated_at ON videos (updated_at);
+"""
+
+
+def text_hash(title: str, description: str) -> str:
+    """Stable fingerprint of the raw snippet text used for scoring."""
+    return hashlib.sha1(f"{title}\0{description}".encode("utf-8")).hexdigest()
+
+
+def page_key(params: Dict) -> str:
+    """Cache key of a search request; the API key is never part of it."""
+    public = {k: v for k, v in params.items() if k != "key"}
+    return hashlib.sha1(json.dumps(public, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class ScanCache:
+    """Thread-safe cache shared by the fetch workers and the scoring loop."""
+
+    def __init__(
+        self,
+        path,
+        page_ttl: float = PAGE_TTL_SECONDS,
+        video_ttl: float = VIDEO_TTL_SECONDS,
+        max_pages: int = MAX_PAGES,
+        max_videos: int = MAX_VIDEOS,
+        clock=time.time,
+    ):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.page_ttl = page_ttl
+        self.video_ttl = video_ttl
+        self.max_pages = max_pages
+        self.max_videos = max_videos
+        self.stats = Counter()
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._migrate()
+        self.evict()
+
+    def _migrate(self) -> None:
+        # Cache cree avant les scores par cible
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(videos)")}
+        if "targets" not in columns:
+            with self._conn:
+                self._conn.execute("ALTER TABLE videos ADD COLUMN targets TEXT")
+
+    # ----- search pages -----
+    def get_page(self, params: Dict) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body FROM pages WHERE key = ? AND fetched_at >= ?",
+                (page_key(params), self._clock() - self.page_ttl),
+            ).fetchone()
+            self.stats["page_hits" if row else "page_misses"] += 1
+        return json.loads(row[0]) if row else None
+
+    def put_page(self, params: Dict, body: dict) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pages (key, query, page_token, body, fetched_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (page_key(params), params.get("q"), params.get("pageToken"), json.dumps(body), self._clock()),
+            )
+
+    # ----- scored videos -----
+    def get_scores(self, video_id: str, text_digest: str, scoring_version: str) -> Optional[dict]:
+        """Return cached scores when the text and scoring version are unchanged."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT ml_score, rule_score, dox_score, severity, patterns, targets FROM videos "
+                "WHERE video_id = ? AND text_hash = ? AND scoring_version = ? AND updated_at >= ?",
+                (video_id, text_digest, scoring_version, self._clock() - self.video_ttl),
+            ).fetchone()
+            self.stats["video_hits" if row else "video_misses"] += 1
+        if row is None:
+            return None
+        return {
+            "ml_score": row[0],
+            "rule_score": row[1],
+            "dox_score": row[2],
+            "severity": row[3],
+            "patterns": json.loads(row[4]),
+            "targets": json.loads(row[5]) if row[5] else None,
+        }
+
+    def put_scores(self, rows: Iterable[dict], scoring_version: str) -> None:
+        """Store scored videos; each row needs video_id, text_hash, snippet and the scores."""
+        now = self._clock()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO videos (video_id, text_hash, scoring_version, snippet, "
+                "ml_score, rule_score, dox_score, severity, patterns, targets, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        row["video_id"],
+                        row["text_hash"],
+                        scoring_version,
+                        json.dumps(row.get("snippet", {})),
+                        float(row["ml_score"]),
+                        float(row["rule_score"]),
+                        float(row["dox_score"]),
+                        row["severity"],
+                        json.dumps(row["patterns"]),
+                        json.dumps(row["targets"]) if row.get("targets") else None,
+                        now,
+                    )
+                    for row in rows
+                ],
+            )
+
+    # ----- maintenance -----
+    def evict(self) -> None:
+        """Drop expired rows, then the oldest rows beyond the size caps."""
+        now = self._clock()
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM pages WHERE fetched_at < ?", (now - self.page_ttl,))
+            self._conn.execute("DELETE FROM videos WHERE updated_at < ?", (now - self.video_ttl,))
+            self._conn.execute(
+                "DELETE FROM pages WHERE key IN "
+                "(SELECT key FROM pages ORDER BY fetched_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_pages,),
+            )
+            self._conn.execute(
+                "DELETE FROM videos WHERE video_id IN "
+                "(SELECT video_id FROM videos ORDER BY updated_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_videos,),
+            )
+
+    def summary(self) -> str:
+        s = self.stats
+        return (
+            f"pages {s['page_hits']} hit / {s['page_misses']} miss, "
+            f"videos {s['video_hits']} hit / {s['video_misses']} miss"
+        )
+
+    def close(self) -> None:
+        self.evict()
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,170 @@
+"""Near-duplicate clustering of reuploads (MinHash + LSH).
+
+Each hit is reduced to a MinHash signature of the word shingles of its
+normalized title + description. Signatures are cut into ``BANDS`` bands of
+``ROWS_PER_BAND`` values; two videos sharing any band bucket are candidates,
+and a candidate cluster is joined when the signature agrees with the
+cluster's representative on at least ``SIMILARITY_THRESHOLD`` of its values
+(estimated Jaccard similarity). A lookup touches a handful of indexed
+buckets, so assigning a video costs the same with 100 or 1M clusters.
+
+The index (clusters, members, band buckets) lives in SQLite next to the
+scan cache and persists across runs: a reupload found weeks later joins the
+cluster of the original. A cluster id is the ``video_id`` of its first
+member.
+"""
+import hashlib
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import List
+
+NUM_PERM = 64
+BANDS = 16
+ROWS_PER_BAND = NUM_PERM // BANDS  # seuil LSH ~ (1/16) ** (1/4) = 0.5
+SHINGLE_WORDS = 2
+SIMILARITY_THRESHOLD = 0.5
+HASH_SEED = 20240611  # fige: les signatures sont persistees
+
+_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS clusters (
+    cluster_id TEXT PRIMARY KEY,
+    signature BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS members (
+    video_id TEXT PRIMARY KEY,
+    cluster_id TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS buckets (
+    band INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,
+    cluster_id TEXT NOT NULL,
+    PRIMARY KEY (band, bucket, cluster_id)
+) WITHOUT ROWID;
+"""
+
+
+def _permutations():
+    import numpy as np
+
+    rng = np.random.default_rng(HASH_SEED)
+    a = rng.integers(1, 1 << 31, size=NUM_PERM, dtype=np.uint64)
+    b = rng.integers(0, 1 << 31, size=NUM_PERM, dtype=np.uint64)
+    return a[:, None], b[:, None]
+
+
+_PERMS = None
+
+
+def shingles(text: str, size: int = SHINGLE_WORDS) -> List[str]:
+    """Word n-grams of a normalized text (the words themselves when shorter)."""
+    words = text.split()
+    if len(words) <= size:
+        return [" ".join(words)] if words else []
+    return [" ".join(words[i:i + size]) for i in range(len(words) - size + 1)]
+
+
+def minhash(text: str):
+    """MinHash signature (uint64[NUM_PERM]) of a normalized text; None if it has no words."""
+    import numpy as np
+
+    global _PERMS
+    tokens = shingles(text)
+    if not tokens:
+        return None
+    if _PERMS is None:
+        _PERMS = _permutations()
+    a, b = _PERMS
+    # crc32: stable d'un process a l'autre (hash() est sale)
+    x = np.fromiter((zlib.crc32(t.encode("utf-8")) for t in set(tokens)), dtype=np.uint64)
+    # a, b < 2**31 et x < 2**32: a * x + b tient dans un uint64
+    return ((a * x[None, :] + b) % _PRIME & _MAX_HASH).min(axis=1)
+
+
+def similarity(sig_a, sig_b) -> float:
+    """Estimated Jaccard similarity of two signatures."""
+    return float((sig_a == sig_b).mean())
+
+
+def band_keys(signature) -> List[int]:
+    """One signed 64-bit bucket key per band (SQLite INTEGER)."""
+    rows = signature.reshape(BANDS, ROWS_PER_BAND)
+    return [
+        int.from_bytes(hashlib.blake2b(row.tobytes(), digest_size=8).digest(), "little", signed=True)
+        for row in rows
+    ]
+
+
+class ClusterIndex:
+    """Persistent LSH index; thread-safe like ``ScanCache``."""
+
+    def __init__(self, path, threshold: float = SIMILARITY_THRESHOLD, clock=time.time):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.threshold = threshold
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def assign(self, video_id: str, signature) -> str:
+        """Cluster id of ``video_id``: a known cluster it is close to, or a new one."""
+        import numpy as np
+
+        if signature is None:
+            return video_id
+        keys = band_keys(signature)
+        with self._lock, self._conn:
+            known = self._conn.execute(
+                "SELECT cluster_id FROM members WHERE video_id = ?", (video_id,)
+            ).fetchone()
+            if known:
+                return known[0]
+
+            # OR de couples (et non "(band, bucket) IN (VALUES ...)"): SQLite garde la cle primaire
+            matches = " OR ".join("(band = ? AND bucket = ?)" for _ in keys)
+            candidates = self._conn.execute(
+                "SELECT cluster_id, signature FROM clusters WHERE cluster_id IN "
+                f"(SELECT cluster_id FROM buckets WHERE {matches})",
+                [v for band, key in enumerate(keys) for v in (band, key)],
+            ).fetchall()
+            best, best_score = None, self.threshold
+            for cluster_id, blob in candidates:
+                score = similarity(signature, np.frombuffer(blob, dtype=np.uint64))
+                if score >= best_score:
+                    best, best_score = cluster_id, score
+
+            if best is None:
+                best = video_id
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO clusters (cluster_id, signature, size, created_at) VALUES (?, ?, 1, ?)",
+                    (best, np.asarray(signature, dtype=np.uint64).tobytes(), self._clock()),
+                )
+            else:
+                self._conn.execute("UPDATE clusters SET size = size + 1 WHERE cluster_id = ?", (best,))
+            self._conn.execute("INSERT INTO members (video_id, cluster_id) VALUES (?, ?)", (video_id, best))
+            # Les bandes du nouveau membre elargissent la zone de capture du cluster
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO buckets (band, bucket, cluster_id) VALUES (?, ?, ?)",
+                [(band, key, best) for band, key in enumerate(keys)],
+            )
+        return best
+
+    def cluster_of(self, video_id: str):
+        """Cluster id of an already indexed video, else None."""
+        with self._lock:
+            row = self._conn.execute("SELECT cluster_id FROM members WHERE video_id = ?", (video_id,)).fetchone()
+        return row[0] if row else None
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
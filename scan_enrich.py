@@ -0,0 +1,300 @@
+"""Second-stage enrichment of candidate hits (videos.list + commentThreads).
+
+Search results only carry a truncated snippet. Rows at or above their
+target's ``MIN_DOX_SCORE`` are buffered until ``BATCH_SIZE`` distinct
+videos are waiting. One ``videos.list`` call (up to 50 ids, 1 quota unit)
+then fetches their full description and tags. The top comment threads of
+each video (1 unit per video) are fetched on ``ENRICH_WORKERS`` threads.
+Each candidate is scored again on title + description + tags + comments
+and keeps the higher of its two scores. Rows below the threshold pass
+through untouched, so the extra quota is bounded by the number of
+candidates. A video that only becomes a hit here is added to the reupload
+cluster index (``clusters``) on its full title + description.
+
+Disabled comments, deleted videos and other per-video errors only skip
+that video. A quota error or an exhausted budget stops enrichment for the
+rest of the run, and the remaining candidates keep their snippet score.
+"""
+import os
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
+
+from requests.exceptions import RequestException
+
+import scan_kpop_doxhunter as scanner
+from scan_clusters import ClusterIndex, minhash
+from scan_metrics import NULL_METRICS, NullMetrics
+from scan_quota import COMMENT_THREADS_COST, VIDEOS_LIST_COST, QuotaScheduler, parse_retry_after
+
+BATCH_SIZE = 50  # maximum d'ids par appel videos.list
+MAX_COMMENTS = 20  # fils de commentaires par video (ordre "relevance")
+ENRICH_WORKERS = 4
+# Raisons d'un 403 qui concernent le quota (les autres ne visent qu'une video)
+QUOTA_REASONS = {"quotaExceeded", "dailyLimitExceeded", "rateLimitExceeded", "userRateLimitExceeded"}
+
+
+def get_enrich_workers() -> int:
+    try:
+        return max(1, int(os.getenv("ENRICH_WORKERS", ENRICH_WORKERS)))
+    except ValueError:
+        return ENRICH_WORKERS
+
+
+def get_max_comments() -> int:
+    try:
+        return min(100, max(1, int(os.getenv("ENRICH_MAX_COMMENTS", MAX_COMMENTS))))
+    except ValueError:
+        return MAX_COMMENTS
+
+
+class QuotaBlocked(Exception):
+    """Quota error (403/429) or daily budget exhausted."""
+
+    def __init__(self, reason: Optional[str], budget: bool = False):
+        super().__init__(reason)
+        self.budget = budget
+
+
+def error_reason(resp) -> Optional[str]:
+    try:
+        errors = resp.json().get("error", {}).get("errors") or [{}]
+        return errors[0].get("reason")
+    except (ValueError, AttributeError):
+        return None
+
+
+def api_get(
+    session,
+    url: str,
+    params: Dict,
+    scheduler: QuotaScheduler,
+    cost: int,
+    stop_event: threading.Event,
+    metrics: NullMetrics = NULL_METRICS,
+) -> Optional[dict]:
+    """GET a Data API endpoint with the scanner's retry policy.
+
+    Returns the JSON body, or None when the resource is not available
+    (4xx other than quota, network errors after the retries, invalid JSON).
+    Raises ``QuotaBlocked`` on quota errors or when the budget is spent.
+    """
+    for attempt in range(1, scanner.RETRY_ATTEMPTS + 1):
+        if stop_event.is_set():
+            return None
+        if not scheduler.try_spend(cost):
+            raise QuotaBlocked("budget", budget=True)
+        try:
+            with metrics.timer("http_request_seconds"):
+                resp = session.get(url, params=params, timeout=scanner.REQUEST_TIMEOUT)
+        except RequestException as exc:
+            metrics.inc("http_responses_total", status="error")
+            print(f"[WARN] Enrichment request failed (attempt {attempt}/{scanner.RETRY_ATTEMPTS}): {exc}")
+            if attempt < scanner.RETRY_ATTEMPTS:
+                metrics.inc("retries_total", reason="network")
+                scheduler.sleep(scheduler.backoff_delay(attempt), stop_event)
+            continue
+        status = resp.status_code
+        metrics.inc("http_responses_total", status=status)
+        if status == 429 and attempt < scanner.RETRY_ATTEMPTS:
+            headers = getattr(resp, "headers", None) or {}
+            retry_after = parse_retry_after(headers.get("Retry-After"), scheduler.clock.now())
+            metrics.inc("retries_total", reason="rate_limit")
+            scheduler.sleep(scheduler.backoff_delay(attempt, retry_after), stop_event)
+            continue
+        if status in (403, 429):
+            reason = error_reason(resp)
+            if status == 429 or reason in QUOTA_REASONS:
+                raise QuotaBlocked(reason)
+            return None  # commentsDisabled, video privee...
+        if 400 <= status < 500:
+            return None
+        if status >= 500:
+            if attempt < scanner.RETRY_ATTEMPTS:
+                metrics.inc("retries_total", reason="server")
+                scheduler.sleep(scheduler.backoff_delay(attempt), stop_event)
+            continue
+        try:
+            data = resp.json()
+        except ValueError:
+            return None
+        return data if isinstance(data, dict) else None
+    return None
+
+
+def combined_text(snippet: dict, comments: Sequence[str]) -> str:
+    """Normalized title + full description + tags + comments."""
+    parts = [snippet.get("title") or "", snippet.get("description") or "", " ".join(snippet.get("tags") or [])]
+    parts.extend(comments)
+    return " ".join(filter(None, (scanner.normalize_text(part) for part in parts)))
+
+
+class Enricher:
+    """Buffers candidate rows and enriches them ``BATCH_SIZE`` videos at a time."""
+
+    RESCORED = ("ml_score", "matched_example", "rule_score", "dox_score", "severity")
+
+    def __init__(
+        self,
+        session,
+        api_key: str,
+        model,
+        scheduler: Optional[QuotaScheduler] = None,
+        metrics: NullMetrics = NULL_METRICS,
+        batch_size: int = BATCH_SIZE,
+        max_comments: Optional[int] = None,
+        workers: Optional[int] = None,
+        clusters: Optional[ClusterIndex] = None,
+    ):
+        self.session = session
+        self.api_key = api_key
+        self.model = model
+        self.scheduler = scheduler or QuotaScheduler(backoff_base=scanner.RETRY_BACKOFF_SECONDS)
+        self.metrics = metrics
+        self.batch_size = max(1, min(batch_size, BATCH_SIZE))
+        self.max_comments = max_comments or get_max_comments()
+        self.workers = workers or get_enrich_workers()
+        self.clusters = clusters
+        self.stop_event = threading.Event()
+        self.quota_blocked = False
+        self.budget_exhausted = False
+        self.stats = Counter()
+        self._lock = threading.Lock()
+        self._pending: Dict[str, List[dict]] = {}
+
+    @property
+    def active(self) -> bool:
+        return not (self.quota_blocked or self.budget_exhausted)
+
+    def iter_rows(self, rows: Iterable[dict]) -> Iterator[dict]:
+        """Pass rows through; candidates come out (enriched) once their batch is full."""
+        for row in rows:
+            if self.active and scanner.is_candidate(row, self.model):
+                self._pending.setdefault(row["video_id"], []).append(row)
+                if len(self._pending) >= self.batch_size:
+                    yield from self.flush()
+            else:
+                yield row
+        yield from self.flush()
+
+    def flush(self) -> List[dict]:
+        pending, self._pending = self._pending, {}
+        if not pending or not self.active:
+            return [row for rows in pending.values() for row in rows]
+
+        with self.metrics.timer("stage_seconds", stage="enrich"):
+            details = self._fetch_details(list(pending))
+            comments = self._fetch_comments([video_id for video_id in pending if video_id in details])
+            video_ids = list(details)
+            texts = [combined_text(details[video_id], comments.get(video_id, [])) for video_id in video_ids]
+            scores = dict(zip(video_ids, scanner.score_batch(texts, self.model).to_dict("records")))
+
+        out = []
+        for video_id, rows in pending.items():
+            score = scores.get(video_id)
+            if score is not None:
+                self.stats["videos_enriched"] += 1
+            if score is None:
+                out.extend(rows)
+                continue
+            rescored = [self._rescored(row, score) for row in rows]
+            if self.clusters is not None and not any(scanner.is_hit(row, self.model) for row in rows) and any(
+                scanner.is_hit(row, self.model) for row in rescored
+            ):
+                # Hit grace a l'enrichissement: pas encore passe par l'index des reuploads
+                cluster_id = self._cluster(video_id, details[video_id])
+                rescored = [dict(row, cluster_id=cluster_id) for row in rescored]
+            out.extend(rescored)
+        return out
+
+    def _cluster(self, video_id: str, snippet: dict) -> str:
+        with self.metrics.timer("stage_seconds", stage="cluster"):
+            title = scanner.normalize_text(snippet.get("title") or "")
+            description = scanner.normalize_text(snippet.get("description") or "")
+            return self.clusters.assign(video_id, minhash(f"{title} {description}".strip()))
+
+    def _rescored(self, row: dict, score: dict) -> dict:
+        target_score = (score.get("targets") or {}).get(row.get("target"))
+        fresh = scanner.make_report_row(
+            row["query"], row["video_id"], row["title"], {**score, **(target_score or {})}, row["timestamp"]
+        )
+        if fresh["dox_score"] <= row["dox_score"]:
+            return row
+        # Score plus haut grace a la description complete / aux commentaires
+        self.stats["rows_rescored_up"] += 1
+        self.metrics.inc("enrich_rescored_total")
+        updated = dict(row)
+        for key, value in fresh.items():
+            if key in self.RESCORED or key.startswith(scanner.PATTERN_PREFIX):
+                updated[key] = value
+        return updated
+
+    def _blocked(self, exc: QuotaBlocked) -> None:
+        with self._lock:
+            if not self.active:
+                return
+            self._block(exc)
+
+    def _block(self, exc: QuotaBlocked) -> None:
+        if exc.budget:
+            self.budget_exhausted = True
+            self.metrics.inc("budget_exhausted_total")
+        else:
+            self.quota_blocked = True
+            self.metrics.inc("quota_blocks_total", status="enrich")
+        self.stop_event.set()
+        print(f"[WARN] Enrichment stopped ({exc}); remaining candidates keep their snippet score.")
+
+    def _fetch_details(self, video_ids: Sequence[str]) -> Dict[str, dict]:
+        params = {"part": "snippet", "id": ",".join(video_ids), "key": self.api_key, "maxResults": BATCH_SIZE}
+        try:
+            data = api_get(
+                self.session, scanner.YOUTUBE_VIDEOS_URL, params, self.scheduler, VIDEOS_LIST_COST,
+                self.stop_event, self.metrics,
+            )
+        except QuotaBlocked as exc:
+            self._blocked(exc)
+            return {}
+        self.stats["videos_list_calls"] += 1
+        details = {}
+        for item in (data or {}).get("items", []):
+            if isinstance(item, dict) and item.get("id") in video_ids:
+                details[item["id"]] = item.get("snippet") or {}
+        return details
+
+    def _fetch_comments(self, video_ids: Sequence[str]) -> Dict[str, List[str]]:
+        if not video_ids:
+            return {}
+        # Concurrence bornee: au plus ``workers`` appels commentThreads en vol
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="yt-enrich") as pool:
+            return dict(zip(video_ids, pool.map(self._comments_for, video_ids)))
+
+    def _comments_for(self, video_id: str) -> List[str]:
+        if self.stop_event.is_set():
+            return []
+        params = {
+            "part": "snippet",
+            "videoId": video_id,
+            "maxResults": self.max_comments,
+            "order": "relevance",
+            "textFormat": "plainText",
+            "key": self.api_key,
+        }
+        try:
+            data = api_get(
+                self.session, scanner.YOUTUBE_COMMENT_THREADS_URL, params, self.scheduler, COMMENT_THREADS_COST,
+                self.stop_event, self.metrics,
+            )
+        except QuotaBlocked as exc:
+            self._blocked(exc)
+            return []
+        with self._lock:
+            self.stats["comment_thread_calls"] += 1
+        texts = []
+        for thread in (data or {}).get("items", []):
+            comment = thread.get("snippet", {}).get("topLevelComment", {}).get("snippet", {})
+            text = comment.get("textOriginal") or comment.get("textDisplay")
+            if text:
+                texts.append(text)
+        return texts
@@ -0,0 +1,265 @@
+"""Reviewer feedback: dashboard labels and an online false-positive model.
+
+Reviewers mark report rows as a confirmed dox (``tp``) or a false positive
+(``fp``) from the dashboard. Labels are kept in SQLite
+(``state/feedback.sqlite``, one label per video and target, the latest one
+wins). Each new label immediately updates a small online classifier: a
+``HashingVectorizer`` (no vocabulary, so nothing to refit) feeding a
+logistic ``SGDClassifier`` trained with ``partial_fit``. The model is then
+saved atomically to ``state/feedback_model.joblib``. A label costs a few
+milliseconds. Clicking the same label again changes nothing; reversing a
+label retrains the model from the stored labels, so the old step is gone.
+
+Scanners read the saved model through ``FeedbackFilter``, which reloads it
+whenever the file changes, so a running watch picks up new labels without a
+restart. The model is used once it has seen ``FEEDBACK_MIN_LABELS`` labels
+of both kinds. From then on every hit gets an ``fp_prob`` (probability of a
+false positive), and hits at or above ``FP_THRESHOLD`` are suppressed.
+Without a ready model, reports are unchanged.
+
+The model reads the normalized report title, the text both the dashboard
+and the scanner have for a row.
+"""
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import scan_kpop_doxhunter as scanner
+
+FEEDBACK_MIN_LABELS = 20  # labels (des deux classes) avant d'appliquer le modele
+FP_THRESHOLD = 0.8
+HASH_FEATURES = 2 ** 18
+LABELS = {"tp": 1, "fp": 0}
+MODEL_FORMAT = 1
+LOOKUP_CHUNK = 400  # cles par requete: 2 variables par cle, sous la limite de 999 des vieux SQLite
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS labels (
+    video_id TEXT NOT NULL,
+    target TEXT NOT NULL,
+    label INTEGER NOT NULL,
+    title TEXT NOT NULL,
+    labelled_at REAL NOT NULL,
+    PRIMARY KEY (video_id, target)
+);
+"""
+
+
+def get_min_labels() -> int:
+    try:
+        return max(1, int(os.getenv("FEEDBACK_MIN_LABELS", FEEDBACK_MIN_LABELS)))
+    except ValueError:
+        return FEEDBACK_MIN_LABELS
+
+
+def get_fp_threshold() -> float:
+    try:
+        return min(1.0, max(0.0, float(os.getenv("FP_THRESHOLD", FP_THRESHOLD))))
+    except ValueError:
+        return FP_THRESHOLD
+
+
+def store_path() -> str:
+    return os.path.join(scanner.get_state_dir(), "feedback.sqlite")
+
+
+def model_path() -> str:
+    return os.path.join(scanner.get_state_dir(), "feedback_model.joblib")
+
+
+def _vectorizer():
+    from sklearn.feature_extraction.text import HashingVectorizer
+
+    # Sans etat: le meme vectoriseur cote dashboard et cote scanner
+    return HashingVectorizer(n_features=HASH_FEATURES, ngram_range=(1, 2), alternate_sign=False, norm="l2")
+
+
+class FeedbackStore:
+    """Labels of report rows, keyed by (video_id, target); thread-safe."""
+
+    def __init__(self, path, clock=time.time):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+
+    def add(self, video_id: str, target: str, label: str, title: str) -> Optional[int]:
+        """Store a label; returns the label it replaced (None for a new row)."""
+        if label not in LABELS:
+            raise ValueError(f"unknown label {label!r} (expected one of {sorted(LABELS)})")
+        with self._lock, self._conn:
+            previous = self._conn.execute(
+                "SELECT label FROM labels WHERE video_id = ? AND target = ?", (video_id, target)
+            ).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO labels (video_id, target, label, title, labelled_at) VALUES (?, ?, ?, ?, ?)",
+                (video_id, target, LABELS[label], title, self._clock()),
+            )
+        return previous[0] if previous else None
+
+    def labels_for(self, keys: Iterable[Tuple[str, str]]) -> Dict[Tuple[str, str], str]:
+        """{(video_id, target): "tp" | "fp"} for the labelled keys among ``keys``."""
+        keys = list(keys)
+        names = {value: name for name, value in LABELS.items()}
+        found = {}
+        for start in range(0, len(keys), LOOKUP_CHUNK):
+            chunk = keys[start:start + LOOKUP_CHUNK]
+            matches = " OR ".join("(video_id = ? AND target = ?)" for _ in chunk)
+            with self._lock:
+                rows = self._conn.execute(
+                    f"SELECT video_id, target, label FROM labels WHERE {matches}",
+                    [v for key in chunk for v in key],
+                ).fetchall()
+            found.update(((video_id, target), names[label]) for video_id, target, label in rows)
+        return found
+
+    def all(self) -> List[Tuple[str, int]]:
+        """(title, label) of every label, oldest first (model rebuild)."""
+        with self._lock:
+            return self._conn.execute("SELECT title, label FROM labels ORDER BY labelled_at").fetchall()
+
+    def counts(self) -> Dict[int, int]:
+        """Number of labelled rows per label value (one per video and target)."""
+        with self._lock:
+            rows = self._conn.execute("SELECT label, COUNT(*) FROM labels GROUP BY label").fetchall()
+        return {0: 0, 1: 0, **dict(rows)}
+
+    def revision(self) -> Tuple[int, float]:
+        """Changes whenever a label is added or replaced (dashboard ETag)."""
+        with self._lock:
+            count, latest = self._conn.execute("SELECT COUNT(*), MAX(labelled_at) FROM labels").fetchone()
+        return count, latest or 0.0
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class FeedbackModel:
+    """Online logistic regression over hashed title n-grams."""
+
+    def __init__(self):
+        from sklearn.linear_model import SGDClassifier
+
+        self.vectorizer = _vectorizer()
+        self.classifier = SGDClassifier(loss="log_loss", alpha=1e-4, random_state=0)
+        self.counts = {0: 0, 1: 0}
+
+    def learn(self, title: str, label: int) -> None:
+        """One ``partial_fit`` step on a labelled title (1 = confirmed dox, 0 = false positive)."""
+        X = self.vectorizer.transform([scanner.normalize_text(title)])
+        self.classifier.partial_fit(X, [label], classes=[0, 1])
+        self.counts[label] += 1
+
+    @classmethod
+    def train(cls, rows: Iterable[Tuple[str, int]]) -> "FeedbackModel":
+        """A new model fitted on ``(title, label)`` rows, oldest first."""
+        model = cls()
+        for title, label in rows:
+            model.learn(title, label)
+        return model
+
+    def ready(self, min_labels: Optional[int] = None) -> bool:
+        min_labels = min_labels or get_min_labels()
+        return all(self.counts.values()) and sum(self.counts.values()) >= min_labels
+
+    def fp_prob(self, titles: List[str]):
+        """Probability that each title is a false positive."""
+        X = self.vectorizer.transform([scanner.normalize_text(title) for title in titles])
+        return self.classifier.predict_proba(X)[:, list(self.classifier.classes_).index(0)]
+
+    def save(self, path) -> None:
+        import joblib
+
+        path = str(path)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = f"{path}.tmp"
+        joblib.dump({"format": MODEL_FORMAT, "classifier": self.classifier, "counts": self.counts}, tmp)
+        # Remplacement atomique: un scanner ne lit jamais un fichier a moitie ecrit
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path) -> Optional["FeedbackModel"]:
+        import joblib
+
+        try:
+            artifact = joblib.load(str(path))
+        except FileNotFoundError:
+            return None
+        except Exception as exc:  # fichier corrompu ou pickle incompatible
+            print(f"[WARN] Failed to load feedback model '{path}': {exc}")
+            return None
+        if not isinstance(artifact, dict) or artifact.get("format") != MODEL_FORMAT:
+            return None
+        model = cls()
+        model.classifier = artifact["classifier"]
+        model.counts = artifact["counts"]
+        return model
+
+
+class FeedbackLearner:
+    """Dashboard side: store a label and update + save the model, under one lock."""
+
+    def __init__(self, store: FeedbackStore, path=None):
+        self.store = store
+        self.path = path or model_path()
+        self._lock = threading.Lock()
+        self.model = FeedbackModel.load(self.path)
+        if self.model is None or self.model.counts != store.counts():
+            # Modele absent, format change ou desynchronise du store: on rejoue les labels stockes
+            self.model = FeedbackModel.train(store.all())
+            if self.model.counts[0] or self.model.counts[1]:
+                self.model.save(self.path)
+
+    def label(self, video_id: str, target: str, label: str, title: str) -> None:
+        with self._lock:
+            previous = self.store.add(video_id, target, label, title)
+            if previous == LABELS[label]:
+                return  # meme label (double clic, re-label): rien de nouveau a apprendre
+            if previous is None:
+                self.model.learn(title, LABELS[label])
+            else:
+                # Label inverse: le pas de gradient de l'ancien label ne se retire pas, on reentraine
+                self.model = FeedbackModel.train(self.store.all())
+            self.model.save(self.path)
+
+
+class FeedbackFilter:
+    """Scanner side: ``fp_prob`` of hits from the latest saved model (hot-swapped)."""
+
+    def __init__(self, path=None, threshold: Optional[float] = None, min_labels: Optional[int] = None):
+        self.path = path or model_path()
+        self.threshold = get_fp_threshold() if threshold is None else threshold
+        self.min_labels = min_labels
+        self._lock = threading.Lock()
+        self._key = None
+        self._model = None
+
+    def current(self) -> Optional[FeedbackModel]:
+        """The saved model if it is ready, reloaded when the file changed."""
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        key = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            if key != self._key:
+                model = FeedbackModel.load(self.path)
+                self._key = key
+                self._model = model if model is not None and model.ready(self.min_labels) else None
+            return self._model
+
+    def suppress(self, row: dict) -> bool:
+        """Set ``row["fp_prob"]``; True when the hit should be dropped as a false positive."""
+        model = self.current()
+        if model is None:
+            return False
+        prob = float(model.fp_prob([row["title"]])[0])
+        row["fp_prob"] = round(prob, 3)
+        return prob >= self.threshold
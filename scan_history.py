@@ -0,0 +1,251 @@
+"""Report history: every dox_report merged into one indexed SQLite store.
+
+``HistoryStore.ingest(reports_dir)`` reads each report file (Parquet or old
+CSV) once, batch by batch. A file is read again only when its mtime or size
+changes, which happens when an incremental run rewrites the latest report.
+Rows are aggregated per video, target and day (first/last sighting, best
+``dox_score``, worst severity, title of the best sighting), so the store
+grows with the number of distinct videos per day, not with the number of
+reports. Ingesting the same rows twice gives the same result.
+
+Queries (``video_history``, ``trend``, ``targets``) only touch the indexes:
+the primary key starts with ``video_id``, and ``(target, day)``, ``(day)``
+and ``(severity, day)`` are indexed. They answer in milliseconds whatever
+the number of reports.
+"""
+import os
+import sqlite3
+import threading
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from scan_report import list_reports
+
+INGEST_BATCH_ROWS = 50_000
+HISTORY_REFRESH_SECONDS = 30.0  # le dashboard re-scanne le dossier des rapports au plus aussi souvent
+TREND_DAYS = 30
+SEVERITY_RANK = {"UNKNOWN": 0, "LOW": 1, "MEDIUM": 2, "HIGH": 3, "CRITICAL": 4}
+_COLUMNS = ("video_id", "target", "title", "display_title", "dox_score", "severity", "timestamp")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS ingested (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    rows INTEGER NOT NULL,
+    ingested_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS daily (
+    video_id TEXT NOT NULL,
+    target TEXT NOT NULL,
+    day TEXT NOT NULL,
+    title TEXT NOT NULL,
+    first_seen TEXT NOT NULL,
+    last_seen TEXT NOT NULL,
+    dox_score REAL NOT NULL,
+    severity TEXT NOT NULL,
+    severity_rank INTEGER NOT NULL,
+    PRIMARY KEY (video_id, target, day)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS daily_target_day ON daily (target, day, severity, dox_score);
+CREATE INDEX IF NOT EXISTS daily_day ON daily (day, severity, dox_score);
+CREATE INDEX IF NOT EXISTS daily_severity_day ON daily (severity, day);
+"""
+
+# Les expressions du SET lisent l'ancienne ligne: l'ordre des affectations ne compte pas
+_UPSERT = """
+INSERT INTO daily (video_id, target, day, title, first_seen, last_seen, dox_score, severity, severity_rank)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (video_id, target, day) DO UPDATE SET
+    title = CASE WHEN excluded.dox_score > dox_score THEN excluded.title ELSE title END,
+    first_seen = min(first_seen, excluded.first_seen),
+    last_seen = max(last_seen, excluded.last_seen),
+    dox_score = max(dox_score, excluded.dox_score),
+    severity = CASE WHEN excluded.severity_rank > severity_rank THEN excluded.severity ELSE severity END,
+    severity_rank = max(severity_rank, excluded.severity_rank)
+"""
+
+
+def history_path() -> str:
+    import scan_kpop_doxhunter as scanner
+
+    return os.path.join(scanner.get_state_dir(), "history.sqlite")
+
+
+def _report_time(path: Path) -> datetime:
+    """Run time from the report name (dox_report_YYYYmmdd_HHMM...), else the file mtime."""
+    parts = path.stem.split("_")
+    try:
+        return datetime.strptime(f"{parts[2]}_{parts[3]}", "%Y%m%d_%H%M")
+    except (IndexError, ValueError):
+        return datetime.fromtimestamp(path.stat().st_mtime)
+
+
+def iter_report_batches(path, batch_rows: int = INGEST_BATCH_ROWS):
+    """DataFrames of the history columns of a report, ``batch_rows`` at a time."""
+    import pandas as pd
+
+    path = Path(path)
+    if path.suffix == ".parquet":
+        import pyarrow.parquet as pq
+
+        parquet = pq.ParquetFile(path)
+        columns = [col for col in _COLUMNS if col in parquet.schema_arrow.names]
+        for batch in parquet.iter_batches(batch_size=batch_rows, columns=columns):
+            yield batch.to_pandas()
+    else:
+        # Compatibilite: anciens rapports CSV
+        yield from pd.read_csv(path, usecols=lambda col: col in _COLUMNS, chunksize=batch_rows)
+
+
+def aggregate_daily(frame, default_time: datetime):
+    """One row per (video_id, target, day) of a report batch, in the column order of ``daily``."""
+    import pandas as pd
+    from scan_targets import DEFAULT_TARGET
+
+    if "video_id" not in frame.columns:
+        return []
+    frame = frame[frame["video_id"].notna()]
+    n = len(frame)
+    times = pd.to_datetime(frame["timestamp"], errors="coerce") if "timestamp" in frame.columns else None
+    if times is None:
+        times = pd.Series(pd.NaT, index=frame.index, dtype="datetime64[ns]")
+    seen = times.fillna(pd.Timestamp(default_time)).dt.strftime("%Y-%m-%d %H:%M:%S").tolist()
+
+    def column(name, default):
+        if name not in frame.columns:
+            return [default] * n
+        return frame[name].astype(object).where(frame[name].notna(), default).tolist()
+
+    title = "display_title" if "display_title" in frame.columns else "title"
+    scores = pd.to_numeric(frame["dox_score"], errors="coerce").fillna(0.0).tolist()
+    daily = {}
+    # Boucle Python: les lots de rapports sont petits et presque tous les couples sont uniques
+    for video_id, target, when, name, score, severity in zip(
+        column("video_id", ""), column("target", DEFAULT_TARGET), seen, column(title, ""), scores,
+        column("severity", "UNKNOWN"),
+    ):
+        key = (str(video_id), target, when[:10])
+        rank = SEVERITY_RANK.get(severity, 0)
+        current = daily.get(key)
+        if current is None:
+            daily[key] = [str(name), when, when, score, severity, rank]
+            continue
+        if score > current[3]:
+            current[0], current[3] = str(name), score
+        current[1], current[2] = min(current[1], when), max(current[2], when)
+        if rank > current[5]:
+            current[4], current[5] = severity, rank
+    return [(*key, *values) for key, values in daily.items()]
+
+
+class HistoryStore:
+    """Per-video, per-day aggregates of every report; thread-safe."""
+
+    def __init__(self, path, clock=time.time):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._refreshed = None
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    # ----- ingestion -----
+    def ingest(self, reports_dir) -> int:
+        """Ingest new or rewritten reports of ``reports_dir``; returns the number of rows read."""
+        total = 0
+        for path in list_reports(reports_dir):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue  # rapport supprime entre le listing et la lecture
+            with self._lock:
+                known = self._conn.execute(
+                    "SELECT mtime_ns, size FROM ingested WHERE path = ?", (str(path),)
+                ).fetchone()
+            if known == (stat.st_mtime_ns, stat.st_size):
+                continue
+            total += self.ingest_report(path, stat)
+        return total
+
+    def ingest_report(self, path, stat=None) -> int:
+        path = Path(path)
+        stat = stat or path.stat()
+        default_time = _report_time(path)
+        count, daily = 0, []
+        try:
+            for batch in iter_report_batches(path):
+                count += len(batch)
+                daily.extend(aggregate_daily(batch, default_time))
+        except Exception as exc:  # rapport tronque / illisible: on reessaiera s'il change
+            print(f"[WARN] Failed to read report '{path}' for history: {exc}")
+            return 0
+        # Une transaction par rapport: un rapport est ingere en entier ou pas du tout
+        with self._lock, self._conn:
+            self._conn.executemany(_UPSERT, daily)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO ingested (path, mtime_ns, size, rows, ingested_at) VALUES (?, ?, ?, ?, ?)",
+                (str(path), stat.st_mtime_ns, stat.st_size, count, self._clock()),
+            )
+        return count
+
+    def refresh(self, reports_dir, min_interval: float = HISTORY_REFRESH_SECONDS) -> None:
+        """``ingest`` at most once per ``min_interval`` seconds (dashboard requests)."""
+        now = self._clock()
+        if self._refreshed is not None and now - self._refreshed < min_interval:
+            return
+        self._refreshed = now
+        self.ingest(reports_dir)
+
+    # ----- requetes -----
+    def _query(self, sql: str, params=()) -> List[Dict]:
+        with self._lock:
+            cursor = self._conn.execute(sql, params)
+            names = [d[0] for d in cursor.description]
+            return [dict(zip(names, row)) for row in cursor.fetchall()]
+
+    def video_history(self, video_id: str) -> List[Dict]:
+        """Daily sightings of a video (every target), oldest first."""
+        return self._query(
+            "SELECT target, day, title, first_seen, last_seen, dox_score, severity FROM daily "
+            "WHERE video_id = ? ORDER BY day, target",
+            (video_id,),
+        )
+
+    def trend(self, target: Optional[str] = None, days: int = TREND_DAYS, today: Optional[date] = None) -> List[Dict]:
+        """Per-day counts (videos and per severity) and scores over the last ``days`` days."""
+        since = ((today or date.today()) - timedelta(days=days - 1)).isoformat()
+        where, params = "day >= ?", [since]
+        if target:
+            where, params = "target = ? AND day >= ?", [target, since]
+        return self._query(
+            "SELECT day, COUNT(*) AS videos, "
+            "SUM(severity = 'CRITICAL') AS critical, SUM(severity = 'HIGH') AS high, "
+            "SUM(severity = 'MEDIUM') AS medium, AVG(dox_score) AS avg_score, MAX(dox_score) AS max_score "
+            f"FROM daily WHERE {where} GROUP BY day ORDER BY day",
+            params,
+        )
+
+    def targets(self) -> List[str]:
+        with self._lock:
+            return [row[0] for row in self._conn.execute("SELECT DISTINCT target FROM daily ORDER BY target")]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def trend_slope(points: List[Dict], key: str = "videos") -> float:
+    """Least-squares slope of ``key`` per day over trend points (> 0: rising)."""
+    import numpy as np
+
+    if len(points) < 2:
+        return 0.0
+    days = np.array([date.fromisoformat(p["day"]).toordinal() for p in points], dtype=float)
+    values = np.array([p[key] or 0.0 for p in points], dtype=float)
+    return float(np.polyfit(days - days[0], values, 1)[0])
@@ -1,16 +1,60 @@
+"""KpopDoxHunter scanner: YouTube search + TF-IDF / regex dox scoring.
+
+pandas, numpy and scikit-learn are imported lazily (first scoring or report
+step) so that importing this module, ``--help`` or helpers such as
+``normalize_text`` stay cheap.
+"""
+from __future__ import annotations
+
+import argparse
 import os
 import re
+import sys
 import html
-import time
+import hashlib
+import json
+import operator
+import threading
 import unicodedata
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Dict, Tuple
+from functools import lru_cache
+from importlib import metadata
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, Sequence, Tuple
 
-import pandas as pd
 import requests
+from requests.adapters import HTTPAdapter
 from requests.exceptions import RequestException
-from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS, TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+
+from scan_cache import ScanCache, text_hash
+from scan_clusters import ClusterIndex, minhash
+from scan_metrics import NULL_METRICS, Metrics, NullMetrics, save_summary
+from scan_similarity import ExactIndex, get_similarity_index, index_version
+from scan_quota import DAILY_QUOTA_UNITS, SEARCH_COST, QuotaScheduler, parse_retry_after
+from scan_report import REPORT_COLUMNS as BASE_REPORT_COLUMNS
+from scan_targets import (
+    DEFAULT_TARGET,
+    Target,
+    TargetModel,
+    get_targets_file,
+    load_targets,
+    stack_corpora,
+    targets_by_query,
+)
+from scan_report import (
+    PATTERN_PREFIX,
+    ReportWriter,
+    csv_to_parquet,
+    find_latest_scan_report,
+    new_report_stem,
+    parquet_rows,
+    parquet_to_csv,
+)
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 # Configuration
 REQUEST_TIMEOUT = 10
@@ -19,6 +63,22 @@ HARD_MIN_SCORE = 0.30  # Filtre post-traitement pour limiter le bruit
 RETRY_ATTEMPTS = 3
 RETRY_BACKOFF_SECONDS = 1.5
 MAX_PAGES_PER_QUERY = 2  # Pagination cap to reduce quota usage
+MAX_FETCH_WORKERS = 4  # Requetes YouTube en parallele (une query par worker)
+YOUTUBE_SEARCH_URL = "https://www.googleapis.com/youtube/v3/search"
+YOUTUBE_VIDEOS_URL = "https://www.googleapis.com/youtube/v3/videos"
+YOUTUBE_COMMENT_THREADS_URL = "https://www.googleapis.com/youtube/v3/commentThreads"
+STATE_DIR = "state"  # Cache et etat persistant entre les runs
+MODEL_DIR = "models"  # Artefacts TF-IDF pre-calcules (build-model)
+MODEL_FORMAT = 1
+CACHE_ENABLED = True
+CLUSTERS_ENABLED = True  # Regroupement des reuploads (MinHash/LSH persistant)
+INCREMENTAL = False  # Ne chercher que les videos publiees depuis le dernier run
+METRICS_ENABLED = False  # Histogrammes de latence / compteurs par run
+ENRICH_ENABLED = False  # Details videos.list + commentaires pour les candidats (quota en plus)
+FEEDBACK_ENABLED = True  # Modele de faux positifs appris des labels du dashboard (si present)
+REPORTS_DIR = "reports"
+INCREMENTAL_REPORT_MAX_ROWS = 100_000  # au-dela (ou un autre jour), un run incremental ouvre un nouveau rapport
+REPLAY_DIR = "replay"  # sous-dossier de STATE_DIR / REPORTS_DIR pour les runs rejoues (REPLAY_CASSETTE)
 
 def get_max_pages() -> int:
     try:
@@ -28,6 +88,70 @@ def get_max_pages() -> int:
         return MAX_PAGES_PER_QUERY
 
 
+def get_max_workers() -> int:
+    try:
+        value = int(os.getenv("MAX_FETCH_WORKERS", MAX_FETCH_WORKERS))
+        return max(1, value)
+    except ValueError:
+        return MAX_FETCH_WORKERS
+
+
+def get_state_dir() -> str:
+    state_dir = os.getenv("STATE_DIR", STATE_DIR)
+    # Un rejeu a son propre etat: jamais de quota, repere ou cluster reel modifie
+    return os.path.join(state_dir, REPLAY_DIR) if replay_enabled() else state_dir
+
+
+def get_reports_dir() -> str:
+    return os.path.join(REPORTS_DIR, REPLAY_DIR) if replay_enabled() else REPORTS_DIR
+
+
+def get_model_dir() -> str:
+    return os.getenv("MODEL_DIR", MODEL_DIR)
+
+
+def get_incremental_report_max_rows() -> int:
+    try:
+        return max(1, int(os.getenv("INCREMENTAL_REPORT_MAX_ROWS", INCREMENTAL_REPORT_MAX_ROWS)))
+    except ValueError:
+        return INCREMENTAL_REPORT_MAX_ROWS
+
+
+def get_daily_quota() -> int:
+    try:
+        return max(0, int(os.getenv("DAILY_QUOTA_UNITS", DAILY_QUOTA_UNITS)))
+    except ValueError:
+        return DAILY_QUOTA_UNITS
+
+
+def cache_enabled() -> bool:
+    return os.getenv("CACHE_ENABLED", str(CACHE_ENABLED)).lower() not in ("0", "false", "no")
+
+
+def clusters_enabled() -> bool:
+    return os.getenv("CLUSTERS_ENABLED", str(CLUSTERS_ENABLED)).lower() not in ("0", "false", "no")
+
+
+def enrich_enabled() -> bool:
+    return os.getenv("ENRICH_ENABLED", str(ENRICH_ENABLED)).lower() in ("1", "true", "yes")
+
+
+def feedback_enabled() -> bool:
+    return os.getenv("FEEDBACK_ENABLED", str(FEEDBACK_ENABLED)).lower() not in ("0", "false", "no")
+
+
+def replay_enabled() -> bool:
+    return bool(os.getenv("REPLAY_CASSETTE"))
+
+
+def incremental_enabled() -> bool:
+    return os.getenv("INCREMENTAL", str(INCREMENTAL)).lower() in ("1", "true", "yes")
+
+
+def metrics_enabled() -> bool:
+    return os.getenv("METRICS_ENABLED", str(METRICS_ENABLED)).lower() in ("1", "true", "yes")
+
+
 QUERIES = [
     "Felix maison Seoul",
     "Felix address Seoul",
@@ -83,8 +207,21 @@ FRENCH_STOP_WORDS = {
     "le", "la", "les", "un", "une", "des", "et", "ou", "de", "du", "en",
     "dans", "au", "aux", "pour", "avec", "sur", "chez", "qui", "que",
 }
-STOP_WORDS = ENGLISH_STOP_WORDS.union(FRENCH_STOP_WORDS)
-STOP_WORDS = sorted(STOP_WORDS)
+
+
+@lru_cache(maxsize=1)
+def get_stop_words() -> List[str]:
+    """English (sklearn) + French stop words, sorted; imports sklearn on first use."""
+    from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS
+
+    return sorted(ENGLISH_STOP_WORDS.union(FRENCH_STOP_WORDS))
+
+
+def __getattr__(name):
+    # STOP_WORDS reste accessible comme avant, mais calcule a la demande
+    if name == "STOP_WORDS":
+        return get_stop_words()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # ===== REGEX PATTERNS (detection explicite) =====
 DOX_PATTERNS = {
@@ -136,60 +273,423 @@ DOX_PATTERNS = {
     ),
 }
 
+# Colonnes des rapports: une colonne entiere par categorie de pattern
+REPORT_COLUMNS = BASE_REPORT_COLUMNS + [PATTERN_PREFIX + name for name in DOX_PATTERNS]
+
+
+NORMALIZE_CACHE_SIZE = 4096  # les descriptions "boilerplate" reviennent d'une chaine a l'autre
+
 
 def normalize_text(text: str) -> str:
     """Unescape HTML, strip accents, lower, and collapse whitespace."""
-    text = html.unescape(text or "")
-    text = unicodedata.normalize("NFKD", text)
-    text = text.encode("ascii", "ignore").decode()
-    text = text.lower()
-    text = re.sub(r"\s+", " ", text).strip()
-    return text
+    return _normalize_cached(text or "")
+
+
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def _normalize_cached(text: str) -> str:
+    # Chemins rapides: pas d'entite sans "&", NFKD + ascii inutiles sur du texte ASCII
+    if "&" in text:
+        text = html.unescape(text)
+    if not text.isascii():
+        text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode()
+    # split() coupe sur les memes blancs que \s et que strip()
+    return " ".join(text.lower().split())
+
+
+# ===== MOTEUR DE REGLES (une passe) =====
+# Poids par categorie (plus grave = plus de points)
+RULE_WEIGHTS = {
+    "coords_gps": 0.40,         # GPS = CRITICAL
+    "adresse_coree": 0.30,      # Adresse precise
+    "adresse_numero": 0.25,     # Adresse structuree
+    "dox_keywords": 0.20,       # Mots-cles dox
+    "indication_domicile": 0.15,# Indication lieu
+    "distance_precise": 0.10,   # Distance
+    "stalking_terms": 0.10,     # Stalking
+    "infos_perso": 0.10,        # Infos personnelles
+}
+RULE_MATCH_CAP = 3  # cap a 3 occurrences par categorie
+
+# Categories purement lexicales: chaque mot entier (token \w+) compte une fois.
+# Doit rester aligne avec les alternatives de DOX_PATTERNS.
+KEYWORD_CATEGORIES = {
+    "indication_domicile": (
+        "vit", "habite", "live", "lives", "house", "maison", "apartment",
+        "appartement", "building", "immeuble", "fenetre", "window", "chez",
+        "home", "residence",
+    ),
+    "stalking_terms": (
+        "stalkin", "stalking", "suivre", "follow", "spotte", "spotted", "devant",
+        "derriere", "outside", "entrance", "porte", "door", "waiting", "fenetre",
+        "window",
+    ),
+    "dox_keywords": (
+        "address", "adresse", "location", "gps", "coordinates", "dox", "leak",
+        "private", "residence", "visit", "visite",
+    ),
+    "infos_perso": (
+        "phone", "numero", "email", "mail", "snap", "instagram", "insta", "kakao",
+    ),
+}
+# Mots qui doivent apparaitre (en token) pour que le pattern structurel puisse matcher
+PATTERN_GATES = {
+    "adresse_coree": frozenset(
+        ("seoul", "gangnam", "itaewon", "hongdae", "myeongdong", "yongsan", "mapo", "coree", "korea")
+    ),
+    "adresse_numero": frozenset(
+        ("street", "st", "avenue", "ave", "road", "rd", "rue", "chemin", "route",
+         "boulevard", "blvd", "apartment", "apt", "building")
+    ),
+    "distance_precise": frozenset(
+        ("minute", "minutes", "min", "km", "metre", "metres", "meter", "meters")
+    ),
+}
+
+_TOKEN_RE = re.compile(r"\w+")
+_DIGIT_RE = re.compile(r"\d")
+
+
+def _build_keyword_index() -> Dict[str, Tuple[str, ...]]:
+    index: Dict[str, Tuple[str, ...]] = {}
+    for category, words in KEYWORD_CATEGORIES.items():
+        for word in words:
+            index[word] = index.get(word, ()) + (category,)
+    return index
+
+
+_KEYWORD_INDEX = _build_keyword_index()
+
+
+def count_rule_matches(text: str) -> Dict[str, int]:
+    """Count DOX_PATTERNS matches per category in a single tokenization pass.
+
+    Word-list categories are counted from one tokenization of the text with
+    a keyword index; the structural patterns only run when their required
+    tokens (and a digit, where needed) are present. Counts are identical to
+    running every regex with ``findall``. Non-ASCII text falls back to the
+    plain regexes.
+    """
+    if not text.isascii():
+        return {name: len(regex.findall(text)) for name, regex in DOX_PATTERNS.items()}
+
+    counts = dict.fromkeys(DOX_PATTERNS, 0)
+    lowered = text.lower()
+    tokens = Counter(_TOKEN_RE.findall(lowered))
+    for word, categories in _KEYWORD_INDEX.items():
+        found = tokens.get(word)
+        if found:
+            for category in categories:
+                counts[category] += found
+    if "doxx" in lowered:
+        # dox+ => doxx, doxxx...
+        for token, found in tokens.items():
+            if token.startswith("doxx") and token.rstrip("x") == "do":
+                counts["dox_keywords"] += found
+
+    if not PATTERN_GATES["adresse_coree"].isdisjoint(tokens):
+        counts["adresse_coree"] = len(DOX_PATTERNS["adresse_coree"].findall(text))
+    if _DIGIT_RE.search(text):
+        if "." in text:
+            counts["coords_gps"] = len(DOX_PATTERNS["coords_gps"].findall(text))
+        for name in ("adresse_numero", "distance_precise"):
+            if not PATTERN_GATES[name].isdisjoint(tokens):
+                counts[name] = len(DOX_PATTERNS[name].findall(text))
+    return counts
 
 
 def compute_rule_score(text: str) -> Tuple[float, Dict[str, int]]:
     """Calcule un score base sur les patterns regex detectes."""
-    matches = {}
-    for pattern_name, regex in DOX_PATTERNS.items():
-        count = len(regex.findall(text))
-        matches[pattern_name] = count
-
-    # Poids par categorie (plus grave = plus de points)
-    weights = {
-        "coords_gps": 0.40,         # GPS = CRITICAL
-        "adresse_coree": 0.30,      # Adresse precise
-        "adresse_numero": 0.25,     # Adresse structuree
-        "dox_keywords": 0.20,       # Mots-cles dox
-        "indication_domicile": 0.15,# Indication lieu
-        "distance_precise": 0.10,   # Distance
-        "stalking_terms": 0.10,     # Stalking
-        "infos_perso": 0.10,        # Infos personnelles
-    }
+    matches = count_rule_matches(text)
 
     rule_score = 0.0
     for key, count in matches.items():
         if count > 0:
-            rule_score += weights.get(key, 0.05) * min(count, 3)  # cap a 3 occurrences
+            rule_score += RULE_WEIGHTS.get(key, 0.05) * min(count, RULE_MATCH_CAP)
 
     rule_score = min(rule_score, 1.0)
     return rule_score, matches
 
 
+# (niveau, dox_score minimal, rule_score minimal), du plus grave au moins grave
+SEVERITY_THRESHOLDS = (
+    ("CRITICAL", 0.65, 0.50),
+    ("HIGH", 0.45, 0.30),
+    ("MEDIUM", 0.25, None),
+)
+
+
 def compute_severity(composite_score: float, rule_score: float) -> str:
     """Determine le niveau de gravite."""
-    if composite_score >= 0.65 or rule_score >= 0.50:
-        return "CRITICAL"
-    elif composite_score >= 0.45 or rule_score >= 0.30:
-        return "HIGH"
-    elif composite_score >= 0.25:
-        return "MEDIUM"
-    else:
-        return "LOW"
+    for level, min_composite, min_rule in SEVERITY_THRESHOLDS:
+        if composite_score >= min_composite or (min_rule is not None and rule_score >= min_rule):
+            return level
+    return "LOW"
+
+
+def severities(composite_scores, rule_scores):
+    """``compute_severity`` over arrays (``np.select``, first matching level wins)."""
+    import numpy as np
+
+    composite_scores = np.asarray(composite_scores)
+    rule_scores = np.asarray(rule_scores)
+    conditions = [
+        (composite_scores >= min_composite) | (rule_scores >= min_rule)
+        if min_rule is not None
+        else composite_scores >= min_composite
+        for _, min_composite, min_rule in SEVERITY_THRESHOLDS
+    ]
+    levels = [level for level, _, _ in SEVERITY_THRESHOLDS]
+    return np.select(conditions, levels, default="LOW").astype(object)
+
+
+def model_fingerprint(corpus: Optional[Sequence[str]] = None) -> str:
+    """Version of the TF-IDF artifact: corpus, stop words and sklearn version."""
+    parts = [
+        str(MODEL_FORMAT),
+        metadata.version("scikit-learn"),
+        json.dumps(list(DOX_CORPUS if corpus is None else corpus)),
+        json.dumps(sorted(FRENCH_STOP_WORDS)),
+    ]
+    return hashlib.sha1("\n".join(parts).encode()).hexdigest()[:12]
+
+
+def model_path(fingerprint: Optional[str] = None) -> str:
+    return os.path.join(get_model_dir(), f"tfidf_{fingerprint or model_fingerprint()}.joblib")
+
+
+def fit_model(corpus: Optional[Sequence[str]] = None):
+    """Fit the TF-IDF vectorizer on ``corpus`` (DOX_CORPUS); returns (vectorizer, X_train)."""
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+    vectorizer = TfidfVectorizer(stop_words=get_stop_words(), strip_accents="unicode")
+    X_train = vectorizer.fit_transform(list(DOX_CORPUS if corpus is None else corpus))
+    return vectorizer, X_train
+
+
+def build_model(path: Optional[str] = None, corpus: Optional[Sequence[str]] = None) -> str:
+    """Fit the model and save it as a versioned joblib artifact; returns its path."""
+    import joblib
+
+    fingerprint = model_fingerprint(corpus)
+    path = path or model_path(fingerprint)
+    vectorizer, X_train = fit_model(corpus)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.tmp"
+    joblib.dump({"fingerprint": fingerprint, "vectorizer": vectorizer, "X_train": X_train}, tmp)
+    os.replace(tmp, path)
+    return path
+
+
+def load_model(path: Optional[str] = None, corpus: Optional[Sequence[str]] = None):
+    """Load a saved artifact; None when missing, stale or unreadable."""
+    import joblib
+
+    fingerprint = model_fingerprint(corpus)
+    path = path or model_path(fingerprint)
+    if not os.path.exists(path):
+        return None
+    try:
+        artifact = joblib.load(path)
+    except Exception as exc:  # artefact corrompu ou pickle incompatible
+        print(f"[WARN] Failed to load model artifact '{path}': {exc}")
+        return None
+    if artifact.get("fingerprint") != fingerprint:
+        return None
+    return artifact["vectorizer"], artifact["X_train"]
+
+
+@lru_cache(maxsize=8)
+def get_model(corpus: Optional[Tuple[str, ...]] = None):
+    """(vectorizer, X_train), loaded lazily from the artifact or built on first use."""
+    model = load_model(corpus=corpus)
+    if model is not None:
+        return model
+    try:
+        build_model(corpus=corpus)
+    except OSError as exc:
+        print(f"[WARN] Could not save model artifact: {exc}")
+        return fit_model(corpus)
+    return load_model(corpus=corpus) or fit_model(corpus)
+
+
+def get_targets() -> List[Target]:
+    """Targets of the config file (TARGETS_FILE), else the default QUERIES/DOX_CORPUS target."""
+    return load_targets(get_targets_file(), QUERIES, DOX_CORPUS, normalize_text)
+
+
+def get_target_model(targets: Tuple[Target, ...], index_kind: Optional[str] = None) -> TargetModel:
+    """Shared vectorizer over every target's corpus (one artifact per corpus union).
+
+    Each target is searched through a ``SIMILARITY_INDEX`` index (exact by default).
+    """
+    return _target_model(targets, index_kind or get_similarity_index())
+
+
+@lru_cache(maxsize=8)
+def _target_model(targets: Tuple[Target, ...], index_kind: str) -> TargetModel:
+    documents, rows, offsets = stack_corpora(targets)
+    corpus = None if list(documents) == list(DOX_CORPUS) else documents
+    vectorizer, X_documents = get_model(corpus)
+    return TargetModel(targets, vectorizer, X_documents, rows, offsets, index_kind)
+
+
+def score_batch(texts: Sequence[str], model=None, metrics: NullMetrics = NULL_METRICS) -> pd.DataFrame:
+    """Score a batch of normalized texts in one pass.
+
+    All texts are transformed into a single sparse matrix and compared to
+    the corpus with one sparse product, so a page (or a whole run) pays the
+    sklearn overhead once. Returns one row per text with ``ml_score``,
+    ``rule_score``, ``dox_score``, ``severity``, ``patterns`` and
+    ``example`` (the corpus example behind ``ml_score``, "" when unknown).
+
+    With a ``TargetModel`` the top-level scores are the best target's and a
+    ``targets`` column holds, per target name, its ``ml_score``,
+    ``dox_score``, ``severity``, ``example`` and ``match`` (an alias is in
+    the text, or the target has no aliases).
+    """
+    import numpy as np
+    import pandas as pd
+
+    columns = ["ml_score", "rule_score", "dox_score", "severity", "patterns", "example"]
+    multi = isinstance(model, TargetModel)
+    if multi:
+        columns.append("targets")
+    texts = list(texts)
+    if not texts:
+        return pd.DataFrame(columns=columns)
+
+    with metrics.timer("stage_seconds", stage="tfidf"):
+        if multi:
+            # (n_targets, n_texts): une seule transformation pour toutes les cibles
+            per_target, per_target_rows = model.neighbours(model.vectorizer.transform(texts))
+            best = per_target.argmax(axis=0)
+            ml_scores = per_target[best, np.arange(len(texts))]
+            examples = [model.example(t, per_target_rows[t, i]) for i, t in enumerate(best)]
+        else:
+            vectorizer, X_train = model if model is not None else get_model()
+            # Recherche exacte (n_corpus, n_texts) -> meilleure similarite par texte
+            scores, rows = ExactIndex(X_train).search(vectorizer.transform(texts))
+            ml_scores = scores[:, 0]
+            # Le tuple (vectorizer, X_train) ne porte pas son corpus: exemples connus pour DOX_CORPUS seulement
+            corpus = DOX_CORPUS if model is None else ()
+            examples = [corpus[row] if 0 <= row < len(corpus) else "" for row in rows[:, 0]]
+
+    with metrics.timer("stage_seconds", stage="rules"):
+        matched = [compute_rule_score(text) for text in texts]
+        rule_scores = np.fromiter((rule_score for rule_score, _ in matched), dtype=float, count=len(texts))
+        # Composite et gravite en colonnes (memes operations flottantes que composite())
+        dox_scores = composite(ml_scores, rule_scores)
+        data = {
+            "ml_score": ml_scores,
+            "rule_score": rule_scores,
+            "dox_score": dox_scores,
+            "severity": severities(dox_scores, rule_scores),
+            "patterns": [pattern_matches for _, pattern_matches in matched],
+            "example": examples,
+        }
+        if multi:
+            target_dox = composite(per_target, rule_scores[None, :])
+            target_severity = severities(target_dox, rule_scores[None, :])
+            data["targets"] = [
+                {
+                    target.name: {
+                        "ml_score": float(per_target[t, i]),
+                        "dox_score": float(target_dox[t, i]),
+                        "severity": target_severity[t, i],
+                        "example": model.example(t, per_target_rows[t, i]),
+                        "match": target.matches(text),
+                    }
+                    for t, target in enumerate(model.targets)
+                }
+                for i, text in enumerate(texts)
+            ]
+    with metrics.timer("stage_seconds", stage="dataframe"):
+        return pd.DataFrame(data, columns=columns)
+
+
+def composite(ml_score, rule_score):
+    """Composite dox score (floats or NumPy arrays)."""
+    return 0.40 * ml_score + 0.60 * rule_score
+
+
+def scoring_version(targets: Optional[Sequence[Target]] = None) -> str:
+    """Fingerprint of everything that influences scores (corpus, rules, weights, targets)."""
+    parts = [
+        json.dumps(DOX_CORPUS),
+        json.dumps(get_stop_words()),
+        json.dumps({name: rx.pattern for name, rx in DOX_PATTERNS.items()}),
+        json.dumps(RULE_WEIGHTS, sort_keys=True),
+        index_version(),
+    ]
+    if targets:
+        # Les seuils ne changent pas les scores, seulement le filtrage
+        parts.append(json.dumps([[t.name, t.corpus, t.aliases] for t in targets]))
+    return hashlib.sha1("\n".join(parts).encode()).hexdigest()[:12]
+
+
+def open_quota_scheduler() -> QuotaScheduler:
+    """Daily budget scheduler persisted in STATE_DIR/quota.json (in memory, unlimited, for a replay)."""
+    if replay_enabled():
+        # Aucune unite reelle depensee: le quota simule vient de REPLAY_QUOTA_AFTER
+        return QuotaScheduler(daily_budget=sys.maxsize, backoff_base=RETRY_BACKOFF_SECONDS)
+    return QuotaScheduler(
+        os.path.join(get_state_dir(), "quota.json"),
+        daily_budget=get_daily_quota(),
+        backoff_base=RETRY_BACKOFF_SECONDS,
+    )
+
+
+def open_cache() -> Optional[ScanCache]:
+    """Open the on-disk scan cache unless CACHE_ENABLED is off (or the run is a replay)."""
+    if not cache_enabled() or replay_enabled():
+        return None
+    return ScanCache(os.path.join(get_state_dir(), "scan_cache.sqlite"))
+
+
+def open_feedback_filter():
+    """Hot-swapped false-positive filter (``scan_feedback``) unless FEEDBACK_ENABLED is off."""
+    if not feedback_enabled():
+        return None
+    from scan_feedback import FeedbackFilter
+
+    return FeedbackFilter()
+
+
+def open_cluster_index() -> Optional[ClusterIndex]:
+    """Open the persistent reupload cluster index unless CLUSTERS_ENABLED is off."""
+    if not clusters_enabled():
+        return None
+    return ClusterIndex(os.path.join(get_state_dir(), "clusters.sqlite"))
+
+
+def _high_water_path() -> str:
+    return os.path.join(get_state_dir(), "high_water.json")
+
+
+def load_high_water() -> Dict[str, str]:
+    """Per-query publishedAt high-water marks from the previous incremental runs."""
+    try:
+        with open(_high_water_path(), encoding="utf-8") as fh:
+            marks = json.load(fh)
+    except (OSError, ValueError):
+        return {}
+    return marks if isinstance(marks, dict) else {}
+
+
+def save_high_water(marks: Dict[str, str]) -> None:
+    path = _high_water_path()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as fh:
+        json.dump(marks, fh, indent=2, sort_keys=True)
+    os.replace(tmp, path)
 
 
 def require_api_key() -> str:
     """Stop execution early when the API key is missing or placeholder."""
     key = os.getenv("YOUTUBE_API_KEY")
+    if replay_enabled() and (not key or key == "DEMO_KEY_CHANGE_ME"):
+        return "REPLAY"  # rejeu hors ligne: la cle n'est jamais envoyee ni enregistree
     if not key or key == "DEMO_KEY_CHANGE_ME":
         raise SystemExit(
             "[KpopDoxHunter] Missing YouTube API key. "
@@ -198,170 +698,708 @@ def require_api_key() -> str:
     return key
 
 
-def ml_dox_hunter():
-    api_key = require_api_key()
-
-    vectorizer = TfidfVectorizer(stop_words=STOP_WORDS, strip_accents="unicode")
-    X_train = vectorizer.fit_transform(DOX_CORPUS)
-
-    results = []
-    request_failures = 0
-    successful_fetch = False
-    quota_blocked = False
-    seen_ids = set()
-
-    max_pages_allowed = get_max_pages()
-    for query in QUERIES:
-        url = "https://www.googleapis.com/youtube/v3/search"
-        page_token = None
-        pages_fetched = 0
-
-        while True:
-            params = {
-                "part": "snippet",
-                "q": query,
-                "type": "video",
-                "key": api_key,
-                "maxResults": 15,
-            }
-            if page_token:
-                params["pageToken"] = page_token
-
-            data = None
-            for attempt in range(1, RETRY_ATTEMPTS + 1):
-                try:
-                    resp = requests.get(url, params=params, timeout=REQUEST_TIMEOUT)
-                    status = resp.status_code
-
-                    if status in (403, 429):
-                        quota_blocked = True
-                        request_failures += 1
-                        print(
-                            f"[WARN] Quota/forbidden for query '{query}' "
-                            f"(status={status}, attempt {attempt}/{RETRY_ATTEMPTS})"
-                        )
-                        break
-
+def make_session(pool_size: int = MAX_FETCH_WORKERS) -> requests.Session:
+    """Session with a connection pool sized for the fetch workers (TLS reuse).
+
+    ``REPLAY_CASSETTE`` / ``RECORD_CASSETTE`` swap in the offline replay or
+    the recording session of ``scan_replay``.
+    """
+    if os.getenv("REPLAY_CASSETTE") or os.getenv("RECORD_CASSETTE"):
+        import scan_replay
+
+        replay = scan_replay.get_replay_path()
+        if replay:
+            return scan_replay.ReplaySession.from_env(replay)
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    if os.getenv("RECORD_CASSETTE"):
+        return scan_replay.RecordingSession(session, scan_replay.get_record_path())
+    return session
+
+
+@dataclass
+class QueryFetch:
+    """Pages fetched for one query, in pagination order."""
+
+    query: str
+    pages: List[dict] = field(default_factory=list)
+    request_failures: int = 0
+    quota_blocked: bool = False
+    budget_exhausted: bool = False  # budget quotidien local epuise (pas une erreur)
+    network_calls: int = 0
+    newest_published: Optional[str] = None  # plus recent publishedAt vu (mode incremental)
+    oldest_published: Optional[str] = None
+    complete: bool = False  # pagination allee jusqu'au bout (ou jusqu'a une video deja vue)
+
+
+def fetch_query_pages(
+    session,
+    query: str,
+    api_key: str,
+    max_pages: int,
+    stop_event: threading.Event,
+    cache: Optional[ScanCache] = None,
+    published_after: Optional[str] = None,
+    scheduler: Optional[QuotaScheduler] = None,
+    metrics: NullMetrics = NULL_METRICS,
+) -> QueryFetch:
+    """Fetch up to ``max_pages`` result pages for one query.
+
+    Only pages with items are returned. A 403/429 sets ``stop_event`` so
+    every other worker stops before its next request (or retry sleep); a
+    429 is retried after ``Retry-After`` or a jittered backoff first. Each
+    network call is charged to ``scheduler``'s daily budget. Pages still
+    fresh in ``cache`` are served without a network call.
+    With ``published_after`` (incremental mode) results are requested
+    newest first, already-seen videos are dropped and pagination stops at
+    the first one.
+    """
+    result = QueryFetch(query)
+    page_token = None
+    if scheduler is None:
+        scheduler = QuotaScheduler(backoff_base=RETRY_BACKOFF_SECONDS)
+
+    while not stop_event.is_set():
+        params = {
+            "part": "snippet",
+            "q": query,
+            "type": "video",
+            "key": api_key,
+            "maxResults": 15,
+        }
+        if page_token:
+            params["pageToken"] = page_token
+        if published_after:
+            params["publishedAfter"] = published_after
+            params["order"] = "date"
+
+        data = cache.get_page(params) if cache is not None else None
+        resp = None
+        for attempt in range(1, RETRY_ATTEMPTS + 1):
+            if data is not None or stop_event.is_set():
+                break
+            if not scheduler.try_spend(SEARCH_COST):
+                result.budget_exhausted = True
+                metrics.inc("budget_exhausted_total")
+                break
+            result.network_calls += 1
+            try:
+                with metrics.timer("http_request_seconds"):
+                    resp = session.get(YOUTUBE_SEARCH_URL, params=params, timeout=REQUEST_TIMEOUT)
+                status = resp.status_code
+                metrics.inc("http_responses_total", status=status)
+                if status not in (403, 429):
                     resp.raise_for_status()
                     data = resp.json()
                     break
+                result.request_failures += 1
 
-                except RequestException as exc:
-                    request_failures += 1
-                    print(
-                        f"[WARN] Request failed for query '{query}' "
-                        f"(attempt {attempt}/{RETRY_ATTEMPTS}): {exc}"
-                    )
-                    code = getattr(getattr(exc, "response", None), "status_code", None)
-                    if code in (403, 429):
-                        quota_blocked = True
-                        break
+            except RequestException as exc:
+                result.request_failures += 1
+                print(
+                    f"[WARN] Request failed for query '{query}' "
+                    f"(attempt {attempt}/{RETRY_ATTEMPTS}): {exc}"
+                )
+                resp = getattr(exc, "response", None)
+                status = getattr(resp, "status_code", None)
+                metrics.inc("http_responses_total", status=status or "error")
+                if status not in (403, 429):
                     if attempt < RETRY_ATTEMPTS:
-                        time.sleep(RETRY_BACKOFF_SECONDS * attempt)
-                except ValueError:
-                    request_failures += 1
-                    print(
-                        f"[ERROR] Invalid JSON for query '{query}' "
-                        f"(status={resp.status_code})"
-                    )
-                    break
-
-            if quota_blocked:
-                break
-
-            if data is None or not isinstance(data, dict):
-                break
-
-            if "items" not in data:
+                        metrics.inc("retries_total", reason="network")
+                        # Interrompu des qu'un autre worker detecte le quota
+                        with metrics.timer("retry_sleep_seconds"):
+                            scheduler.sleep(scheduler.backoff_delay(attempt), stop_event)
+                    continue
+            except ValueError:
+                result.request_failures += 1
                 print(
-                    f"[WARN] No 'items' in response for query '{query}' "
-                    f"(status={resp.status_code}, error={data.get('error')})"
+                    f"[ERROR] Invalid JSON for query '{query}' "
+                    f"(status={resp.status_code})"
                 )
                 break
 
-            if not data["items"]:
-                break
-
-            successful_fetch = True
+            # 403 = quota epuise / interdit, 429 = rate limit (on attend puis on retente)
+            print(
+                f"[WARN] Quota/forbidden for query '{query}' "
+                f"(status={status}, attempt {attempt}/{RETRY_ATTEMPTS})"
+            )
+            if status == 429 and attempt < RETRY_ATTEMPTS:
+                headers = getattr(resp, "headers", None) or {}
+                retry_after = parse_retry_after(headers.get("Retry-After"), scheduler.clock.now())
+                metrics.inc("retries_total", reason="rate_limit")
+                with metrics.timer("retry_sleep_seconds"):
+                    scheduler.sleep(scheduler.backoff_delay(attempt, retry_after), stop_event)
+                continue
+            result.quota_blocked = True
+            metrics.inc("quota_blocks_total", status=status)
+            break
 
-            for video in data["items"]:
-                snippet = video.get("snippet", {})
-                raw_title = snippet.get("title") or ""
-                raw_description = snippet.get("description") or ""
-                video_id = video.get("id", {}).get("videoId")
+        if result.quota_blocked:
+            stop_event.set()
+            break
 
-                if not video_id or video_id in seen_ids:
-                    continue
+        if data is None or not isinstance(data, dict):
+            break
 
-                seen_ids.add(video_id)
+        if "items" not in data:
+            status = resp.status_code if resp is not None else "cached"
+            print(
+                f"[WARN] No 'items' in response for query '{query}' "
+                f"(status={status}, error={data.get('error')})"
+            )
+            break
 
-                title = normalize_text(raw_title)
-                description = normalize_text(raw_description)
-                text = f"{title} {description}".strip()
+        if not data["items"]:
+            result.complete = True
+            break
 
-                vec = vectorizer.transform([text])
-                ml_score = cosine_similarity(X_train, vec).max()
+        if cache is not None and resp is not None:
+            cache.put_page(params, data)
+
+        reached_known = False
+        if published_after:
+            fresh = [item for item in data["items"] if _is_newer(item, published_after)]
+            reached_known = len(fresh) < len(data["items"])
+            data = dict(data, items=fresh)
+        for item in data["items"]:
+            published = item.get("snippet", {}).get("publishedAt")
+            if published and (result.newest_published is None or published > result.newest_published):
+                result.newest_published = published
+            if published and (result.oldest_published is None or published < result.oldest_published):
+                result.oldest_published = published
+
+        if data["items"]:
+            result.pages.append(data)
+        page_token = data.get("nextPageToken")
+        # Coupe par max_pages, le quota ou un autre worker: incomplet (le repere ne doit pas sauter le trou)
+        result.complete = reached_known or not page_token
+        if result.complete or len(result.pages) >= max_pages:
+            break
 
-                rule_score, pattern_matches = compute_rule_score(text)
+    return result
+
+
+def advance_high_water(high_water: Dict[str, str], fetched: QueryFetch) -> None:
+    """Move the incremental mark of ``fetched.query`` as far as it is safe.
+
+    Results come newest first: a fetch cut short (page cap, quota, budget,
+    failure, stop) leaves unseen videos between the old mark and the oldest
+    one fetched. The mark then stays where it was; on a query's first run
+    (no mark yet) it starts at the oldest video fetched.
+    """
+    query = fetched.query
+    clean = fetched.complete and not (fetched.request_failures or fetched.quota_blocked or fetched.budget_exhausted)
+    if clean and fetched.newest_published:
+        high_water[query] = max(fetched.newest_published, high_water.get(query, ""))
+    elif query not in high_water and fetched.oldest_published:
+        high_water[query] = fetched.oldest_published
+
+
+def _is_newer(item: dict, published_after: str) -> bool:
+    published = item.get("snippet", {}).get("publishedAt")
+    # Sans date on ne peut pas savoir: on garde la video
+    return published is None or published > published_after
+
+
+def fetch_all_queries(
+    session,
+    queries: Sequence[str],
+    api_key: str,
+    max_pages: int,
+    max_workers: int,
+    cache: Optional[ScanCache] = None,
+    high_water: Optional[Dict[str, str]] = None,
+    scheduler: Optional[QuotaScheduler] = None,
+    metrics: NullMetrics = NULL_METRICS,
+) -> Iterator[QueryFetch]:
+    """Fetch queries concurrently and yield their results in query order.
+
+    At most ``max_workers`` queries are in flight. Once a worker hits the
+    quota, queued queries are skipped and in-flight ones stop early.
+    ``high_water`` maps a query to the publishedAt it was last scanned up to.
+    """
+    high_water = high_water or {}
+    if scheduler is None:
+        scheduler = QuotaScheduler(backoff_base=RETRY_BACKOFF_SECONDS)
+    stop_event = threading.Event()
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="yt-fetch")
+    try:
+        futures = [
+            executor.submit(
+                fetch_query_pages,
+                session,
+                query,
+                api_key,
+                max_pages,
+                stop_event,
+                cache,
+                high_water.get(query),
+                scheduler,
+                metrics,
+            )
+            for query in queries
+        ]
+        for future in futures:
+            yield future.result()
+    finally:
+        stop_event.set()
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+@dataclass
+class ScanStats:
+    """Counters of one run, filled while the pipeline streams."""
+
+    request_failures: int = 0
+    successful_fetch: bool = False
+    quota_blocked: bool = False
+    budget_exhausted: bool = False
+    videos_scored: int = 0
+    network_calls: Counter = field(default_factory=Counter)
+    hits_by_query: Counter = field(default_factory=Counter)
+    hits_by_severity: Counter = field(default_factory=Counter)
+    hits_by_target: Counter = field(default_factory=Counter)
+    suppressed: int = 0
+    high_water: Dict[str, str] = field(default_factory=dict)
+
+
+def make_report_row(
+    query: str, video_id: str, raw_title: str, score: dict, timestamp: datetime, target: str = DEFAULT_TARGET
+) -> dict:
+    """One report row from a ``score_batch`` record (scores rounded to 3 decimals)."""
+    import numpy as np
+
+    return {
+        "query": query,
+        "target": target,
+        "title": raw_title[:100],
+        "display_title": html.unescape(raw_title)[:100],
+        "video_id": video_id,
+        "cluster_id": video_id,  # propre cluster tant que l'index ne dit pas mieux
+        "ml_score": np.round(score["ml_score"], 3),
+        "matched_example": (score.get("example") or "")[:100],
+        "rule_score": np.round(score["rule_score"], 3),
+        "dox_score": np.round(score["dox_score"], 3),
+        "severity": score["severity"],
+        "fp_prob": None,  # rempli par FeedbackFilter quand un modele de feedback est pret
+        "timestamp": timestamp,
+        **{PATTERN_PREFIX + name: count for name, count in score["patterns"].items()},
+    }
 
-                composite_score = 0.40 * ml_score + 0.60 * rule_score
 
-                severity = compute_severity(composite_score, rule_score)
+def iter_target_rows(
+    query: str,
+    video_id: str,
+    raw_title: str,
+    score: dict,
+    timestamp: datetime,
+    query_targets: Optional[Dict[str, Tuple[str, ...]]] = None,
+) -> Iterator[dict]:
+    """Report rows of one scored video: one per target found by its query or matching it."""
+    targets = score.get("targets")
+    if not targets:
+        yield make_report_row(query, video_id, raw_title, score, timestamp)
+        return
+    from_query = query_targets.get(query, ()) if query_targets else ()
+    for name, target_score in targets.items():
+        if target_score["match"] or name in from_query:
+            yield make_report_row(query, video_id, raw_title, {**score, **target_score}, timestamp, target=name)
+
+
+def _thresholds(row: dict, model) -> Tuple[float, float]:
+    target = model.target(row.get("target")) if isinstance(model, TargetModel) else None
+    min_score = MIN_DOX_SCORE if target is None or target.min_dox_score is None else target.min_dox_score
+    hard_min = HARD_MIN_SCORE if target is None or target.hard_min_score is None else target.hard_min_score
+    return min_score, hard_min
+
+
+def is_candidate(row: dict, model=None) -> bool:
+    """Row above its target's MIN_DOX_SCORE: worth a closer look (enrichment)."""
+    return row["dox_score"] >= _thresholds(row, model)[0]
+
+
+def is_hit(row: dict, model=None) -> bool:
+    """Row above its target's thresholds (global MIN_DOX_SCORE / HARD_MIN_SCORE by default)."""
+    min_score, hard_min = _thresholds(row, model)
+    # Filtrage supplémentaire (HARD_MIN_SCORE) pour lisser le bruit
+    return row["dox_score"] >= min_score and row["dox_score"] >= hard_min
+
+
+def report_frame(
+    queries: Sequence[str],
+    video_ids: Sequence[str],
+    raw_titles: Sequence[str],
+    scores: "pd.DataFrame",
+    timestamp: datetime,
+    query_targets: Optional[Dict[str, Tuple[str, ...]]] = None,
+) -> "pd.DataFrame":
+    """Columnar ``iter_target_rows`` for a whole ``score_batch`` result.
+
+    Same rows, values and column order as ``make_report_row`` (scores
+    rounded with ``np.round``, one int64 column per pattern, one timestamp
+    for the batch), indexed by the position of each video in the batch.
+    Meant for large batches (rescore): filter it with ``hit_mask``, then
+    turn the hits into dicts with ``report_records``.
+    """
+    import numpy as np
+    import pandas as pd
+
+    targets = scores["targets"] if "targets" in scores else [None] * len(scores)
+    positions, names, ml, dox, severity, examples = [], [], [], [], [], []
+    for i, (query, per_target) in enumerate(zip(queries, targets)):
+        if not per_target:
+            continue
+        from_query = query_targets.get(query, ()) if query_targets else ()
+        for name, target_score in per_target.items():
+            if target_score["match"] or name in from_query:
+                positions.append(i)
+                names.append(name)
+                ml.append(target_score["ml_score"])
+                dox.append(target_score["dox_score"])
+                severity.append(target_score["severity"])
+                examples.append(target_score.get("example") or "")
+
+    single = np.fromiter((not t for t in targets), dtype=bool, count=len(scores))
+    if single.all():
+        # Pas de cibles: une ligne par video avec les scores globaux
+        pos = np.arange(len(scores))
+        names = [DEFAULT_TARGET] * len(scores)
+        ml, dox, severity = scores["ml_score"].to_numpy(), scores["dox_score"].to_numpy(), scores["severity"].to_numpy()
+        examples = _examples(scores)
+    else:
+        # Ordre de iter_target_rows: video par video, cibles dans l'ordre du modele
+        extra = np.flatnonzero(single)
+        pos = np.concatenate([np.asarray(positions, dtype=np.intp), extra])
+        names = names + [DEFAULT_TARGET] * len(extra)
+        ml = np.concatenate([np.asarray(ml, dtype=float), scores["ml_score"].to_numpy()[extra]])
+        dox = np.concatenate([np.asarray(dox, dtype=float), scores["dox_score"].to_numpy()[extra]])
+        severity = np.concatenate([np.asarray(severity, dtype=object), scores["severity"].to_numpy()[extra]])
+        examples = np.concatenate([np.asarray(examples, dtype=object), _examples(scores)[extra]])
+        order = np.argsort(pos, kind="stable")
+        pos, ml, dox, severity, examples = pos[order], ml[order], dox[order], severity[order], examples[order]
+        names = [names[j] for j in order]
+
+    def strings(values):
+        # object (et non StringDtype): les lignes redeviennent des dicts sans conversion
+        return pd.Series(values, dtype=object)
+
+    video_ids = np.asarray(video_ids, dtype=object)[pos]
+    patterns = list(map(operator.itemgetter(*DOX_PATTERNS), scores["patterns"]))
+    counts = np.array(patterns, dtype=np.int64).reshape(len(scores), len(DOX_PATTERNS))[pos]
+    data = {
+        "query": strings(np.asarray(queries, dtype=object)[pos]),
+        "target": strings(names),
+        "title": strings(np.asarray([title[:100] for title in raw_titles], dtype=object)[pos]),
+        "display_title": strings(np.asarray([html.unescape(title)[:100] for title in raw_titles], dtype=object)[pos]),
+        "video_id": strings(video_ids),
+        "cluster_id": strings(video_ids),
+        "ml_score": np.round(ml, 3),
+        "matched_example": strings([example[:100] for example in examples]),
+        "rule_score": np.round(scores["rule_score"].to_numpy()[pos], 3),
+        "dox_score": np.round(dox, 3),
+        "severity": strings(severity),
+        "fp_prob": strings([None] * len(pos)),
+        "timestamp": strings([timestamp] * len(pos)),
+    }
+    for j, name in enumerate(DOX_PATTERNS):
+        data[PATTERN_PREFIX + name] = counts[:, j]
+    frame = pd.DataFrame(data)
+    frame.index = pos
+    return frame
+
+
+def _examples(scores: "pd.DataFrame"):
+    import numpy as np
+
+    if "example" not in scores:
+        return np.full(len(scores), "", dtype=object)
+    return np.asarray([example or "" for example in scores["example"]], dtype=object)
+
+
+def report_records(frame: "pd.DataFrame") -> List[dict]:
+    """Rows of a ``report_frame`` as plain dicts (native floats/ints, like ``make_report_row``)."""
+    columns = list(frame.columns)
+    # tolist() par colonne: bien plus rapide que to_dict("records") sur un frame large
+    return [dict(zip(columns, values)) for values in zip(*(frame[col].tolist() for col in columns))]
+
+
+def hit_mask(frame: "pd.DataFrame", model=None):
+    """``is_hit`` over a ``report_frame`` (boolean array, one threshold pair per target)."""
+    import numpy as np
+
+    dox = frame["dox_score"].to_numpy()
+    targets = frame["target"].to_numpy()
+    mask = np.zeros(len(frame), dtype=bool)
+    for name in set(targets):
+        min_score, hard_min = _thresholds({"target": name}, model)
+        rows = targets == name
+        mask[rows] = (dox[rows] >= min_score) & (dox[rows] >= hard_min)
+    return mask
+
+
+def iter_scored_videos(
+    fetches: Iterator[QueryFetch],
+    stats: ScanStats,
+    seen_ids: set,
+    model,
+    version: str,
+    cache: Optional[ScanCache] = None,
+    metrics: NullMetrics = NULL_METRICS,
+    query_targets: Optional[Dict[str, Tuple[str, ...]]] = None,
+    clusters: Optional[ClusterIndex] = None,
+    timestamp: Optional[datetime] = None,
+) -> Iterator[dict]:
+    """Turn fetched pages into report rows, one page at a time.
+
+    Each page is scored with one ``score_batch`` call (cached videos with an
+    unchanged text skip it). Only ``seen_ids`` grows with the run size.
+    With a ``TargetModel`` a video yields one row per target it concerns
+    (see ``iter_target_rows``). With ``clusters``, videos with a hit row are
+    assigned to a reupload cluster (``cluster_id``); the ``Enricher`` does
+    the same for the videos it promotes to a hit. Every row carries the
+    same ``timestamp`` (the run's start by default).
+    """
+    if timestamp is None:
+        timestamp = datetime.now()
+    per_target = isinstance(model, TargetModel)
+    for fetched in fetches:
+        stats.request_failures += fetched.request_failures
+        stats.quota_blocked = stats.quota_blocked or fetched.quota_blocked
+        stats.budget_exhausted = stats.budget_exhausted or fetched.budget_exhausted
+        query = fetched.query
+        stats.network_calls[query] += fetched.network_calls
+        advance_high_water(stats.high_water, fetched)
+
+        for data in fetched.pages:
+            stats.successful_fetch = True
+
+            page_videos = []
+            to_score = []
+            # Etape "normalize": dedup + lecture du cache + normalisation de la page
+            with metrics.timer("stage_seconds", stage="normalize"):
+                for video in data["items"]:
+                    snippet = video.get("snippet", {})
+                    raw_title = snippet.get("title") or ""
+                    raw_description = snippet.get("description") or ""
+                    video_id = video.get("id", {}).get("videoId")
+
+                    if not video_id or video_id in seen_ids:
+                        if video_id:
+                            metrics.inc("videos_deduplicated_total")
+                        continue
+
+                    seen_ids.add(video_id)
+
+                    digest = text_hash(raw_title, raw_description)
+                    score = cache.get_scores(video_id, digest, version) if cache is not None else None
+                    if score is None or (per_target and not score.get("targets")):
+                        # Texte nouveau ou modifie: normalisation + scoring
+                        title = normalize_text(raw_title)
+                        description = normalize_text(raw_description)
+                        text = f"{title} {description}".strip()
+                        score = {"video_id": video_id, "text_hash": digest, "snippet": snippet, "text": text}
+                        to_score.append(score)
+                    else:
+                        metrics.inc("videos_cached_total")
+                    page_videos.append((video_id, raw_title, raw_description, score))
+
+            scores = score_batch([pending["text"] for pending in to_score], model, metrics)
+            for pending, fresh in zip(to_score, scores.to_dict("records")):
+                pending.update(fresh)
+            if cache is not None and to_score:
+                cache.put_scores(to_score, version)
+
+            for video_id, raw_title, raw_description, score in page_videos:
+                stats.videos_scored += 1
+                rows = list(iter_target_rows(query, video_id, raw_title, score, timestamp, query_targets))
+                if clusters is not None and any(is_hit(row, model) for row in rows):
+                    with metrics.timer("stage_seconds", stage="cluster"):
+                        # Video deja indexee (run precedent): pas de renormalisation
+                        cluster_id = clusters.cluster_of(video_id)
+                        if cluster_id is None:
+                            text = score.get("text")
+                            if text is None:  # score servi par le cache
+                                text = f"{normalize_text(raw_title)} {normalize_text(raw_description)}".strip()
+                            cluster_id = clusters.assign(video_id, minhash(text))
+                    for row in rows:
+                        row["cluster_id"] = cluster_id
+                yield from rows
+
+
+def run_summary(stats: ScanStats, metrics: NullMetrics, started: datetime, **extra) -> dict:
+    """Run summary saved next to the report (metrics only when instrumentation is on)."""
+    return {
+        "started": started.isoformat(timespec="seconds"),
+        "duration_seconds": round((datetime.now() - started).total_seconds(), 3),
+        "videos_scored": stats.videos_scored,
+        "request_failures": stats.request_failures,
+        "quota_blocked": stats.quota_blocked,
+        "budget_exhausted": stats.budget_exhausted,
+        "network_calls": dict(stats.network_calls),
+        "hits_by_query": dict(stats.hits_by_query),
+        "hits_by_severity": dict(stats.hits_by_severity),
+        "hits_by_target": dict(stats.hits_by_target),
+        "suppressed_false_positives": stats.suppressed,
+        **extra,
+        "metrics": metrics.summary() if metrics.enabled else None,
+    }
 
-                results.append(
-                    {
-                        "query": query,
-                        "title": raw_title[:100],
-                        "display_title": html.unescape(raw_title)[:100],
-                        "video_id": video_id,
-                        "ml_score": round(ml_score, 3),
-                        "rule_score": round(rule_score, 3),
-                        "dox_score": round(composite_score, 3),
-                        "severity": severity,
-                        "patterns": str(pattern_matches),
-                        "timestamp": datetime.now(),
-                    }
-                )
 
-            pages_fetched += 1
-            page_token = data.get("nextPageToken")
-            if not page_token or pages_fetched >= max_pages_allowed:
-                break
+def ml_dox_hunter(
+    session: Optional[requests.Session] = None,
+    incremental: Optional[bool] = None,
+    metrics: Optional[NullMetrics] = None,
+):
+    import pandas as pd
 
-        if quota_blocked:
-            break
+    started = datetime.now()
+    if metrics is None:
+        metrics = Metrics() if metrics_enabled() else NULL_METRICS
+    api_key = require_api_key()
+    if incremental is None:
+        incremental = incremental_enabled()
+    high_water = load_high_water() if incremental else {}
 
-    df = pd.DataFrame(results)
+    targets = get_targets()
+    model = get_target_model(tuple(targets))
+    version = scoring_version(targets)
+    query_targets = targets_by_query(targets)
 
-    if df.empty:
-        if not successful_fetch and request_failures:
-            raise SystemExit("[KpopDoxHunter] All requests failed; no report generated.")
-        print("[KpopDoxHunter] No results collected (check API key, quota, or queries).")
-        return df
+    stats = ScanStats(high_water=dict(high_water))
+    seen_ids = set()
 
-    if "dox_score" not in df.columns:
-        print("[KpopDoxHunter] No 'dox_score' column in results, skipping ML filter.")
-        return df
+    max_pages_allowed = get_max_pages()
+    max_workers = get_max_workers()
+    own_session = session is None
+    if own_session:
+        session = make_session(max_workers)
+    cache = open_cache()
+    clusters = open_cluster_index()
+    feedback = open_feedback_filter()
+    scheduler = open_quota_scheduler()
+    # Les queries les plus productives passent en premier sur le budget
+    queries = scheduler.rank(list(query_targets))
+
+    # Les hits vont d'abord dans un CSV (valide meme si le run est tue),
+    # converti en Parquet trie a la fin.
+    reports_dir = get_reports_dir()
+    latest = find_latest_scan_report(reports_dir) if incremental else None
+    if latest is not None and (
+        not latest.stem.startswith(f"dox_report_{started:%Y%m%d}_")
+        or parquet_rows(latest) >= get_incremental_report_max_rows()
+    ):
+        latest = None  # rotation: nouveau jour ou rapport plein, la fusion reste bornee
+    merge = latest is not None
+    if merge:
+        # Mode incremental: on complete le dernier rapport du jour au lieu d'en creer un
+        spool_path = str(latest.with_suffix(".csv"))
+        report_path = str(latest)
+        parquet_to_csv(report_path, spool_path)
+    else:
+        stem = new_report_stem(reports_dir, now=started)
+        spool_path = os.path.join(reports_dir, f"{stem}.csv")
+        report_path = os.path.join(reports_dir, f"{stem}.parquet")
+    writer = ReportWriter(spool_path, columns=REPORT_COLUMNS, merge=merge)
+    hits = 0
+    enricher = None
+    if enrich_enabled():
+        from scan_enrich import Enricher
 
-    df = df[df["dox_score"] >= MIN_DOX_SCORE].sort_values("dox_score", ascending=False)
-    # Filtrage supplémentaire pour lisser le bruit
-    df = df[df["dox_score"] >= HARD_MIN_SCORE]
+        enricher = Enricher(session, api_key, model, scheduler, metrics, clusters=clusters)
 
-    if df.empty:
-        print(f"[KpopDoxHunter] No videos above the dox_score threshold ({MIN_DOX_SCORE}).")
-        return df
+    try:
+        # Un run interrompu laisse un rapport partiel valide (non trie)
+        with writer:
+            fetches = fetch_all_queries(
+                session, queries, api_key, max_pages_allowed, max_workers, cache, high_water, scheduler, metrics
+            )
+            rows = iter_scored_videos(
+                fetches, stats, seen_ids, model, version, cache, metrics, query_targets, clusters, started
+            )
+            if enricher is not None:
+                # Deuxieme etape: details + commentaires des candidats, par lots de 50
+                rows = enricher.iter_rows(rows)
+            for row in rows:
+                if is_hit(row, model):
+                    if feedback is not None and feedback.suppress(row):
+                        stats.suppressed += 1
+                        metrics.inc("hits_suppressed_total")
+                        continue
+                    writer.append(row)
+                    stats.hits_by_query[row["query"]] += 1
+                    stats.hits_by_target[row["target"]] += 1
+                    stats.hits_by_severity[row["severity"]] += 1
+                    metrics.inc("hits_total", severity=row["severity"])
+                    hits += 1
+    finally:
+        if enricher is not None:
+            stats.quota_blocked = stats.quota_blocked or enricher.quota_blocked
+            stats.budget_exhausted = stats.budget_exhausted or enricher.budget_exhausted
+        scheduler.save()
+        if own_session:
+            session.close()
+        if cache is not None:
+            print(f"[KpopDoxHunter] Cache: {cache.summary()}")
+            cache.close()
+        if clusters is not None:
+            clusters.close()
+
+    if stats.budget_exhausted:
+        print(
+            f"[WARN] Daily quota budget exhausted ({scheduler.spent}/{scheduler.daily_budget} units); "
+            "remaining queries skipped."
+        )
+    for query, calls in stats.network_calls.items():
+        if calls:
+            scheduler.record_yield(query, calls, stats.hits_by_query[query])
+    scheduler.save()
 
-    print(f"[KpopDoxHunter] Found {len(df)} suspicious videos.")
+    if not hits and merge and latest.suffix == ".parquet":
+        os.unlink(spool_path)
 
-    os.makedirs("reports", exist_ok=True)
-    filename = f"dox_report_{datetime.now().strftime('%Y%m%d_%H%M')}.csv"
-    filepath = os.path.join("reports", filename)
-    df.to_csv(filepath, index=False)
+    if not stats.videos_scored:
+        if not stats.successful_fetch and stats.request_failures:
+            raise SystemExit("[KpopDoxHunter] All requests failed; no report generated.")
+        if incremental:
+            save_high_water(stats.high_water)
+        print("[KpopDoxHunter] No results collected (check API key, quota, or queries).")
+        return pd.DataFrame()
 
-    print(f"[KpopDoxHunter] ML scan saved {len(df)} hits to {filepath}")
+    if not hits:
+        if incremental:
+            save_high_water(stats.high_water)
+        print(f"[KpopDoxHunter] No videos above the dox_score threshold ({MIN_DOX_SCORE}).")
+        return pd.DataFrame(columns=REPORT_COLUMNS)
+
+    print(f"[KpopDoxHunter] Found {hits} suspicious videos.")
+
+    with metrics.timer("stage_seconds", stage="report_write"):
+        writer.close(sort_by="dox_score", dedupe_on=("video_id", "target") if merge else None)
+        total = csv_to_parquet(spool_path, report_path)
+    os.unlink(spool_path)
+    if incremental:
+        save_high_water(stats.high_water)
+    metrics.inc("videos_scored_total", stats.videos_scored)
+    save_summary(report_path, run_summary(
+        stats,
+        metrics,
+        started,
+        report=report_path,
+        incremental=incremental,
+        hits=hits,
+        report_rows=total,
+        quota_spent=scheduler.spent,
+        cache=dict(cache.stats) if cache is not None else None,
+        enrichment=dict(enricher.stats) if enricher is not None else None,
+    ))
+    df = pd.read_parquet(report_path)
+
+    print(f"[KpopDoxHunter] ML scan saved {total} hits to {report_path}")
     print(df[["title", "dox_score", "severity"]].head(10))
 
-    if quota_blocked:
+    if stats.quota_blocked:
         raise SystemExit(
             "[KpopDoxHunter] Quota or forbidden responses detected; partial results saved."
         )
@@ -369,13 +1407,73 @@ def ml_dox_hunter():
     return df
 
 
+def main(argv: Optional[Sequence[str]] = None):
+    parser = argparse.ArgumentParser(
+        prog="scan_kpop_doxhunter",
+        description="Hybrid ML + regex anti-doxxing scanner for YouTube search results.",
+    )
+    commands = parser.add_subparsers(dest="command")
+    scan_cmd = commands.add_parser("scan", help="run the YouTube scan (default)")
+    scan_cmd.add_argument(
+        "--incremental", action="store_true", help="only fetch videos newer than the last run"
+    )
+    commands.add_parser("build-model", help="fit the TF-IDF model and save the artifact")
+    rescore_cmd = commands.add_parser("rescore", help="re-score saved snippet dumps (JSONL or Parquet) offline")
+    rescore_cmd.add_argument("inputs", nargs="+", help="JSONL or Parquet dump files")
+    rescore_cmd.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    rescore_cmd.add_argument("--chunk-size", type=int, default=None, help="snippets per worker task")
+    rescore_cmd.add_argument("--output", default=None, help="Parquet report path")
+    watch_cmd = commands.add_parser("watch", help="keep running and rescan queries on their own schedule")
+    watch_cmd.add_argument("--cycles", type=int, default=None, help="stop after this many scan cycles")
+    watch_cmd.add_argument(
+        "--base-interval", type=float, default=None, help="seconds between scans of a query at ~1 hit per scan"
+    )
+    commands.add_parser("history", help="merge every report into the history store (state/history.sqlite)")
+    args = parser.parse_args(argv)
+
+    if args.command == "watch":
+        import signal
+
+        import scan_watch
+
+        options = {"base_interval": args.base_interval} if args.base_interval else {}
+        watcher = scan_watch.Watcher(**options)
+        # Arret propre: le cycle en cours se termine, l'etat est sauvegarde
+        signal.signal(signal.SIGINT, watcher.stop)
+        signal.signal(signal.SIGTERM, watcher.stop)
+        print(f"[KpopDoxHunter] Watching {len(watcher.queries)} queries (Ctrl+C to stop).")
+        watcher.run(max_cycles=args.cycles)
+        return watcher
+    if args.command == "build-model":
+        path = build_model()
+        print(f"[KpopDoxHunter] Model artifact saved to {path}")
+        return path
+    if args.command == "history":
+        from scan_history import HistoryStore, history_path
+
+        store = HistoryStore(history_path())
+        try:
+            rows = store.ingest(REPORTS_DIR)
+        finally:
+            store.close()
+        print(f"[KpopDoxHunter] History: {rows} report rows ingested into {history_path()}")
+        return rows
+    if args.command == "rescore":
+        import scan_rescore
+
+        path, scored, hits = scan_rescore.rescore(
+            args.inputs,
+            output=args.output,
+            workers=args.workers,
+            chunk_size=args.chunk_size or scan_rescore.CHUNK_SIZE,
+        )
+        if path is None:
+            print(f"[KpopDoxHunter] Rescored {scored} snippets; none above the dox_score threshold.")
+        else:
+            print(f"[KpopDoxHunter] Rescored {scored} snippets; {hits} hits saved to {path}")
+        return path
+    return ml_dox_hunter(incremental=getattr(args, "incremental", False) or None)
+
+
 if __name__ == "__main__":
-    hits = ml_dox_hunter()
-def normalize_text(text: str) -> str:
-    """Unescape HTML, strip accents, lower, and collapse whitespace."""
-    text = html.unescape(text or "")
-    text = unicodedata.normalize("NFKD", text)
-    text = text.encode("ascii", "ignore").decode()
-    text = text.lower()
-    text = re.sub(r"\s+", " ", text).strip()
-    return text
+    hits = main()
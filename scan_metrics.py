@@ -0,0 +1,226 @@
+"""Optional run instrumentation: counters and latency histograms.
+
+``Metrics`` records labelled counters and fixed-bucket histograms (thread
+safe) and renders them as JSON or in the Prometheus text format.
+``NullMetrics`` has the same interface and does nothing, so call sites
+stay unconditional and a disabled run only pays a method call.
+"""
+import json
+import math
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+# Bornes superieures (secondes) des histogrammes de latence
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+METRIC_PREFIX = "doxhunter_"
+SUMMARY_SUFFIX = ".summary.json"
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, object]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+class _Timer:
+    __slots__ = ("_metrics", "_name", "_labels", "_start")
+
+    def __init__(self, metrics, name, labels):
+        self._metrics = metrics
+        self._name = name
+        self._labels = labels
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._metrics.observe(self._name, time.perf_counter() - self._start, **self._labels)
+        return False
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class NullMetrics:
+    """Disabled instrumentation: every call is a no-op."""
+
+    enabled = False
+
+    def inc(self, name: str, amount: float = 1, **labels) -> None:
+        pass
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        pass
+
+    def timer(self, name: str, **labels):
+        return _NULL_TIMER
+
+    def summary(self) -> dict:
+        return {"counters": [], "histograms": []}
+
+
+NULL_METRICS = NullMetrics()
+
+
+class Metrics(NullMetrics):
+    """Labelled counters and histograms shared by the fetch workers and the scoring loop."""
+
+    enabled = True
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._counters: Dict[Tuple[str, LabelKey], float] = {}
+        # (name, labels) -> [compte par bucket (+Inf en dernier), somme, nombre]
+        self._histograms: Dict[Tuple[str, LabelKey], list] = {}
+
+    def inc(self, name: str, amount: float = 1, **labels) -> None:
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        key = (name, _label_key(labels))
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = self._histograms[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            hist[0][index] += 1
+            hist[1] += value
+            hist[2] += 1
+
+    def timer(self, name: str, **labels):
+        """Context manager observing the elapsed wall time in seconds."""
+        return _Timer(self, name, labels)
+
+    def counter(self, name: str, **labels) -> float:
+        with self._lock:
+            return self._counters.get((name, _label_key(labels)), 0)
+
+    def summary(self) -> dict:
+        """JSON-serializable snapshot (bucket counts are not cumulative)."""
+        with self._lock:
+            counters = [
+                {"name": name, "labels": dict(labels), "value": value}
+                for (name, labels), value in sorted(self._counters.items())
+            ]
+            histograms = [
+                {
+                    "name": name,
+                    "labels": dict(labels),
+                    "buckets": list(self.buckets),
+                    "counts": list(hist[0]),
+                    "sum": hist[1],
+                    "count": hist[2],
+                }
+                for (name, labels), hist in sorted(self._histograms.items())
+            ]
+        return {"counters": counters, "histograms": histograms}
+
+
+# ===== Export =====
+def _format_labels(labels: Dict[str, str], extra: Optional[Tuple[str, str]] = None) -> str:
+    items = sorted(labels.items())
+    if extra:
+        items.append(extra)
+    if not items:
+        return ""
+    escaped = (
+        k + '="' + str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"' for k, v in items
+    )
+    return "{" + ",".join(escaped) + "}"
+
+
+def _format_value(value: float) -> str:
+    value = float(value)
+    if math.isinf(value):
+        return "+Inf"
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+def to_prometheus(summary: dict, prefix: str = METRIC_PREFIX) -> str:
+    """Render a ``summary()`` snapshot in the Prometheus text exposition format."""
+    lines: List[str] = []
+    typed = set()
+    for counter in summary.get("counters", []):
+        name = prefix + counter["name"]
+        if name not in typed:
+            typed.add(name)
+            lines.append(f"# TYPE {name} counter")
+        lines.append(f"{name}{_format_labels(counter['labels'])} {_format_value(counter['value'])}")
+    for hist in summary.get("histograms", []):
+        name = prefix + hist["name"]
+        if name not in typed:
+            typed.add(name)
+            lines.append(f"# TYPE {name} histogram")
+        cumulative = 0
+        for bound, count in zip(list(hist["buckets"]) + [math.inf], hist["counts"]):
+            cumulative += count
+            le = _format_value(bound)
+            lines.append(f"{name}_bucket{_format_labels(hist['labels'], ('le', le))} {cumulative}")
+        lines.append(f"{name}_sum{_format_labels(hist['labels'])} {_format_value(hist['sum'])}")
+        lines.append(f"{name}_count{_format_labels(hist['labels'])} {hist['count']}")
+    return "\n".join(lines) + "\n" if lines else ""
+
+
+def summary_path(report_path) -> str:
+    """``reports/dox_report_X.parquet`` -> ``reports/dox_report_X.summary.json``."""
+    root, _ = os.path.splitext(str(report_path))
+    return root + SUMMARY_SUFFIX
+
+
+def save_summary(report_path, summary: dict) -> str:
+    path = summary_path(report_path)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as fh:
+        json.dump(summary, fh, indent=2, sort_keys=True, default=str)
+    os.replace(tmp, path)
+    return path
+
+
+def load_summary(report_path) -> Optional[dict]:
+    try:
+        with open(summary_path(report_path), encoding="utf-8") as fh:
+            summary = json.load(fh)
+    except (OSError, ValueError):
+        return None
+    return summary if isinstance(summary, dict) else None
+
+
+def run_summary_to_prometheus(summary: dict, prefix: str = METRIC_PREFIX) -> str:
+    """Last-run gauges (numeric fields, hits per severity) followed by the run metrics."""
+    lines: List[str] = []
+    for key, value in sorted(summary.items()):
+        if isinstance(value, bool):
+            value = int(value)
+        if isinstance(value, (int, float)):
+            name = f"{prefix}last_run_{key}"
+            lines += [f"# TYPE {name} gauge", f"{name} {_format_value(value)}"]
+    severities = summary.get("hits_by_severity") or {}
+    if severities:
+        name = f"{prefix}last_run_hits_by_severity"
+        lines.append(f"# TYPE {name} gauge")
+        for severity, count in sorted(severities.items()):
+            lines.append(f"{name}{_format_labels({'severity': severity})} {_format_value(count)}")
+    text = "\n".join(lines) + "\n" if lines else ""
+    if summary.get("metrics"):
+        text += to_prometheus(summary["metrics"], prefix)
+    return text
@@ -0,0 +1,168 @@
+"""Quota budgeting and backoff for YouTube Data API calls.
+
+Every ``search.list`` call costs 100 units out of a daily budget (10,000 by
+default) that resets at midnight Pacific time. The scheduler tracks spent
+units across runs, orders queries by their past hit yield so the budget goes
+to productive queries first, and computes jittered backoff delays that
+honor ``Retry-After``.
+"""
+import json
+import os
+import random
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, List, Optional, Sequence
+
+SEARCH_COST = 100
+VIDEOS_LIST_COST = 1  # jusqu'a 50 ids par appel
+COMMENT_THREADS_COST = 1
+DAILY_QUOTA_UNITS = 10_000
+BACKOFF_BASE_SECONDS = 1.5
+BACKOFF_MAX_SECONDS = 60.0
+
+try:
+    from zoneinfo import ZoneInfo
+
+    QUOTA_TIMEZONE = ZoneInfo("America/Los_Angeles")
+except Exception:  # tzdata absent (Windows sans le paquet tzdata)
+    QUOTA_TIMEZONE = timezone(timedelta(hours=-8))
+
+
+class SystemClock:
+    """Real time; ``sleep`` wakes up early when ``interrupt`` is set."""
+
+    def now(self) -> float:
+        return time.time()
+
+    def sleep(self, seconds: float, interrupt: Optional[threading.Event] = None) -> None:
+        if interrupt is not None:
+            interrupt.wait(seconds)
+        else:
+            time.sleep(seconds)
+
+
+def parse_retry_after(value, now: float) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date)."""
+    if not isinstance(value, str) or not value.strip():
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, when.timestamp() - now)
+
+
+class QuotaScheduler:
+    """Thread-safe daily unit budget with per-query yield statistics."""
+
+    def __init__(
+        self,
+        state_path: Optional[str] = None,
+        daily_budget: int = DAILY_QUOTA_UNITS,
+        clock=None,
+        rng: Optional[random.Random] = None,
+        backoff_base: float = BACKOFF_BASE_SECONDS,
+    ):
+        self.state_path = state_path
+        self.daily_budget = daily_budget
+        self.backoff_base = backoff_base
+        self.clock = clock or SystemClock()
+        self._rng = rng or random.Random()
+        self._lock = threading.Lock()
+        self._state = self._load()
+
+    # ----- persistance -----
+    def _load(self) -> dict:
+        state = {}
+        if self.state_path:
+            try:
+                with open(self.state_path, encoding="utf-8") as fh:
+                    state = json.load(fh)
+            except (OSError, ValueError):
+                state = {}
+        if not isinstance(state, dict):
+            state = {}
+        state.setdefault("day", self._today())
+        state.setdefault("spent", 0)
+        state.setdefault("queries", {})
+        return state
+
+    def save(self) -> None:
+        if not self.state_path:
+            return
+        with self._lock:
+            payload = json.dumps(self._state, indent=2, sort_keys=True)
+        os.makedirs(os.path.dirname(self.state_path) or ".", exist_ok=True)
+        tmp = f"{self.state_path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            fh.write(payload)
+        os.replace(tmp, self.state_path)
+
+    def _today(self) -> str:
+        return datetime.fromtimestamp(self.clock.now(), QUOTA_TIMEZONE).strftime("%Y-%m-%d")
+
+    def _roll_day(self) -> None:
+        today = self._today()
+        if self._state["day"] != today:
+            self._state["day"] = today
+            self._state["spent"] = 0
+
+    # ----- budget -----
+    @property
+    def spent(self) -> int:
+        with self._lock:
+            self._roll_day()
+            return self._state["spent"]
+
+    def remaining(self) -> int:
+        return max(0, self.daily_budget - self.spent)
+
+    def try_spend(self, cost: int = SEARCH_COST) -> bool:
+        """Reserve ``cost`` units; False when the daily budget cannot cover it."""
+        with self._lock:
+            self._roll_day()
+            if self._state["spent"] + cost > self.daily_budget:
+                return False
+            self._state["spent"] += cost
+            return True
+
+    # ----- priorites -----
+    def query_yield(self, query: str) -> float:
+        """Smoothed hits per call; unseen queries start at 1.0 so they get explored."""
+        with self._lock:
+            stats = self._state["queries"].get(query, {})
+        return (stats.get("hits", 0) + 1) / (stats.get("calls", 0) + 1)
+
+    def rank(self, queries: Sequence[str]) -> List[str]:
+        """Queries by decreasing past yield (stable for ties)."""
+        return sorted(queries, key=self.query_yield, reverse=True)
+
+    def record_yield(self, query: str, calls: int, hits: int) -> None:
+        with self._lock:
+            stats = self._state["queries"].setdefault(query, {"calls": 0, "hits": 0})
+            stats["calls"] += calls
+            stats["hits"] += hits
+
+    def query_stats(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {q: dict(s) for q, s in self._state["queries"].items()}
+
+    # ----- backoff -----
+    def backoff_delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Server-provided Retry-After wins, else full-jitter exponential backoff."""
+        if retry_after is not None:
+            return min(retry_after, BACKOFF_MAX_SECONDS)
+        cap = min(BACKOFF_MAX_SECONDS, self.backoff_base * 2 ** (attempt - 1))
+        return self._rng.uniform(0, cap)
+
+    def sleep(self, seconds: float, interrupt: Optional[threading.Event] = None) -> None:
+        self.clock.sleep(seconds, interrupt)
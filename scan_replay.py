@@ -0,0 +1,296 @@
+"""Record and replay of YouTube API traffic (offline, deterministic scans).
+
+Everything the scanner sends to the API goes through ``session.get(url,
+params=..., timeout=...)``. ``make_session`` returns one of these sessions
+instead of a plain ``requests.Session`` when asked to:
+
+* ``RECORD_CASSETTE=path.jsonl.gz``: ``RecordingSession`` forwards requests
+  to the network and appends each exchange to a gzip JSONL cassette: URL,
+  params without the API key, status, raw body, ``Retry-After``, the time
+  it took, or the network error raised (API key masked in its message).
+* ``REPLAY_CASSETTE=path.jsonl.gz``: ``ReplaySession`` answers from the
+  cassette only, with no network and no API key needed. Identical requests
+  get their recorded answers in order, and the last one repeats once they
+  run out. Options:
+
+  - ``REPLAY_LATENCY``: ``0`` for full speed (default), ``recorded`` for the
+    recorded durations, or a number of seconds per request.
+  - ``REPLAY_QUOTA_AFTER=N``: after N requests, every answer is a 403
+    ``quotaExceeded``, like a key running out of quota mid-run.
+  - ``REPLAY_PAGES=N``: every search is served as N pages with synthetic
+    page tokens. The recorded pages of the query are cycled and video ids
+    are suffixed past the recorded ones, so a small cassette becomes a
+    multi-thousand-page workload. Raise ``MAX_PAGES_PER_QUERY`` to match.
+
+A replayed run keeps away from real state: the scanner gives it an
+in-memory quota scheduler without a daily budget, no scan cache, and
+``replay/`` subdirectories of ``STATE_DIR`` and ``REPORTS_DIR``.
+
+A request missing from the cassette gets a 404 (``ReplaySession.misses``),
+or a ``LookupError`` with ``strict=True``. Incremental runs add a
+``publishedAfter`` that depends on the saved high-water marks, so they
+replay only from the same state.
+"""
+import copy
+import gzip
+import json
+import os
+import re
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Dict, List, Optional, Tuple
+
+import requests
+from requests.exceptions import RequestException
+
+CASSETTE_FORMAT = 1
+SECRET_PARAMS = ("key",)  # jamais ecrits dans une cassette
+KEPT_HEADERS = ("Retry-After", "Content-Type")
+REPLAY_TOKEN = "replay:"
+_SECRET_RE = re.compile(r"\b(%s)=[^&\s'\"]+" % "|".join(SECRET_PARAMS))
+
+_QUOTA_BODY = json.dumps({
+    "error": {
+        "code": 403,
+        "message": "The request cannot be completed because you have exceeded your quota.",
+        "errors": [{"reason": "quotaExceeded", "domain": "youtube.quota"}],
+    }
+})
+_MISSING_BODY = json.dumps({"error": {"code": 404, "message": "request not found in cassette"}})
+
+
+def get_record_path() -> Optional[str]:
+    return os.getenv("RECORD_CASSETTE") or None
+
+
+def get_replay_path() -> Optional[str]:
+    return os.getenv("REPLAY_CASSETTE") or None
+
+
+def get_replay_latency():
+    """0.0 (full speed), ``"recorded"``, or seconds per request."""
+    value = os.getenv("REPLAY_LATENCY", "0").strip().lower()
+    if value == "recorded":
+        return value
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        print(f"[WARN] Invalid REPLAY_LATENCY '{value}'; replaying at full speed.")
+        return 0.0
+
+
+def _int_env(name: str) -> Optional[int]:
+    try:
+        value = int(os.getenv(name, ""))
+    except ValueError:
+        return None
+    return value if value >= 0 else None
+
+
+def redact(text: str) -> str:
+    """Mask API keys in a message (requests puts the full URL in its errors)."""
+    return _SECRET_RE.sub(r"\1=REDACTED", text)
+
+
+def request_key(url: str, params: Optional[dict]) -> Tuple:
+    """Replay lookup key: URL + sorted params, API key excluded."""
+    return (url, tuple(sorted((k, str(v)) for k, v in (params or {}).items() if k not in SECRET_PARAMS)))
+
+
+class ReplayResponse:
+    """The part of ``requests.Response`` the scanner uses."""
+
+    def __init__(self, status_code: int, text: str, headers: Optional[dict] = None, url: str = ""):
+        self.status_code = status_code
+        self.text = text
+        self.headers = requests.structures.CaseInsensitiveDict(headers or {})
+        self.url = url
+
+    def json(self):
+        # Decode a chaque appel, comme requests: pas d'objet partage entre deux reponses
+        return json.loads(self.text)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} Error for url: {self.url}", response=self)
+
+
+class RecordingSession:
+    """Forward requests to ``inner`` and append every exchange to a gzip JSONL cassette."""
+
+    def __init__(self, inner, path: str, clock=time.perf_counter):
+        self.inner = inner
+        self.path = path
+        self._clock = clock
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._fh = gzip.open(path, "wt", encoding="utf-8")
+        self._write({"format": CASSETTE_FORMAT, "recorded_at": time.time()})
+
+    def _write(self, entry: dict) -> None:
+        with self._lock:
+            self._fh.write(json.dumps(entry, separators=(",", ":")) + "\n")
+            # Flush: une cassette d'un run tue reste lisible jusqu'a la derniere requete
+            self._fh.flush()
+
+    def get(self, url, params=None, timeout=None, **kwargs):
+        _, safe_params = request_key(url, params)
+        entry = {"url": url, "params": dict(safe_params)}
+        start = self._clock()
+        try:
+            resp = self.inner.get(url, params=params, timeout=timeout, **kwargs)
+        except RequestException as exc:
+            entry.update(elapsed=self._clock() - start, error=type(exc).__name__, message=redact(str(exc)))
+            self._write(entry)
+            raise
+        entry.update(
+            elapsed=self._clock() - start,
+            status=resp.status_code,
+            headers={name: resp.headers[name] for name in KEPT_HEADERS if name in resp.headers},
+            body=resp.text,
+        )
+        self._write(entry)
+        return resp
+
+    def close(self) -> None:
+        with self._lock:
+            if not self._fh.closed:
+                self._fh.close()
+        self.inner.close()
+
+
+def load_cassette(path: str) -> List[dict]:
+    """Entries of a cassette, in recording order (a truncated cassette keeps its complete lines)."""
+    entries = []
+    with gzip.open(path, "rt", encoding="utf-8") as fh:
+        try:
+            for line in fh:
+                if line.endswith("\n"):
+                    entries.append(json.loads(line))
+        except EOFError:
+            print(f"[WARN] Cassette '{path}' is truncated; replaying its {len(entries)} complete entries.")
+    if not entries or entries[0].get("format") != CASSETTE_FORMAT:
+        raise ValueError(f"'{path}' is not a format {CASSETTE_FORMAT} cassette")
+    return entries[1:]
+
+
+class ReplaySession:
+    """Serve recorded answers; optional latency, quota exhaustion and synthetic pages."""
+
+    def __init__(
+        self,
+        path: str,
+        latency=0.0,
+        quota_after: Optional[int] = None,
+        pages: Optional[int] = None,
+        strict: bool = False,
+        sleep=time.sleep,
+    ):
+        self.path = path
+        self.latency = latency
+        self.quota_after = quota_after
+        self.pages = pages
+        self.strict = strict
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.misses = 0
+        self._answers: Dict[Tuple, deque] = defaultdict(deque)
+        entries = load_cassette(path)
+        for entry in entries:
+            self._answers[request_key(entry["url"], entry["params"])].append(entry)
+        self._chains = self._search_chains(entries) if pages else {}
+
+    @classmethod
+    def from_env(cls, path: str) -> "ReplaySession":
+        return cls(
+            path,
+            latency=get_replay_latency(),
+            quota_after=_int_env("REPLAY_QUOTA_AFTER"),
+            pages=_int_env("REPLAY_PAGES") or None,
+        )
+
+    @staticmethod
+    def _search_chains(entries: List[dict]) -> Dict[Tuple, List[str]]:
+        """Recorded page bodies of each search (params without pageToken), in page order."""
+        by_token = defaultdict(dict)
+        for entry in entries:
+            if entry.get("status") != 200 or "q" not in entry["params"]:
+                continue
+            params = dict(entry["params"])
+            token = params.pop("pageToken", None)
+            by_token[request_key(entry["url"], params)].setdefault(token, entry["body"])
+        chains = {}
+        for key, pages in by_token.items():
+            chain, token = [], None
+            while token in pages and len(chain) < len(pages):
+                chain.append(pages[token])
+                token = json.loads(pages[token]).get("nextPageToken")
+            if chain:
+                chains[key] = chain
+        return chains
+
+    def _synthetic_page(self, url: str, params: dict) -> Optional[str]:
+        params = dict(params)
+        token = params.pop("pageToken", None)
+        chain = self._chains.get(request_key(url, params))
+        if chain is None:
+            return None
+        if token is None:
+            page = 0
+        elif str(token).startswith(REPLAY_TOKEN):
+            page = int(str(token)[len(REPLAY_TOKEN):])
+        else:
+            return None
+        body = json.loads(chain[page % len(chain)])
+        if page >= len(chain):
+            # Pages au-dela de l'enregistrement: memes videos, ids distincts (pas dedupliquees)
+            body = copy.deepcopy(body)
+            for item in body.get("items", []):
+                if isinstance(item.get("id"), dict) and "videoId" in item["id"]:
+                    item["id"]["videoId"] = f"{item['id']['videoId']}~{page}"
+        body.pop("nextPageToken", None)
+        if page + 1 < self.pages:
+            body["nextPageToken"] = f"{REPLAY_TOKEN}{page + 1}"
+        return json.dumps(body)
+
+    def _next(self, key: Tuple) -> Optional[dict]:
+        answers = self._answers.get(key)
+        if not answers:
+            return None
+        # La derniere reponse enregistree reste servie une fois les autres consommees
+        return answers.popleft() if len(answers) > 1 else answers[0]
+
+    def get(self, url, params=None, timeout=None, **kwargs):
+        params = params or {}
+        synthetic = self._synthetic_page(url, params) if self._chains else None
+        with self._lock:
+            self.requests += 1
+            count = self.requests
+            entry = None if synthetic is not None else self._next(request_key(url, params))
+            if entry is None and synthetic is None:
+                self.misses += 1
+        delay = self.latency
+        if delay == "recorded":
+            delay = entry.get("elapsed", 0.0) if entry is not None else 0.0
+        if delay:
+            self._sleep(delay)
+
+        if self.quota_after is not None and count > self.quota_after:
+            return ReplayResponse(403, _QUOTA_BODY, {"Content-Type": "application/json"}, url)
+        if synthetic is not None:
+            return ReplayResponse(200, synthetic, {"Content-Type": "application/json"}, url)
+        if entry is None:
+            if self.strict:
+                raise LookupError(f"request not in cassette '{self.path}': {request_key(url, params)}")
+            return ReplayResponse(404, _MISSING_BODY, {"Content-Type": "application/json"}, url)
+        if entry.get("error"):
+            error = getattr(requests.exceptions, entry["error"], None)
+            if not (isinstance(error, type) and issubclass(error, RequestException)):
+                error = RequestException
+            raise error(entry.get("message", "recorded network error"))
+        return ReplayResponse(entry["status"], entry["body"], entry.get("headers"), url)
+
+    def close(self) -> None:
+        pass
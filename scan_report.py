@@ -0,0 +1,307 @@
+"""Report storage: streaming CSV spool, then a typed Parquet report.
+
+Rows are buffered in small chunks and appended to a CSV spool as the scan
+goes, so memory stays flat and a killed run still leaves a valid (unsorted)
+CSV behind. ``close()`` sorts the spool by score using sorted runs of at
+most ``sort_memory_rows`` rows merged with ``heapq.merge``; the sorted spool
+is then converted batch by batch to ``dox_report_*.parquet`` (typed columns,
+one int column per pattern) and removed.
+"""
+import csv
+import heapq
+import os
+import re
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Union
+
+REPORT_COLUMNS = [
+    "query",
+    "target",
+    "title",
+    "display_title",
+    "video_id",
+    "cluster_id",
+    "ml_score",
+    "matched_example",
+    "rule_score",
+    "dox_score",
+    "severity",
+    "fp_prob",
+    "timestamp",
+]
+PATTERN_PREFIX = "pat_"  # une colonne entiere par categorie de DOX_PATTERNS
+CHUNK_ROWS = 200
+SORT_MEMORY_ROWS = 100_000
+ROW_GROUP_ROWS = 64_000
+REPORT_GLOB = "dox_report_*"
+REPORT_SUFFIXES = (".parquet", ".csv")
+# Rapport d'un scan ponctuel: ni sortie _watch / _rescore, seulement un numero de rotation
+SCAN_REPORT_RE = re.compile(r"dox_report_\d{8}_\d{4}(?:_\d+)?")
+
+
+def _read_header(path: str) -> Optional[List[str]]:
+    try:
+        with open(path, newline="", encoding="utf-8") as fh:
+            return next(csv.reader(fh), None)
+    except OSError:
+        return None
+
+
+def _score(row: Dict[str, str], key: str) -> float:
+    try:
+        return float(row.get(key) or "nan")
+    except ValueError:
+        return float("nan")
+
+
+class ReportWriter:
+    """Append report rows in chunks; sort (and optionally dedupe) on close.
+
+    With ``merge=True`` rows are appended to an existing report, whose
+    header is widened to ``columns`` first if needed.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        columns: Sequence[str] = REPORT_COLUMNS,
+        chunk_rows: int = CHUNK_ROWS,
+        sort_memory_rows: int = SORT_MEMORY_ROWS,
+        merge: bool = False,
+    ):
+        self.path = path
+        self.columns = list(columns)
+        self.chunk_rows = chunk_rows
+        self.sort_memory_rows = sort_memory_rows
+        self.merge = merge
+        self.rows_written = 0
+        self._buffer: List[dict] = []
+        self._prepared = False
+
+    # ----- ecriture -----
+    def append(self, row: dict) -> None:
+        self._buffer.append(row)
+        if len(self._buffer) >= self.chunk_rows:
+            self.flush()
+
+    def extend(self, rows: Iterable[dict]) -> None:
+        for row in rows:
+            self.append(row)
+
+    def flush(self) -> None:
+        """Append buffered rows; the file on disk is a valid CSV after each flush."""
+        if not self._buffer:
+            return
+        self._prepare()
+        with open(self.path, "a", newline="", encoding="utf-8") as fh:
+            writer = csv.DictWriter(fh, fieldnames=self.columns, extrasaction="ignore")
+            writer.writerows(self._buffer)
+        self.rows_written += len(self._buffer)
+        self._buffer.clear()
+
+    def _prepare(self) -> None:
+        if self._prepared:
+            return
+        self._prepared = True
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        header = _read_header(self.path) if self.merge else None
+        if header is None:
+            with open(self.path, "w", newline="", encoding="utf-8") as fh:
+                csv.writer(fh).writerow(self.columns)
+        elif header != self.columns:
+            # Ancien rapport: on reecrit avec les colonnes courantes (+ colonnes inconnues)
+            self.columns += [col for col in header if col not in self.columns]
+            self._rewrite(self._iter_rows())
+
+    # ----- tri final -----
+    def _iter_rows(self) -> Iterator[Dict[str, str]]:
+        with open(self.path, newline="", encoding="utf-8") as fh:
+            yield from csv.DictReader(fh)
+
+    def _rewrite(self, rows: Iterable[dict]) -> None:
+        directory = os.path.dirname(self.path) or "."
+        fd, tmp = tempfile.mkstemp(prefix=".report_", suffix=".tmp", dir=directory)
+        try:
+            with os.fdopen(fd, "w", newline="", encoding="utf-8") as fh:
+                writer = csv.DictWriter(fh, fieldnames=self.columns, extrasaction="ignore")
+                writer.writeheader()
+                writer.writerows(rows)
+            os.replace(tmp, self.path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+
+    def close(self, sort_by: str = "dox_score", dedupe_on: Union[str, Sequence[str], None] = None) -> int:
+        """Flush, then sort the report by ``sort_by`` descending.
+
+        With ``dedupe_on`` (a column or a tuple of columns) only the last row
+        written for each key is kept.
+        Returns the number of rows in the final report (0 if nothing was written).
+        """
+        self.flush()
+        if not self._prepared and not (self.merge and os.path.exists(self.path)):
+            return 0
+
+        keep = None
+        if dedupe_on:
+            # Premiere passe: seulement les cles en memoire
+            key_columns = (dedupe_on,) if isinstance(dedupe_on, str) else tuple(dedupe_on)
+            last_seen = {}
+            for index, row in enumerate(self._iter_rows()):
+                last_seen[tuple(row.get(col) for col in key_columns)] = index
+            keep = set(last_seen.values())
+
+        def rows():
+            for index, row in enumerate(self._iter_rows()):
+                if keep is None or index in keep:
+                    yield row
+
+        total = 0
+        with tempfile.TemporaryDirectory(dir=os.path.dirname(self.path) or ".") as runs_dir:
+            runs = []
+            chunk: List[dict] = []
+            for row in rows():
+                chunk.append(row)
+                if len(chunk) >= self.sort_memory_rows:
+                    runs.append(self._write_run(chunk, sort_by, runs_dir, len(runs)))
+                    total += len(chunk)
+                    chunk = []
+            total += len(chunk)
+            if runs:
+                runs.append(self._write_run(chunk, sort_by, runs_dir, len(runs)))
+                readers = [self._read_run(path) for path in runs]
+                merged = heapq.merge(*readers, key=lambda r: _score(r, sort_by), reverse=True)
+                self._rewrite(merged)
+            else:
+                chunk.sort(key=lambda r: _score(r, sort_by), reverse=True)
+                self._rewrite(chunk)
+        return total
+
+    def _write_run(self, chunk: List[dict], sort_by: str, runs_dir: str, index: int) -> str:
+        chunk.sort(key=lambda r: _score(r, sort_by), reverse=True)
+        path = os.path.join(runs_dir, f"run_{index:05d}.csv")
+        with open(path, "w", newline="", encoding="utf-8") as fh:
+            writer = csv.DictWriter(fh, fieldnames=self.columns, extrasaction="ignore")
+            writer.writeheader()
+            writer.writerows(chunk)
+        return path
+
+    @staticmethod
+    def _read_run(path: str) -> Iterator[Dict[str, str]]:
+        with open(path, newline="", encoding="utf-8") as fh:
+            yield from csv.DictReader(fh)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # En cas d'erreur on garde un rapport partiel valide (non trie)
+        self.flush()
+        return False
+
+
+# ===== Parquet =====
+def report_schema(columns: Sequence[str]):
+    """Arrow schema of a report: float scores/probabilities, int pattern counts, strings otherwise."""
+    import pyarrow as pa
+
+    fields = []
+    for col in columns:
+        if col.endswith(("_score", "_prob")):
+            fields.append(pa.field(col, pa.float64()))
+        elif col.startswith(PATTERN_PREFIX):
+            fields.append(pa.field(col, pa.int32()))
+        elif col == "timestamp":
+            fields.append(pa.field(col, pa.timestamp("us")))
+        else:
+            fields.append(pa.field(col, pa.string()))
+    return pa.schema(fields)
+
+
+def csv_to_parquet(csv_path: str, parquet_path: str, row_group_rows: int = ROW_GROUP_ROWS) -> int:
+    """Stream a (sorted) CSV report into a Parquet file; returns the row count."""
+    import pyarrow.csv as pv
+    import pyarrow.parquet as pq
+
+    columns = _read_header(csv_path) or []
+    schema = report_schema(columns)
+    reader = pv.open_csv(
+        csv_path,
+        read_options=pv.ReadOptions(block_size=1 << 22),
+        parse_options=pv.ParseOptions(newlines_in_values=True),
+        convert_options=pv.ConvertOptions(column_types=schema, strings_can_be_null=False),
+    )
+    tmp = f"{parquet_path}.tmp"
+    rows = 0
+    try:
+        with pq.ParquetWriter(tmp, schema) as writer:
+            for batch in reader:
+                writer.write_batch(batch, row_group_size=row_group_rows)
+                rows += batch.num_rows
+        os.replace(tmp, parquet_path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+    return rows
+
+
+def parquet_to_csv(parquet_path: str, csv_path: str) -> None:
+    """Export a Parquet report back to a CSV spool (incremental merges)."""
+    import pyarrow.parquet as pq
+
+    parquet = pq.ParquetFile(parquet_path)
+    columns = parquet.schema_arrow.names
+    with open(csv_path, "w", newline="", encoding="utf-8") as fh:
+        writer = csv.DictWriter(fh, fieldnames=columns)
+        writer.writeheader()
+        for batch in parquet.iter_batches():
+            writer.writerows(batch.to_pylist())
+
+
+def list_reports(reports_dir) -> List[Path]:
+    """One file per report, oldest first by name; Parquet wins over a CSV spool of the same run."""
+    reports = {}
+    for path in Path(reports_dir).glob(REPORT_GLOB):
+        if path.suffix in REPORT_SUFFIXES:
+            current = reports.get(path.stem)
+            if current is None or REPORT_SUFFIXES.index(path.suffix) < REPORT_SUFFIXES.index(current.suffix):
+                reports[path.stem] = path
+    return [reports[stem] for stem in sorted(reports)]
+
+
+def find_latest_report(reports_dir) -> Optional[Path]:
+    """Newest report by name (timestamped)."""
+    reports = list_reports(reports_dir)
+    return reports[-1] if reports else None
+
+
+def find_latest_scan_report(reports_dir) -> Optional[Path]:
+    """Newest Parquet report of a one-shot scan (incremental merges never touch other reports)."""
+    for path in reversed(list_reports(reports_dir)):
+        if path.suffix == ".parquet" and SCAN_REPORT_RE.fullmatch(path.stem):
+            return path
+    return None
+
+
+def new_report_stem(reports_dir, suffix: str = "", now: Optional[datetime] = None) -> str:
+    """``dox_report_<YYYYmmdd_HHMM><suffix>``, numbered ``_2``, ``_3``... when that name is taken.
+
+    The numbered names sort after the first one, so ordering by name stays chronological.
+    """
+    base = f"dox_report_{(now or datetime.now()):%Y%m%d_%H%M}{suffix}"
+    stem, n = base, 1
+    while any(Path(reports_dir, f"{stem}{ext}").exists() for ext in REPORT_SUFFIXES):
+        n += 1
+        stem = f"{base}_{n}"
+    return stem
+
+
+def parquet_rows(path) -> int:
+    """Row count from the Parquet footer (no data read)."""
+    import pyarrow.parquet as pq
+
+    return pq.read_metadata(str(path)).num_rows
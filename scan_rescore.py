@@ -0,0 +1,195 @@
+"""Offline re-scoring of saved snippet dumps on a process pool.
+
+Dumps are JSONL (raw ``search.list`` items or flat ``video_id`` / ``title``
+/ ``description`` records) or Parquet files with those columns. Records are
+read in chunks and scored by worker processes that each load the fitted
+TF-IDF model once; hits are streamed into one sorted Parquet report.
+"""
+import json
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import scan_kpop_doxhunter as scanner
+from scan_clusters import minhash
+from scan_report import ReportWriter, csv_to_parquet
+
+CHUNK_SIZE = 2_000
+DEFAULT_QUERY = "rescore"
+
+# (video_id, title, description, query)
+Snippet = Tuple[str, str, str, str]
+
+
+def get_rescore_workers() -> int:
+    try:
+        return max(1, int(os.getenv("RESCORE_WORKERS", os.cpu_count() or 1)))
+    except ValueError:
+        return os.cpu_count() or 1
+
+
+# ===== Lecture des dumps =====
+def _snippet_from_record(record: dict) -> Optional[Snippet]:
+    if "snippet" in record:
+        # Item brut de search.list / videos.list
+        snippet = record.get("snippet") or {}
+        video_id = record.get("id")
+        if isinstance(video_id, dict):
+            video_id = video_id.get("videoId")
+        title, description = snippet.get("title"), snippet.get("description")
+    else:
+        video_id = record.get("video_id")
+        title, description = record.get("title"), record.get("description")
+    if not video_id:
+        return None
+    return str(video_id), title or "", description or "", record.get("query") or DEFAULT_QUERY
+
+
+def iter_jsonl(path) -> Iterator[Snippet]:
+    with open(path, encoding="utf-8") as fh:
+        for line_no, line in enumerate(fh, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                print(f"[WARN] {path}:{line_no}: invalid JSON line skipped.")
+                continue
+            snippet = _snippet_from_record(record) if isinstance(record, dict) else None
+            if snippet is not None:
+                yield snippet
+
+
+def iter_parquet(path, batch_rows: int = CHUNK_SIZE) -> Iterator[Snippet]:
+    import pyarrow.parquet as pq
+
+    parquet = pq.ParquetFile(path)
+    wanted = [col for col in ("video_id", "title", "description", "query") if col in parquet.schema_arrow.names]
+    for batch in parquet.iter_batches(batch_size=batch_rows, columns=wanted):
+        for record in batch.to_pylist():
+            snippet = _snippet_from_record(record)
+            if snippet is not None:
+                yield snippet
+
+
+def iter_snippets(paths: Iterable) -> Iterator[Snippet]:
+    """Snippets of every dump, in order; the format is picked from the suffix."""
+    for path in paths:
+        if Path(path).suffix == ".parquet":
+            yield from iter_parquet(path)
+        else:
+            yield from iter_jsonl(path)
+
+
+def iter_chunks(snippets: Iterable[Snippet], size: int = CHUNK_SIZE) -> Iterator[List[Snippet]]:
+    chunk = []
+    for snippet in snippets:
+        chunk.append(snippet)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+# ===== Workers =====
+def _target_model():
+    # Les cibles sont relues a chaque chunk (fichier minuscule); le modele reste en cache
+    targets = tuple(scanner.get_targets())
+    return scanner.get_target_model(targets), scanner.targets_by_query(targets)
+
+
+def _init_worker() -> None:
+    # Une seule lecture de l'artefact par processus (deja en memoire si fork)
+    _target_model()
+
+
+def score_chunk(chunk: Sequence[Snippet], timestamp: datetime) -> Tuple[int, List[dict], Dict[str, object]]:
+    """Score one chunk like a live scan; returns (scored count, hit rows, MinHash of each hit video).
+
+    Signatures are computed in the worker; the cluster index (SQLite) is
+    only touched by the parent process.
+    """
+    texts = [
+        f"{scanner.normalize_text(title)} {scanner.normalize_text(description)}".strip()
+        for _, title, description, _ in chunk
+    ]
+    model, query_targets = _target_model()
+    scores = scanner.score_batch(texts, model)
+    # Lignes, arrondis et seuils en colonnes: seuls les hits deviennent des dicts
+    frame = scanner.report_frame(
+        [query for *_, query in chunk], [video_id for video_id, *_ in chunk], [title for _, title, _, _ in chunk],
+        scores, timestamp, query_targets,
+    )
+    hits = frame[scanner.hit_mask(frame, model)]
+    signatures = {chunk[i][0]: minhash(texts[i]) for i in dict.fromkeys(hits.index)}
+    return len(chunk), scanner.report_records(hits), signatures
+
+
+def _score_chunks(chunks: Iterator[List[Snippet]], timestamp: datetime, workers: int):
+    if workers <= 1:
+        for chunk in chunks:
+            yield score_chunk(chunk, timestamp)
+        return
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        # Fenetre bornee: les dumps de plusieurs millions ne sont jamais tous en memoire
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(score_chunk, chunk, timestamp))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def rescore(
+    paths: Sequence,
+    output: Optional[str] = None,
+    workers: Optional[int] = None,
+    chunk_size: int = CHUNK_SIZE,
+) -> Tuple[Optional[str], int, int]:
+    """Re-score dumps into one Parquet report; returns (path, scored, hits).
+
+    The report is deduplicated on ``(video_id, target)`` (last record wins). No report
+    is written when nothing passes the thresholds (path is None).
+    """
+    workers = workers or get_rescore_workers()
+    timestamp = datetime.now()
+    if output is None:
+        stem = f"dox_report_{timestamp.strftime('%Y%m%d_%H%M')}_rescore"
+        output = os.path.join(scanner.REPORTS_DIR, f"{stem}.parquet")
+    spool_path = str(Path(output).with_suffix(".csv"))
+
+    # Artefact construit avant de lancer les workers (sinon chacun refait le fit)
+    _target_model()
+    writer = ReportWriter(spool_path, columns=scanner.REPORT_COLUMNS)
+    clusters = scanner.open_cluster_index()
+    feedback = scanner.open_feedback_filter()
+    scored = hits = 0
+    try:
+        with writer:
+            chunks = iter_chunks(iter_snippets(paths), chunk_size)
+            for count, rows, signatures in _score_chunks(chunks, timestamp, workers):
+                scored += count
+                if feedback is not None:
+                    rows = [row for row in rows if not feedback.suppress(row)]
+                hits += len(rows)
+                if clusters is not None:
+                    cluster_ids = {vid: clusters.assign(vid, sig) for vid, sig in signatures.items()}
+                    for row in rows:
+                        row["cluster_id"] = cluster_ids[row["video_id"]]
+                writer.extend(rows)
+    finally:
+        if clusters is not None:
+            clusters.close()
+
+    if not hits:
+        return None, scored, 0
+    writer.close(sort_by="dox_score", dedupe_on=("video_id", "target"))
+    hits = csv_to_parquet(spool_path, output)
+    os.unlink(spool_path)
+    return output, scored, hits
@@ -0,0 +1,182 @@
+"""Nearest-neighbour search of texts against a TF-IDF corpus.
+
+Two interchangeable indexes answer ``search(vecs, k)``: the ``k`` most
+similar corpus rows of each text (cosine similarity, best first).
+
+* ``ExactIndex``: sparse brute force (``cosine_similarity`` by blocks of
+  texts). Same scores as the original dense comparison. The cost grows with
+  the size of the corpus.
+* ``PrunedIndex``: a pruned inverted index over the TF-IDF terms. Each
+  corpus row is only posted under its ``PRUNE_TERMS_PER_DOC`` heaviest
+  terms. Each text is looked up with its ``QUERY_TERMS`` heaviest terms,
+  which are its rarest ones and have short posting lists. The resulting
+  approximate scores pick ``CANDIDATES`` rows per text, which are then
+  re-ranked with their exact similarity. A neighbour is missed only when it
+  shares none of the kept terms with the text, or when it ranks below the
+  candidate cut.
+
+``SIMILARITY_INDEX`` (env) selects the index: ``exact`` (default) or
+``pruned``.
+"""
+import os
+from typing import Optional, Tuple
+
+SIMILARITY_INDEX = "exact"
+INDEX_KINDS = ("exact", "pruned")
+BLOCK_TEXTS = 256  # textes compares en une fois (borne la matrice de similarites)
+PRUNE_TERMS_PER_DOC = 30
+QUERY_TERMS = 8
+CANDIDATES = 50  # candidats re-classes exactement par texte
+
+
+def get_similarity_index() -> str:
+    kind = os.getenv("SIMILARITY_INDEX", SIMILARITY_INDEX).strip().lower()
+    if kind not in INDEX_KINDS:
+        print(f"[WARN] Unknown SIMILARITY_INDEX '{kind}'; using '{SIMILARITY_INDEX}'.")
+        return SIMILARITY_INDEX
+    return kind
+
+
+def _best_per_row(matrix, k: int):
+    """Flat (docs, texts, values) of the ``k`` largest values of each row of a
+    (n_texts, n_corpus) CSR matrix."""
+    import numpy as np
+
+    counts = np.diff(matrix.indptr)
+    texts = np.repeat(np.arange(matrix.shape[0]), counts)
+    docs, values = matrix.indices, matrix.data
+    if counts.max(initial=0) <= k:
+        return docs, texts, values
+    keep = np.ones(len(values), dtype=bool)
+    for i in np.flatnonzero(counts > k):
+        lo, hi = matrix.indptr[i], matrix.indptr[i + 1]
+        if k == 1:
+            # argmax: premier maximum, donc la ligne la plus basse (comme la version dense)
+            best = lo + np.argmax(values[lo:hi])
+            keep[lo:hi] = False
+            keep[best] = True
+        else:
+            keep[lo:hi] = False
+            keep[lo + np.argpartition(-values[lo:hi], k - 1)[:k]] = True
+    return docs[keep], texts[keep], values[keep]
+
+
+def _top_k(docs, texts, values, n_texts: int, k: int):
+    """Best ``k`` (value, doc) per text from flat candidate triples; ties go to the lowest doc."""
+    import numpy as np
+
+    scores = np.zeros((n_texts, k))
+    ids = np.full((n_texts, k), -1, dtype=np.int64)
+    # Valeurs nulles: aucun terme commun, pas un voisin (comme une colonne vide)
+    keep = values > 0
+    docs, texts, values = docs[keep], texts[keep], values[keep]
+    order = np.lexsort((docs, -values, texts))
+    docs, texts, values = docs[order], texts[order], values[order]
+    starts = np.searchsorted(texts, np.arange(n_texts))
+    rank = np.arange(len(texts)) - starts[texts]
+    best = rank < k
+    scores[texts[best], rank[best]] = values[best]
+    ids[texts[best], rank[best]] = docs[best]
+    return scores, ids
+
+
+class ExactIndex:
+    """Sparse brute force over every corpus row."""
+
+    kind = "exact"
+
+    def __init__(self, X, block_texts: int = BLOCK_TEXTS):
+        self.X = X
+        self.block_texts = block_texts
+
+    def __len__(self) -> int:
+        return self.X.shape[0]
+
+    def search(self, vecs, k: int = 1) -> Tuple["np.ndarray", "np.ndarray"]:
+        """(scores, ids) of shape (n_texts, k); id -1 when no row shares a term."""
+        import numpy as np
+        from sklearn.metrics.pairwise import cosine_similarity
+
+        n_texts = vecs.shape[0]
+        scores = np.zeros((n_texts, k))
+        ids = np.full((n_texts, k), -1, dtype=np.int64)
+        for start in range(0, n_texts, self.block_texts):
+            block = vecs[start:start + self.block_texts]
+            # (n_corpus, n_block), meme orientation et produit que la version dense
+            sims = cosine_similarity(self.X, block, dense_output=False).T.tocsr()
+            scores[start:start + block.shape[0]], ids[start:start + block.shape[0]] = _top_k(
+                *_best_per_row(sims, k), block.shape[0], k
+            )
+        return scores, ids
+
+
+class PrunedIndex:
+    """Approximate search: pruned inverted index + exact re-ranking of the candidates."""
+
+    kind = "pruned"
+
+    def __init__(
+        self,
+        X,
+        terms_per_doc: int = PRUNE_TERMS_PER_DOC,
+        query_terms: int = QUERY_TERMS,
+        candidates: int = CANDIDATES,
+    ):
+        from sklearn.preprocessing import normalize
+
+        self.X = normalize(X).tocsr()
+        self.query_terms = query_terms
+        self.candidates = candidates
+        # Transposee stockee en CSR: une ligne de postings par terme
+        self.postings = _keep_largest(self.X, terms_per_doc).T.tocsr()
+
+    def __len__(self) -> int:
+        return self.X.shape[0]
+
+    def search(self, vecs, k: int = 1) -> Tuple["np.ndarray", "np.ndarray"]:
+        """(scores, ids) of shape (n_texts, k); scores of the returned rows are exact."""
+        import numpy as np
+        from sklearn.preprocessing import normalize
+
+        vecs = normalize(vecs).tocsr()
+        n_texts = vecs.shape[0]
+        # Score approche: termes les plus lourds du texte x postings conserves, (n_texts, n_corpus)
+        approx = (_keep_largest(vecs, self.query_terms) @ self.postings).tocsr()
+        docs, texts, _ = _best_per_row(approx, self.candidates)
+        # Re-classement exact de tous les couples (ligne, texte) en une operation
+        exact = np.asarray(self.X[docs].multiply(vecs[texts]).sum(axis=1)).ravel()
+        return _top_k(docs, texts, exact, n_texts, k)
+
+
+def _keep_largest(matrix, per_row: int):
+    """Copy of a CSR matrix keeping the ``per_row`` largest values of each row."""
+    import numpy as np
+    from scipy import sparse
+
+    rows, cols, data = [np.zeros(0, dtype=np.int64)], [np.zeros(0, dtype=np.int64)], [np.zeros(0)]
+    for i in range(matrix.shape[0]):
+        lo, hi = matrix.indptr[i], matrix.indptr[i + 1]
+        values = matrix.data[lo:hi]
+        keep = np.arange(hi - lo)
+        if hi - lo > per_row:
+            keep = np.argpartition(-values, per_row - 1)[:per_row]
+        rows.append(np.full(len(keep), i))
+        cols.append(matrix.indices[lo:hi][keep])
+        data.append(values[keep])
+    return sparse.csr_matrix(
+        (np.concatenate(data), (np.concatenate(rows), np.concatenate(cols))), shape=matrix.shape
+    )
+
+
+def build_index(X, kind: Optional[str] = None):
+    """Index of the corpus rows ``X`` (kind from ``SIMILARITY_INDEX`` by default)."""
+    kind = kind or get_similarity_index()
+    return PrunedIndex(X) if kind == "pruned" else ExactIndex(X)
+
+
+def index_version(kind: Optional[str] = None) -> str:
+    """Part of the scoring version: approximate scores must not be served as exact ones."""
+    kind = kind or get_similarity_index()
+    if kind == "pruned":
+        return f"pruned:{PRUNE_TERMS_PER_DOC}:{QUERY_TERMS}:{CANDIDATES}"
+    return kind
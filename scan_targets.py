@@ -0,0 +1,211 @@
+"""Scan targets: per-idol queries, dox corpus, aliases and thresholds.
+
+Targets are read from a JSON file (``TARGETS_FILE``, default
+``targets.json``)::
+
+    {"targets": [
+        {"name": "felix",
+         "queries": ["Felix maison Seoul", "Felix address Seoul"],
+         "corpus": ["felix habite a seoul dans le quartier de ...", "..."],
+         "aliases": ["felix", "lee felix", "yongbok"],
+         "min_dox_score": 0.25,
+         "hard_min_score": 0.30}
+    ]}
+
+``corpus`` defaults to the built-in DOX_CORPUS and thresholds to the global
+ones. Without a config file there is a single ``default`` target built from
+QUERIES / DOX_CORPUS.
+
+A video is reported for the targets whose queries found it and for those
+whose aliases appear in its normalized text; a target without aliases
+takes every video. All corpora share one vectorizer and are stacked in one
+sparse matrix, so each video is transformed once. Each target's block of
+rows is searched through its own similarity index (``scan_similarity``),
+which also gives the corpus example that matched best.
+"""
+import json
+import os
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+DEFAULT_TARGET = "default"
+TARGETS_FILE = "targets.json"
+
+
+def get_targets_file() -> str:
+    return os.getenv("TARGETS_FILE", TARGETS_FILE)
+
+
+@dataclass(frozen=True)
+class Target:
+    name: str
+    queries: Tuple[str, ...]
+    corpus: Tuple[str, ...]
+    aliases: Tuple[str, ...] = ()  # deja normalises (normalize_text)
+    min_dox_score: Optional[float] = None
+    hard_min_score: Optional[float] = None
+
+    def matches(self, text: str) -> bool:
+        """Whether a normalized text mentions one of the aliases (whole words)."""
+        if not self.aliases:
+            return True
+        padded = f" {text} "
+        return any(f" {alias} " in padded for alias in self.aliases)
+
+
+def _str_list(value, field_name: str, where: str, required: bool = False) -> Tuple[str, ...]:
+    if value is None and not required:
+        return ()
+    if not isinstance(value, list) or not all(isinstance(v, str) and v.strip() for v in value):
+        raise ValueError(f"{where}: '{field_name}' must be a list of non-empty strings")
+    if required and not value:
+        raise ValueError(f"{where}: '{field_name}' must not be empty")
+    return tuple(value)
+
+
+def _threshold(value, field_name: str, where: str) -> Optional[float]:
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not 0 <= value <= 1:
+        raise ValueError(f"{where}: '{field_name}' must be a number between 0 and 1")
+    return float(value)
+
+
+def parse_targets(
+    config: dict,
+    default_corpus: Sequence[str],
+    normalize: Callable[[str], str],
+    source: str = "targets",
+) -> List[Target]:
+    """Validate a decoded config; raises ValueError with the offending entry."""
+    entries = config.get("targets") if isinstance(config, dict) else None
+    if not isinstance(entries, list) or not entries:
+        raise ValueError(f"{source}: expected a non-empty 'targets' list")
+    targets = []
+    for index, entry in enumerate(entries):
+        where = f"{source}: targets[{index}]"
+        if not isinstance(entry, dict):
+            raise ValueError(f"{where}: expected an object")
+        name = entry.get("name")
+        if not isinstance(name, str) or not name.strip():
+            raise ValueError(f"{where}: 'name' must be a non-empty string")
+        where = f"{source}: target '{name}'"
+        if any(t.name == name for t in targets):
+            raise ValueError(f"{where}: duplicate name")
+        aliases = []
+        for alias in _str_list(entry.get("aliases"), "aliases", where):
+            normalized = normalize(alias)
+            if normalized:
+                aliases.append(normalized)
+            else:
+                # normalize_text ne garde que l'ASCII: un alias en hangul disparait
+                print(f"[WARN] {where}: alias '{alias}' is empty once normalized; ignored.")
+        if entry.get("aliases") and not aliases:
+            raise ValueError(f"{where}: no usable alias (aliases are matched on normalized ASCII text)")
+        targets.append(Target(
+            name=name,
+            queries=_str_list(entry.get("queries"), "queries", where, required=True),
+            corpus=_str_list(entry.get("corpus"), "corpus", where) or tuple(default_corpus),
+            aliases=tuple(dict.fromkeys(aliases)),
+            min_dox_score=_threshold(entry.get("min_dox_score"), "min_dox_score", where),
+            hard_min_score=_threshold(entry.get("hard_min_score"), "hard_min_score", where),
+        ))
+    return targets
+
+
+def load_targets(
+    path: Optional[str],
+    default_queries: Sequence[str],
+    default_corpus: Sequence[str],
+    normalize: Callable[[str], str],
+) -> List[Target]:
+    """Targets from ``path``, or the single default target when the file does not exist."""
+    if not path or not os.path.exists(path):
+        return [Target(DEFAULT_TARGET, tuple(default_queries), tuple(default_corpus))]
+    with open(path, encoding="utf-8") as fh:
+        try:
+            config = json.load(fh)
+        except ValueError as exc:
+            raise ValueError(f"{path}: invalid JSON ({exc})") from None
+    return parse_targets(config, default_corpus, normalize, source=path)
+
+
+def targets_by_query(targets: Sequence[Target]) -> Dict[str, Tuple[str, ...]]:
+    """Each distinct query (first-seen order) -> names of the targets that list it."""
+    mapping: Dict[str, List[str]] = {}
+    for target in targets:
+        for query in target.queries:
+            names = mapping.setdefault(query, [])
+            if target.name not in names:
+                names.append(target.name)
+    return {query: tuple(names) for query, names in mapping.items()}
+
+
+def stack_corpora(targets: Sequence[Target]) -> Tuple[Tuple[str, ...], List[int], List[int]]:
+    """(distinct documents, row of each target document, first row of each target).
+
+    Documents shared by several targets are fitted once, so the IDF of a
+    single target config is the same as fitting its corpus alone.
+    """
+    documents: Dict[str, int] = {}
+    rows: List[int] = []
+    offsets: List[int] = []
+    for target in targets:
+        offsets.append(len(rows))
+        for doc in target.corpus:
+            rows.append(documents.setdefault(doc, len(documents)))
+    return tuple(documents), rows, offsets
+
+
+class TargetModel:
+    """Shared vectorizer + stacked corpus rows of every target."""
+
+    def __init__(
+        self,
+        targets: Sequence[Target],
+        vectorizer,
+        X_documents,
+        rows: Sequence[int],
+        offsets: Sequence[int],
+        index_kind: Optional[str] = None,
+    ):
+        from scan_similarity import build_index
+
+        self.targets = list(targets)
+        self.names = [t.name for t in self.targets]
+        self.vectorizer = vectorizer
+        # Lignes empilees dans l'ordre des cibles (une ligne par document de chaque cible)
+        self.X_train = X_documents[list(rows)]
+        self.offsets = list(offsets)
+        self._by_name = {t.name: t for t in self.targets}
+        bounds = list(self.offsets) + [len(rows)]
+        # Un index par cible: le meilleur exemple de chaque cible, pas seulement le meilleur global
+        self.indexes = [
+            build_index(self.X_train[bounds[t]:bounds[t + 1]], index_kind) for t in range(len(self.targets))
+        ]
+
+    def target(self, name: Optional[str]) -> Optional[Target]:
+        return self._by_name.get(name)
+
+    def neighbours(self, vecs):
+        """(sims, rows), both (n_targets, n_texts).
+
+        Best cosine similarity of each text per target, and the position of
+        that example in the target's corpus (-1 when none shares a term).
+        """
+        import numpy as np
+
+        sims = np.zeros((len(self.targets), vecs.shape[0]))
+        rows = np.full((len(self.targets), vecs.shape[0]), -1, dtype=np.int64)
+        for t, index in enumerate(self.indexes):
+            scores, ids = index.search(vecs, k=1)
+            sims[t], rows[t] = scores[:, 0], ids[:, 0]
+        return sims, rows
+
+    def similarities(self, vecs):
+        """(n_targets, n_texts) best cosine similarity of each text per target."""
+        return self.neighbours(vecs)[0]
+
+    def example(self, t: int, row: int) -> str:
+        """Corpus example ``row`` of target ``t`` ("" for -1)."""
+        return self.targets[t].corpus[row] if row >= 0 else ""
@@ -0,0 +1,301 @@
+"""Long-running watch mode: rescan queries on their own schedule.
+
+The process stays warm (TF-IDF model, pooled HTTP session, SQLite cache,
+quota scheduler) and loops over due queries. Each query's interval shrinks
+when it recently produced hits and grows back to ``MAX_INTERVAL_SECONDS``
+when it does not. Queries are fetched incrementally (``publishedAfter``
+high-water marks) and hits are merged into one ``dox_report_*_watch``
+report, republished as Parquet after every cycle so the dashboard sees
+them right away. The report rotates every day, or earlier once it holds
+``WATCH_REPORT_MAX_ROWS`` rows, so a republish costs at most one day of
+hits instead of the whole history.
+
+State (per-query schedule, current report, quota pause) is written
+atomically to ``STATE_DIR/watch.json`` after each cycle; the CSV spool of
+the report stays valid if the process is killed, and is republished on
+the next start.
+"""
+import json
+import os
+import threading
+from datetime import datetime
+from typing import List, Optional, Sequence
+
+import scan_kpop_doxhunter as scanner
+from scan_metrics import NULL_METRICS, Metrics, NullMetrics, save_summary
+from scan_quota import SystemClock
+from scan_report import ReportWriter, csv_to_parquet, new_report_stem
+
+BASE_INTERVAL_SECONDS = 30 * 60  # une query a ~1 hit par scan repasse toutes les 30 min
+MIN_INTERVAL_SECONDS = 5 * 60
+MAX_INTERVAL_SECONDS = 6 * 3600
+QUOTA_PAUSE_SECONDS = 3600  # apres un 403/429 ou budget epuise
+HIT_RATE_ALPHA = 0.5  # poids du dernier scan dans la moyenne mobile des hits
+IDLE_POLL_SECONDS = 60
+WATCH_REPORT_MAX_ROWS = 100_000  # au-dela, nouveau rapport (le tri/dedup de publish reste borne)
+
+
+def get_report_max_rows() -> int:
+    try:
+        return max(1, int(os.getenv("WATCH_REPORT_MAX_ROWS", WATCH_REPORT_MAX_ROWS)))
+    except ValueError:
+        return WATCH_REPORT_MAX_ROWS
+
+
+def watch_interval(ema_hits: float, base: float = BASE_INTERVAL_SECONDS,
+                   low: float = MIN_INTERVAL_SECONDS, high: float = MAX_INTERVAL_SECONDS) -> float:
+    """Seconds until the next scan: ``base / recent hits per scan``, clamped."""
+    if ema_hits <= base / high:
+        return high
+    return max(low, min(high, base / ema_hits))
+
+
+class Watcher:
+    """Scan loop with per-query schedules; ``stop()`` ends it once the queries already fetched are written."""
+
+    def __init__(
+        self,
+        queries: Optional[Sequence[str]] = None,
+        session=None,
+        clock=None,
+        metrics: Optional[NullMetrics] = None,
+        base_interval: float = BASE_INTERVAL_SECONDS,
+        min_interval: float = MIN_INTERVAL_SECONDS,
+        max_interval: float = MAX_INTERVAL_SECONDS,
+    ):
+        self.api_key = scanner.require_api_key()
+        targets = scanner.get_targets()
+        self.query_targets = scanner.targets_by_query(targets)
+        self.queries = list(queries if queries is not None else self.query_targets)
+        self.clock = clock or SystemClock()
+        self.base_interval = base_interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        if metrics is None:
+            metrics = Metrics() if scanner.metrics_enabled() else NULL_METRICS
+        self.metrics = metrics
+        self.cycles = 0
+        self._stop = threading.Event()
+        self.state_path = os.path.join(scanner.get_state_dir(), "watch.json")
+        self.state = self._load_state()
+
+        # Tout ce qui coute au demarrage est charge une seule fois
+        self.model = scanner.get_target_model(tuple(targets))
+        self.version = scanner.scoring_version(targets)
+        self.max_workers = scanner.get_max_workers()
+        self.max_pages = scanner.get_max_pages()
+        self._own_session = session is None
+        self.session = session or scanner.make_session(self.max_workers)
+        self.cache = scanner.open_cache()
+        self.clusters = scanner.open_cluster_index()
+        # Recharge le modele de feedback a chaque changement du fichier (labels du dashboard)
+        self.feedback = scanner.open_feedback_filter()
+        self.scheduler = scanner.open_quota_scheduler()
+        self.high_water = scanner.load_high_water()
+        self.enrich = scanner.enrich_enabled()
+        self._recover_report()
+
+    # ----- etat persistant -----
+    def _load_state(self) -> dict:
+        try:
+            with open(self.state_path, encoding="utf-8") as fh:
+                state = json.load(fh)
+        except (OSError, ValueError):
+            state = {}
+        if not isinstance(state, dict):
+            state = {}
+        state.setdefault("queries", {})
+        state.setdefault("report", None)
+        state.setdefault("report_rows", 0)
+        state.setdefault("paused_until", 0)
+        return state
+
+    def save_state(self) -> None:
+        os.makedirs(os.path.dirname(self.state_path) or ".", exist_ok=True)
+        tmp = f"{self.state_path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump(self.state, fh, indent=2, sort_keys=True)
+        os.replace(tmp, self.state_path)
+
+    def _report_paths(self):
+        stem = self.state["report"]
+        return (
+            os.path.join(scanner.get_reports_dir(), f"{stem}.csv"),
+            os.path.join(scanner.get_reports_dir(), f"{stem}.parquet"),
+        )
+
+    def _rotate_report(self) -> None:
+        """Start a new report on a new day, or when the current one is full."""
+        now = datetime.now()
+        stem = self.state["report"]
+        if stem and stem.startswith(f"dox_report_{now:%Y%m%d}_") and self.state["report_rows"] < get_report_max_rows():
+            return
+        self.state["report"] = new_report_stem(scanner.get_reports_dir(), "_watch", now)
+        self.state["report_rows"] = 0
+
+    def _recover_report(self) -> None:
+        # Process tue entre l'ecriture du spool et la publication: on republie
+        if not self.state["report"]:
+            return
+        spool, report = self._report_paths()
+        if os.path.exists(spool) and (
+            not os.path.exists(report) or os.path.getmtime(spool) > os.path.getmtime(report)
+        ):
+            self.publish()
+
+    # ----- planification -----
+    def _query_state(self, query: str) -> dict:
+        # Query jamais vue: due tout de suite, 1 hit/scan suppose (comme query_yield)
+        return self.state["queries"].setdefault(query, {"next_due": 0, "ema_hits": 1.0, "last_scan": None})
+
+    def interval(self, query: str) -> float:
+        return watch_interval(
+            self._query_state(query)["ema_hits"], self.base_interval, self.min_interval, self.max_interval
+        )
+
+    def due_queries(self) -> List[str]:
+        """Queries whose next scan time has passed, most overdue first."""
+        now = self.clock.now()
+        if now < self.state["paused_until"]:
+            return []
+        due = [q for q in self.queries if self._query_state(q)["next_due"] <= now]
+        return sorted(due, key=lambda q: self._query_state(q)["next_due"])
+
+    def seconds_until_due(self) -> float:
+        now = self.clock.now()
+        next_due = min((self._query_state(q)["next_due"] for q in self.queries), default=now + IDLE_POLL_SECONDS)
+        return max(0.0, max(next_due, self.state["paused_until"]) - now)
+
+    def _record_scan(self, query: str, hits: int) -> None:
+        now = self.clock.now()
+        entry = self._query_state(query)
+        entry["ema_hits"] = HIT_RATE_ALPHA * hits + (1 - HIT_RATE_ALPHA) * entry["ema_hits"]
+        entry["last_scan"] = now
+        entry["next_due"] = now + self.interval(query)
+
+    # ----- scan -----
+    def _suppressed(self, row: dict, stats) -> bool:
+        """True when the feedback model drops this hit as a likely false positive."""
+        if self.feedback is None or not self.feedback.suppress(row):
+            return False
+        stats.suppressed += 1
+        self.metrics.inc("hits_suppressed_total")
+        return True
+
+    def scan_cycle(self, queries: Sequence[str]) -> int:
+        """Fetch and score ``queries`` once, merge hits into the report; returns the hit count."""
+        self._rotate_report()
+        spool, _ = self._report_paths()
+        stats = scanner.ScanStats(high_water=dict(self.high_water))
+        writer = ReportWriter(spool, columns=scanner.REPORT_COLUMNS, merge=True)
+        # Pas de cache de pages ici (TTL de 6 h > intervalle de rescan); les scores restent caches
+        fetches = scanner.fetch_all_queries(
+            self.session, queries, self.api_key, self.max_pages, self.max_workers,
+            None, self.high_water, self.scheduler, self.metrics,
+        )
+        rows = scanner.iter_scored_videos(
+            fetches, stats, set(), self.model, self.version, self.cache, self.metrics, self.query_targets,
+            self.clusters,
+        )
+        enricher = None
+        if self.enrich:
+            from scan_enrich import Enricher
+
+            enricher = Enricher(
+                self.session, self.api_key, self.model, self.scheduler, self.metrics, clusters=self.clusters
+            )
+            rows = enricher.iter_rows(rows)
+        hits = 0
+        try:
+            with writer:
+                for row in rows:
+                    if scanner.is_hit(row, self.model) and not self._suppressed(row, stats):
+                        writer.append(row)
+                        stats.hits_by_query[row["query"]] += 1
+                        stats.hits_by_target[row["target"]] += 1
+                        stats.hits_by_severity[row["severity"]] += 1
+                        self.metrics.inc("hits_total", severity=row["severity"])
+                        hits += 1
+                    if self._stop.is_set():
+                        # Arret: plus de nouvelle query, mais les lignes des queries deja lues (et le
+                        # lot de l'Enricher) vont jusqu'au writer avant que leur repere ne soit sauve
+                        fetches.close()
+        finally:
+            # Requetes en vol annulees, les queries non traitees restent dues
+            rows.close()
+            fetches.close()
+        if enricher is not None:
+            stats.quota_blocked = stats.quota_blocked or enricher.quota_blocked
+            stats.budget_exhausted = stats.budget_exhausted or enricher.budget_exhausted
+
+        for query in stats.network_calls:
+            self._record_scan(query, stats.hits_by_query[query])
+            if stats.network_calls[query]:
+                self.scheduler.record_yield(query, stats.network_calls[query], stats.hits_by_query[query])
+        self.scheduler.save()
+        self.high_water.update(stats.high_water)
+        scanner.save_high_water(self.high_water)
+        if stats.quota_blocked or stats.budget_exhausted:
+            print(f"[WARN] Quota reached; watch paused for {QUOTA_PAUSE_SECONDS // 60} min.")
+            self.state["paused_until"] = self.clock.now() + QUOTA_PAUSE_SECONDS
+        self.metrics.inc("videos_scored_total", stats.videos_scored)
+        self.metrics.inc("watch_cycles_total")
+        self.cycles += 1
+
+        if hits:
+            self.publish(stats)
+        self.save_state()
+        return hits
+
+    def publish(self, stats: Optional[scanner.ScanStats] = None) -> None:
+        """Sort/dedupe the spool and rewrite the Parquet report the dashboard reads."""
+        spool, report = self._report_paths()
+        if not os.path.exists(spool):
+            return
+        writer = ReportWriter(spool, columns=scanner.REPORT_COLUMNS, merge=True)
+        with self.metrics.timer("stage_seconds", stage="report_write"):
+            total = writer.close(sort_by="dox_score", dedupe_on=("video_id", "target"))
+            csv_to_parquet(spool, report)
+        self.state["report_rows"] = total
+        summary = scanner.run_summary(
+            stats or scanner.ScanStats(),
+            self.metrics,
+            datetime.now(),
+            report=report,
+            watch_cycles=self.cycles,
+            report_rows=total,
+            quota_spent=self.scheduler.spent,
+        )
+        save_summary(report, summary)
+        print(f"[KpopDoxHunter] Watch report updated: {total} hits in {report}")
+
+    # ----- boucle -----
+    def run(self, max_cycles: Optional[int] = None) -> None:
+        """Scan due queries until ``stop()`` (or ``max_cycles`` cycles)."""
+        try:
+            while not self._stop.is_set():
+                if max_cycles is not None and self.cycles >= max_cycles:
+                    break
+                due = self.due_queries()
+                if not due:
+                    self.clock.sleep(max(1.0, self.seconds_until_due()), self._stop)
+                    continue
+                self.scan_cycle(due)
+        finally:
+            self.close()
+
+    def stop(self, *_signal_args) -> None:
+        """Request a graceful stop (usable as a signal handler)."""
+        self._stop.set()
+
+    def close(self) -> None:
+        self.save_state()
+        self.scheduler.save()
+        if self._own_session:
+            self.session.close()
+        if self.cache is not None:
+            self.cache.close()
+            self.cache = None
+        if self.clusters is not None:
+            self.clusters.close()
+            self.clusters = None
@@ -0,0 +1,15 @@
+import os
+
+import pytest
+
+
+@pytest.fixture(autouse=True, scope="session")
+def _model_dir(tmp_path_factory):
+    """Model artifacts built by the tests go to a temporary MODEL_DIR, never ./models."""
+    previous = os.environ.get("MODEL_DIR")
+    os.environ["MODEL_DIR"] = str(tmp_path_factory.mktemp("models"))
+    yield
+    if previous is None:
+        os.environ.pop("MODEL_DIR", None)
+    else:
+        os.environ["MODEL_DIR"] = previous
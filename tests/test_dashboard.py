@@ -0,0 +1,243 @@
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import pandas as pd
+
+import dashboard
+from scan_metrics import Metrics
+from scan_report import ReportWriter, csv_to_parquet
+
+
+def write_parquet_report(directory, name, rows):
+    """Ecrit un rapport comme le scanner: spool CSV trie puis Parquet."""
+    columns = list(rows[0].keys())
+    spool = str(Path(directory, f"{name}.csv"))
+    writer = ReportWriter(spool, columns=columns)
+    writer.extend(rows)
+    writer.close()
+    csv_to_parquet(spool, str(Path(directory, f"{name}.parquet")))
+    Path(spool).unlink()
+
+
+def report_row(video_id, score, severity):
+    return {
+        "query": "felix",
+        "title": f"Felix {video_id}",
+        "display_title": f"Felix {video_id}",
+        "video_id": video_id,
+        "ml_score": 0.5,
+        "rule_score": 0.4,
+        "dox_score": score,
+        "severity": severity,
+        "timestamp": "2026-01-01 10:00:00",
+        "pat_coords_gps": 1,
+    }
+
+
+class DashboardReportTests(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.reports = Path(self._tmp.name)
+        patcher = patch.object(dashboard, "REPORTS_DIR", self.reports)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        dashboard.report_cache.clear()
+        self.addCleanup(dashboard.report_cache.clear)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_parquet_report_is_typed_and_sorted(self):
+        write_parquet_report(self.reports, "dox_report_20260101_1000", [
+            report_row("a", 0.35, "MEDIUM"),
+            report_row("b", 0.80, "CRITICAL"),
+            report_row("c", 0.50, "HIGH"),
+        ])
+
+        df = dashboard.load_report(self.reports / "dox_report_20260101_1000.parquet")
+
+        self.assertEqual(list(df["video_id"]), ["b", "c", "a"])
+        self.assertEqual(str(df["pat_coords_gps"].dtype), "int32")
+        self.assertTrue(pd.api.types.is_datetime64_any_dtype(df["timestamp"]))
+
+    def test_reads_only_requested_columns_and_severities(self):
+        write_parquet_report(self.reports, "dox_report_20260101_1000", [
+            report_row("a", 0.35, "MEDIUM"),
+            report_row("b", 0.80, "CRITICAL"),
+        ])
+
+        df = dashboard.get_latest_report(severities=["CRITICAL"])
+
+        self.assertEqual(list(df["video_id"]), ["b"])
+        self.assertNotIn("pat_coords_gps", df.columns)
+        self.assertNotIn("query", df.columns)
+
+    def test_legacy_csv_report_still_loads(self):
+        (self.reports / "dox_report_20251215_2250.csv").write_text(
+            "query,title,video_id,dox_score,timestamp\n"
+            "q,Low,low1,0.31,2025-12-15 22:50:19\n"
+            "q,High,high1,0.72,2025-12-15 22:50:19\n",
+            encoding="utf-8",
+        )
+
+        df = dashboard.get_latest_report()
+
+        self.assertEqual(list(df["video_id"]), ["high1", "low1"])
+        self.assertEqual(set(df["severity"]), {"UNKNOWN"})
+        self.assertEqual(list(df["display_title"]), ["High", "Low"])
+
+    def test_latest_report_prefers_newest_then_parquet(self):
+        (self.reports / "dox_report_20251215_2250.csv").write_text(
+            "title,video_id,dox_score\nOld,old1,0.9\n", encoding="utf-8"
+        )
+        write_parquet_report(self.reports, "dox_report_20260101_1000", [report_row("new", 0.4, "MEDIUM")])
+        # Spool CSV d'un run converti: ignore au profit du Parquet
+        (self.reports / "dox_report_20260101_1000.csv").write_text(
+            "title,video_id,dox_score\nSpool,spool1,0.9\n", encoding="utf-8"
+        )
+
+        df = dashboard.get_latest_report()
+
+        self.assertEqual(list(df["video_id"]), ["new"])
+
+    def test_index_renders_parquet_report(self):
+        write_parquet_report(self.reports, "dox_report_20260101_1000", [report_row("vid42", 0.8, "CRITICAL")])
+
+        response = dashboard.app.test_client().get("/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b"watch?v=vid42", response.data)
+
+
+class DashboardViewTests(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.reports = Path(self._tmp.name)
+        patcher = patch.object(dashboard, "REPORTS_DIR", self.reports)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        dashboard.report_cache.clear()
+        self.addCleanup(dashboard.report_cache.clear)
+        self.client = dashboard.app.test_client()
+        severities = ["CRITICAL", "HIGH", "MEDIUM", "LOW"]
+        write_parquet_report(self.reports, "dox_report_20260101_1000", [
+            report_row(f"v{i:03d}", round(0.30 + i / 1000, 3), severities[i % 4]) for i in range(120)
+        ])
+
+    def test_pagination(self):
+        first = self.client.get("/?per_page=50")
+        last = self.client.get("/?per_page=50&page=3")
+
+        self.assertIn(b"watch?v=v119", first.data)
+        self.assertNotIn(b"watch?v=v069", first.data)
+        self.assertIn(b"Page 1 / 3", first.data)
+        self.assertIn(b"watch?v=v000", last.data)
+        self.assertEqual(last.data.count(b"watch?v="), 20)
+
+    def test_sort_and_severity_filter(self):
+        response = self.client.get("/?sort=dox_score&order=asc&severity=critical&per_page=5")
+
+        links = [line for line in response.data.split(b"\n") if b"watch?v=" in line]
+        self.assertIn(b"v000", links[0])
+        self.assertIn(b"v004", links[1])
+        self.assertIn(b"30 video(s)", response.data)
+
+    def test_target_filter(self):
+        rows = [dict(report_row(f"t{i:02d}", 0.5 + i / 100, "HIGH"), target=["felix", "hyunjin"][i % 2]) for i in range(6)]
+        write_parquet_report(self.reports, "dox_report_20260102_1000", rows)
+
+        response = self.client.get("/?target=hyunjin")
+
+        self.assertIn(b"3 video(s)", response.data)
+        self.assertIn(b"watch?v=t05", response.data)
+        self.assertNotIn(b"watch?v=t04", response.data)
+        self.assertIn(b"target=felix", response.data)
+
+    def test_clusters_collapse_to_best_row_with_count(self):
+        rows = [dict(report_row(f"r{i}", 0.9 - i / 100, "CRITICAL"), cluster_id="r0") for i in range(4)]
+        rows.append(dict(report_row("solo", 0.5, "HIGH"), cluster_id="solo"))
+        write_parquet_report(self.reports, "dox_report_20260102_1000", rows)
+
+        collapsed = self.client.get("/")
+        expanded = self.client.get("/?collapse=0")
+        cluster = self.client.get("/?cluster=r0&target=default")
+
+        self.assertIn(b"2 video(s)", collapsed.data)
+        self.assertIn(b"watch?v=r0", collapsed.data)
+        self.assertNotIn(b"watch?v=r1", collapsed.data)
+        self.assertIn(b"4 uploads", collapsed.data)
+        self.assertIn(b"5 video(s)", expanded.data)
+        self.assertEqual(cluster.data.count(b"watch?v="), 4)
+
+    def test_matched_example_shown_when_present(self):
+        rows = [dict(report_row("ex1", 0.9, "CRITICAL"), matched_example="felix habite a seoul")]
+        write_parquet_report(self.reports, "dox_report_20260102_1000", rows)
+
+        response = self.client.get("/")
+
+        self.assertIn(b"closest example: felix habite a seoul", response.data)
+
+    def test_invalid_args_fall_back_to_defaults(self):
+        response = self.client.get("/?page=abc&per_page=-3&sort=__class__&order=sideways")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b"watch?v=v119", response.data)
+
+    def test_not_modified_when_etag_matches(self):
+        first = self.client.get("/?page=2")
+        etag = first.headers["ETag"]
+
+        again = self.client.get("/?page=2", headers={"If-None-Match": etag})
+        other_page = self.client.get("/?page=3", headers={"If-None-Match": etag})
+
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(again.data, b"")
+        self.assertEqual(other_page.status_code, 200)
+        self.assertIsNotNone(first.headers.get("Last-Modified"))
+
+    def test_report_is_cached_until_file_changes(self):
+        with patch.object(dashboard, "load_report", wraps=dashboard.load_report) as load:
+            self.client.get("/")
+            self.client.get("/?page=2")
+            self.assertEqual(load.call_count, 1)
+
+            write_parquet_report(self.reports, "dox_report_20260101_1000", [report_row("fresh", 0.9, "HIGH")])
+            response = self.client.get("/")
+
+        self.assertEqual(load.call_count, 2)
+        self.assertIn(b"watch?v=fresh", response.data)
+
+    def test_metrics_endpoint(self):
+        (self.reports / "dox_report_20260101_1000.summary.json").write_text(
+            '{"videos_scored": 120, "hits_by_severity": {"HIGH": 30}, "metrics": {"counters": '
+            '[{"name": "retries_total", "labels": {"reason": "network"}, "value": 2}], "histograms": []}}',
+            encoding="utf-8",
+        )
+        with patch.object(dashboard, "dashboard_metrics", Metrics()):
+            self.client.get("/")
+            response = self.client.get("/metrics")
+        text = response.get_data(as_text=True)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.mimetype.startswith("text/plain"))
+        self.assertIn('doxhunter_dashboard_requests_total{endpoint="index",status="200"} 1', text)
+        self.assertIn("doxhunter_dashboard_report_load_seconds_count 1", text)
+        self.assertIn("doxhunter_last_run_videos_scored 120", text)
+        self.assertIn('doxhunter_last_run_hits_by_severity{severity="HIGH"} 30', text)
+        self.assertIn('doxhunter_retries_total{reason="network"} 2', text)
+
+    def test_new_report_changes_etag(self):
+        etag = self.client.get("/").headers["ETag"]
+        write_parquet_report(self.reports, "dox_report_20260102_1000", [report_row("next", 0.5, "LOW")])
+
+        response = self.client.get("/", headers={"If-None-Match": etag})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b"watch?v=next", response.data)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,28 +1,56 @@
+import json
 import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
 import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
+from urllib.parse import parse_qs, urlparse
 from unittest.mock import MagicMock, patch
 
 import pandas as pd
 import scan_kpop_doxhunter as scan
+from scan_cache import ScanCache
 from requests.exceptions import RequestException
 
 
+def legacy_normalize_text(text):
+    """Implementation de reference (avant les chemins rapides)."""
+    import html
+    import re
+    import unicodedata
+
+    text = html.unescape(text or "")
+    text = unicodedata.normalize("NFKD", text)
+    text = text.encode("ascii", "ignore").decode()
+    text = text.lower()
+    text = re.sub(r"\s+", " ", text).strip()
+    return text
+
+
 class ScanKpopDoxhunterTests(unittest.TestCase):
     def setUp(self):
         self._api_key = os.environ.get("YOUTUBE_API_KEY")
         self._queries = scan.QUERIES
-        self._existing_reports = {p.name for p in Path("reports").glob("dox_report_*.csv")}
+        self._existing_reports = {p.name for p in Path("reports").glob("dox_report_*")}
         os.environ["YOUTUBE_API_KEY"] = "TEST_KEY"
         scan.QUERIES = ["felix maison test"]
+        self._state_dir = tempfile.TemporaryDirectory()
+        os.environ["STATE_DIR"] = self._state_dir.name
 
     def tearDown(self):
+        os.environ.pop("STATE_DIR", None)
+        self._state_dir.cleanup()
         if self._api_key is None:
             os.environ.pop("YOUTUBE_API_KEY", None)
         else:
             os.environ["YOUTUBE_API_KEY"] = self._api_key
         scan.QUERIES = self._queries
-        current = {p.name for p in Path("reports").glob("dox_report_*.csv")}
+        current = {p.name for p in Path("reports").glob("dox_report_*")}
         new_files = current - self._existing_reports
         for name in new_files:
             Path("reports", name).unlink(missing_ok=True)
@@ -44,7 +72,7 @@ class ScanKpopDoxhunterTests(unittest.TestCase):
         }
         return mock_resp
 
-    @patch("scan_kpop_doxhunter.requests.get")
+    @patch("scan_kpop_doxhunter.requests.Session.get")
     def test_ml_dox_hunter_returns_scored_df(self, mock_get):
         mock_get.return_value = self._mock_response()
 
@@ -59,7 +87,7 @@ class ScanKpopDoxhunterTests(unittest.TestCase):
         self.assertIn("display_title", df.columns)
         self.assertGreaterEqual(df["dox_score"].iloc[0], scan.MIN_DOX_SCORE)
 
-    @patch("scan_kpop_doxhunter.requests.get", side_effect=RequestException("network down"))
+    @patch("scan_kpop_doxhunter.requests.Session.get", side_effect=RequestException("network down"))
     def test_ml_dox_hunter_exits_on_all_failures(self, mock_get):
         scan.QUERIES = ["felix maison test"]
 
@@ -72,7 +100,7 @@ class ScanKpopDoxhunterTests(unittest.TestCase):
         mock_resp.raise_for_status.side_effect = RequestException(response=mock_resp)
         return mock_resp
 
-    @patch("scan_kpop_doxhunter.requests.get")
+    @patch("scan_kpop_doxhunter.requests.Session.get")
     def test_pagination_and_dedup(self, mock_get):
         # Simule 2 pages avec doublon de video_id
         first_page = MagicMock()
@@ -112,7 +140,7 @@ class ScanKpopDoxhunterTests(unittest.TestCase):
         self.assertEqual(len(df), 1)
         self.assertEqual(df.iloc[0]["video_id"], "abc123")
 
-    @patch("scan_kpop_doxhunter.requests.get")
+    @patch("scan_kpop_doxhunter.requests.Session.get")
     def test_ml_dox_hunter_saves_partial_then_exits_on_quota(self, mock_get):
         # First query succeeds, second hits quota and stops after saving partial results
         success = self._mock_response()
@@ -120,19 +148,243 @@ class ScanKpopDoxhunterTests(unittest.TestCase):
         mock_get.side_effect = [success, quota]
         scan.QUERIES = ["felix maison test", "felix quota test"]
 
-        before = {p.name for p in Path("reports").glob("dox_report_*.csv")}
+        before = {p.name for p in Path("reports").glob("dox_report_*.parquet")}
         with self.assertRaises(SystemExit):
             scan.ml_dox_hunter()
 
-        after = {p.name for p in Path("reports").glob("dox_report_*.csv")}
+        after = {p.name for p in Path("reports").glob("dox_report_*.parquet")}
         new_files = list(after - before)
         self.assertTrue(new_files, "No report saved before quota exit")
         latest = Path("reports", sorted(new_files)[-1])
-        df_saved = pd.read_csv(latest)
+        df_saved = pd.read_parquet(latest)
         self.assertFalse(df_saved.empty)
         self.assertIn("dox_score", df_saved.columns)
 
-    @patch("scan_kpop_doxhunter.requests.get")
+    @patch("scan_kpop_doxhunter.requests.Session.get")
+    def test_second_run_served_from_cache(self, mock_get):
+        mock_get.return_value = self._mock_response()
+        first = scan.ml_dox_hunter()
+
+        with patch("scan_kpop_doxhunter.normalize_text") as mock_normalize:
+            second = scan.ml_dox_hunter()
+
+        self.assertEqual(mock_get.call_count, 1)
+        mock_normalize.assert_not_called()
+        pd.testing.assert_frame_equal(
+            first.drop(columns="timestamp"), second.drop(columns="timestamp")
+        )
+
+    @patch("scan_kpop_doxhunter.requests.Session.get")
+    def test_run_persists_quota_spent_and_query_yield(self, mock_get):
+        mock_get.return_value = self._mock_response()
+        scan.ml_dox_hunter()
+
+        scheduler = scan.open_quota_scheduler()
+        self.assertEqual(scheduler.spent, 100)
+        self.assertEqual(scheduler.query_stats(), {"felix maison test": {"calls": 1, "hits": 1}})
+
+    @patch("scan_kpop_doxhunter.requests.Session.get")
+    def test_instrumented_run_saves_summary_next_to_report(self, mock_get):
+        mock_get.return_value = self._mock_response()
+        with tempfile.TemporaryDirectory() as reports, patch.object(scan, "REPORTS_DIR", reports), \
+                patch.dict(os.environ, {"METRICS_ENABLED": "1"}):
+            scan.ml_dox_hunter()
+            report = next(Path(reports).glob("dox_report_*.parquet"))
+            summary = json.loads(report.with_suffix(".summary.json").read_text(encoding="utf-8"))
+
+        self.assertEqual(summary["videos_scored"], 1)
+        self.assertEqual(summary["hits"], 1)
+        self.assertEqual(sum(summary["hits_by_severity"].values()), 1)
+        histograms = {(h["name"], h["labels"].get("stage")) for h in summary["metrics"]["histograms"]}
+        self.assertIn(("http_request_seconds", None), histograms)
+        for stage in ("normalize", "tfidf", "rules", "dataframe", "report_write"):
+            self.assertIn(("stage_seconds", stage), histograms)
+        counters = {c["name"]: c["value"] for c in summary["metrics"]["counters"]}
+        self.assertEqual(counters["videos_scored_total"], 1)
+
+    @patch("scan_kpop_doxhunter.requests.Session.get")
+    def test_uninstrumented_run_summary_has_no_metrics(self, mock_get):
+        mock_get.return_value = self._mock_response()
+        with tempfile.TemporaryDirectory() as reports, patch.object(scan, "REPORTS_DIR", reports):
+            scan.ml_dox_hunter()
+            summary = json.loads(next(Path(reports).glob("*.summary.json")).read_text(encoding="utf-8"))
+
+        self.assertIsNone(summary["metrics"])
+        self.assertEqual(summary["videos_scored"], 1)
+
+    @patch("scan_kpop_doxhunter.requests.Session.get")
+    def test_killed_run_leaves_valid_partial_report(self, mock_get):
+        first = self._mock_response()
+        first.json.return_value["nextPageToken"] = "NEXT"
+        second = self._mock_response()
+        second.json.return_value["items"][0]["id"]["videoId"] = "def456"
+        mock_get.side_effect = [first, second]
+        real_score_batch = scan.score_batch
+        calls = []
+
+        def crash_on_second_page(texts, model=None, metrics=scan.NULL_METRICS):
+            calls.append(texts)
+            if len(calls) == 2:
+                raise KeyboardInterrupt
+            return real_score_batch(texts, model, metrics)
+
+        with tempfile.TemporaryDirectory() as reports, patch.object(scan, "REPORTS_DIR", reports), \
+                patch.object(scan, "score_batch", side_effect=crash_on_second_page):
+            with self.assertRaises(KeyboardInterrupt):
+                scan.ml_dox_hunter()
+            saved = [pd.read_csv(p) for p in Path(reports).glob("dox_report_*.csv")]
+
+        self.assertEqual(len(saved), 1)
+        self.assertEqual(list(saved[0]["video_id"]), ["abc123"])
+
+    @patch("scan_kpop_doxhunter.requests.Session.get")
+    def test_changed_text_is_rescored(self, mock_get):
+        mock_get.return_value = self._mock_response()
+        scan.ml_dox_hunter()
+
+        changed = self._mock_response()
+        changed.json.return_value["items"][0]["snippet"]["description"] = "GPS 37.5665, 126.9780"
+        mock_get.return_value = changed
+        # TTL de page nul: la recherche repart sur le reseau, le cache video reste
+        cache = ScanCache(Path(self._state_dir.name, "scan_cache.sqlite"), page_ttl=0)
+        with patch.object(scan, "open_cache", return_value=cache):
+            df = scan.ml_dox_hunter()
+
+        self.assertEqual(mock_get.call_count, 2)
+        self.assertEqual(cache.stats["video_misses"], 1)
+        _, expected = scan.compute_rule_score("felix maison seoul gps 37.5665, 126.9780")
+        for name, count in expected.items():
+            self.assertEqual(df.iloc[0][f"pat_{name}"], count)
+
+    def test_score_batch_matches_per_item_scoring(self):
+        from sklearn.metrics.pairwise import cosine_similarity
+
+        texts = [
+            scan.normalize_text(t)
+            for t in [
+                "Felix maison Seoul",
+                "adresse Felix quartier Coree du Sud 25 minutes",
+                "GPS 37.5665, 126.9780 spotted outside",
+                "random dance cover",
+                "",
+            ]
+        ]
+        vectorizer, X_train = scan.get_model()
+        scores = scan.score_batch(texts)
+
+        self.assertEqual(len(scores), len(texts))
+        for text, row in zip(texts, scores.itertuples(index=False)):
+            ml_score = cosine_similarity(X_train, vectorizer.transform([text])).max()
+            rule_score, matches = scan.compute_rule_score(text)
+            composite = 0.40 * ml_score + 0.60 * rule_score
+            self.assertEqual(row.ml_score, ml_score)
+            self.assertEqual(row.rule_score, rule_score)
+            self.assertEqual(row.dox_score, composite)
+            self.assertEqual(row.severity, scan.compute_severity(composite, rule_score))
+            self.assertEqual(row.patterns, matches)
+
+    def test_count_rule_matches_equals_findall(self):
+        vocab = [
+            "Felix", "maison", "lives", "live", "liver", "HOUSE", "chez", "dox", "doxx",
+            "doxxx", "doxa", "GPS", "spotted", "spotte", "stalkin", "fenetre", "window",
+            "visite", "visits", "Seoul", "Gangnam", "dong", "gu", "ro", "quartier",
+            "37.5665,", "126.9780", "12", "rue", "25", "minutes", "km", "kakao",
+            "insta_gram", "e-mail", "home2", "\u00e9", "Kore\u00e9", "\u212a", "!", ",", "\n",
+        ]
+        rng = random.Random(1234)
+        samples = [
+            "GPS 37.5665, 126.9780 Gangnam-gu address 12 rue Felix",
+            "Felix lives here, walking distance 5 min from the house",
+        ]
+        for _ in range(500):
+            samples.append(" ".join(rng.choice(vocab) for _ in range(rng.randint(0, 40))))
+
+        for text in samples + [scan.normalize_text(t) for t in samples]:
+            expected = {name: len(rx.findall(text)) for name, rx in scan.DOX_PATTERNS.items()}
+            self.assertEqual(scan.count_rule_matches(text), expected, text)
+
+    def test_normalize_text_matches_reference_on_fuzz_corpus(self):
+        rng = random.Random(12)
+        alphabet = (
+            list("abcXYZ019 .,:-_'\"#@") + ["&", "&amp;", "&eacute;", "&#39;", "&#x1F600;", "&nbsp;", "&lt;b&gt;", "&amp"]
+            + list("\t\n\r\x0b\x0c\x1c\x1f\x85\xa0\u2003\u2028\u3000\u200b")
+            + list("éÈçÅøßİıﬁ①Ⅻ｡Ａ한국서울필릭스😀\u0301\u0327ǅ") + ["Felix", " maison ", "Coree du Sud"]
+        )
+        samples = [None, "", " ", "\x1c", "&", "ALREADY clean", "ﬁ", "İ", "&#304;"]
+        for _ in range(3000):
+            samples.append("".join(rng.choice(alphabet) for _ in range(rng.randint(0, 30))))
+
+        for text in samples:
+            self.assertEqual(scan.normalize_text(text), legacy_normalize_text(text), repr(text))
+            # Deuxieme appel servi par le cache: meme resultat
+            self.assertEqual(scan.normalize_text(text), legacy_normalize_text(text), repr(text))
+
+    def test_normalize_text_cache_is_bounded(self):
+        scan._normalize_cached.cache_clear()
+        for i in range(scan.NORMALIZE_CACHE_SIZE + 10):
+            scan.normalize_text(f"Boilerplate &amp; description {i}")
+        scan.normalize_text("Boilerplate &amp; description 20")
+
+        info = scan._normalize_cached.cache_info()
+        self.assertEqual(info.currsize, scan.NORMALIZE_CACHE_SIZE)
+        self.assertEqual(info.hits, 1)
+
+    def test_model_artifact_roundtrip(self):
+        with tempfile.TemporaryDirectory() as model_dir, patch.dict(os.environ, {"MODEL_DIR": model_dir}):
+            path = scan.build_model()
+            self.assertTrue(Path(path).exists())
+            vectorizer, X_train = scan.load_model()
+            fitted, X_fitted = scan.fit_model()
+
+            self.assertEqual(vectorizer.vocabulary_, fitted.vocabulary_)
+            self.assertEqual((X_train != X_fitted).nnz, 0)
+            with patch.object(scan, "model_fingerprint", return_value="stale"):
+                self.assertIsNone(scan.load_model(path))
+
+    def test_import_does_not_load_heavy_modules(self):
+        code = (
+            "import sys, scan_kpop_doxhunter as s; s.normalize_text('x'); s.compute_rule_score('x');"
+            "print(sorted(m for m in ('pandas', 'numpy', 'sklearn') if m in sys.modules))"
+        )
+        out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+        self.assertEqual(out.stdout.strip(), "[]")
+
+    def test_severities_match_compute_severity(self):
+        import numpy as np
+
+        grid = np.round(np.arange(0, 1.0001, 0.05), 2)
+        composite, rule = (a.ravel() for a in np.meshgrid(grid, grid))
+
+        expected = [scan.compute_severity(c, r) for c, r in zip(composite, rule)]
+        self.assertEqual(list(scan.severities(composite, rule)), expected)
+
+    def test_report_frame_matches_row_by_row_path(self):
+        from datetime import datetime
+
+        raw_titles = ["Felix maison Seoul &amp; GPS 37.5665, 126.9780", "dance cover", "adresse Felix quartier"]
+        texts = [scan.normalize_text(t) for t in raw_titles]
+        video_ids = ["a", "b", "c"]
+        scores = scan.score_batch(texts)
+        now = datetime(2026, 1, 1, 12, 0)
+
+        frame = scan.report_frame(["q"] * 3, video_ids, raw_titles, scores, now)
+        expected = [
+            row
+            for video_id, title, score in zip(video_ids, raw_titles, scores.to_dict("records"))
+            for row in scan.iter_target_rows("q", video_id, title, score, now)
+        ]
+
+        self.assertEqual(scan.report_records(frame), expected)
+        self.assertEqual(list(frame.columns), list(expected[0]))
+        self.assertEqual(frame["pat_coords_gps"].dtype, "int64")
+        self.assertEqual(list(scan.hit_mask(frame)), [scan.is_hit(row) for row in expected])
+
+    def test_score_batch_empty(self):
+        scores = scan.score_batch([])
+        self.assertTrue(scores.empty)
+        self.assertIn("dox_score", scores.columns)
+
+    @patch("scan_kpop_doxhunter.requests.Session.get")
     def test_ml_dox_hunter_ignores_non_dict_json(self, mock_get):
         mock_resp = MagicMock()
         mock_resp.status_code = 200
@@ -143,5 +395,232 @@ class ScanKpopDoxhunterTests(unittest.TestCase):
         self.assertTrue(df.empty)
 
 
+def _stub_video(video_id, title, description="adresse Felix quartier Coree du Sud"):
+    return {"id": {"videoId": video_id}, "snippet": {"title": title, "description": description}}
+
+
+class _StubYouTubeHandler(BaseHTTPRequestHandler):
+    """Sert des pages de recherche depuis ``server.routes[(q, pageToken)]``."""
+
+    def do_GET(self):
+        server = self.server
+        params = {k: v[0] for k, v in parse_qs(urlparse(self.path).query).items()}
+        with server.lock:
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+            server.calls.append((params.get("q"), params.get("pageToken")))
+            server.params.append(params)
+        try:
+            time.sleep(server.delay)
+            status, body = server.routes.get(
+                (params.get("q"), params.get("pageToken")), (200, {"items": []})
+            )
+            payload = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FetchLayerStubServerTests(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _StubYouTubeHandler)
+        self.server.routes = {}
+        self.server.calls = []
+        self.server.params = []
+        self.server.delay = 0.05
+        self.server.lock = threading.Lock()
+        self.server.in_flight = 0
+        self.server.max_in_flight = 0
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+        self._url = scan.YOUTUBE_SEARCH_URL
+        self._queries = scan.QUERIES
+        self._api_key = os.environ.get("YOUTUBE_API_KEY")
+        self._existing_reports = {p.name for p in Path("reports").glob("dox_report_*")}
+        host, port = self.server.server_address
+        scan.YOUTUBE_SEARCH_URL = f"http://{host}:{port}/youtube/v3/search"
+        os.environ["YOUTUBE_API_KEY"] = "TEST_KEY"
+        self._state_dir = tempfile.TemporaryDirectory()
+        os.environ["STATE_DIR"] = self._state_dir.name
+
+    def tearDown(self):
+        os.environ.pop("STATE_DIR", None)
+        self._state_dir.cleanup()
+        self.server.shutdown()
+        self.server.server_close()
+        scan.YOUTUBE_SEARCH_URL = self._url
+        scan.QUERIES = self._queries
+        if self._api_key is None:
+            os.environ.pop("YOUTUBE_API_KEY", None)
+        else:
+            os.environ["YOUTUBE_API_KEY"] = self._api_key
+        os.environ.pop("MAX_FETCH_WORKERS", None)
+        for path in Path("reports").glob("dox_report_*"):
+            if path.name not in self._existing_reports:
+                path.unlink(missing_ok=True)
+
+    def test_concurrent_fetch_keeps_query_and_page_order(self):
+        queries = [f"felix q{i}" for i in range(6)]
+        for i, query in enumerate(queries):
+            self.server.routes[(query, None)] = (
+                200,
+                {"items": [_stub_video(f"v{i}a", f"Felix maison Seoul {i}")], "nextPageToken": "P2"},
+            )
+            self.server.routes[(query, "P2")] = (
+                200,
+                {"items": [_stub_video(f"v{i}b", f"Felix maison Seoul {i} bis"), _stub_video("v0a", "dup")]},
+            )
+
+        session = scan.make_session(3)
+        try:
+            fetched = list(scan.fetch_all_queries(session, queries, "TEST_KEY", 2, 3))
+        finally:
+            session.close()
+
+        self.assertEqual([f.query for f in fetched], queries)
+        for i, result in enumerate(fetched):
+            ids = [item["id"]["videoId"] for page in result.pages for item in page["items"]]
+            self.assertEqual(ids[:2], [f"v{i}a", f"v{i}b"])
+            self.assertEqual(result.request_failures, 0)
+        self.assertLessEqual(self.server.max_in_flight, 3)
+        self.assertGreater(self.server.max_in_flight, 1)
+
+    def test_ml_dox_hunter_dedups_across_concurrent_queries(self):
+        os.environ["MAX_FETCH_WORKERS"] = "4"
+        scan.QUERIES = ["felix a", "felix b"]
+        shared = _stub_video("shared1", "Felix maison Seoul")
+        self.server.routes[("felix a", None)] = (200, {"items": [shared, _stub_video("a1", "Felix house")]})
+        self.server.routes[("felix b", None)] = (200, {"items": [shared, _stub_video("b1", "Felix home")]})
+
+        df = scan.ml_dox_hunter()
+
+        self.assertEqual(sorted(df["video_id"]), sorted(set(df["video_id"])))
+        self.assertEqual(df.loc[df["video_id"] == "shared1", "query"].tolist(), ["felix a"])
+
+    def test_incremental_run_uses_high_water_and_merges_report(self):
+        scan.QUERIES = ["felix inc"]
+        old_video = dict(_stub_video("old1", "Felix maison Seoul"), snippet={
+            "title": "Felix maison Seoul",
+            "description": "adresse Felix quartier Coree du Sud",
+            "publishedAt": "2026-01-01T00:00:00Z",
+        })
+        self.server.routes[("felix inc", None)] = (200, {"items": [old_video]})
+        with tempfile.TemporaryDirectory() as reports, patch.object(scan, "REPORTS_DIR", reports):
+            first = scan.ml_dox_hunter(incremental=True)
+            self.assertEqual(scan.load_high_water(), {"felix inc": "2026-01-01T00:00:00Z"})
+
+            new_video = dict(_stub_video("new1", "Felix house leaked"), snippet={
+                "title": "Felix house leaked",
+                "description": "adresse Felix quartier Coree du Sud GPS 37.5665, 126.9780",
+                "publishedAt": "2026-02-01T00:00:00Z",
+            })
+            self.server.routes[("felix inc", None)] = (
+                200, {"items": [new_video, old_video], "nextPageToken": "P2"}
+            )
+            merged = scan.ml_dox_hunter(incremental=True)
+
+            reports_written = list(Path(reports).glob("dox_report_*.parquet"))
+            self.assertEqual(len(reports_written), 1)
+            self.assertEqual(len(list(Path(reports).glob("dox_report_*.summary.json"))), 1)
+            saved = pd.read_parquet(reports_written[0])
+
+        self.assertEqual(list(first["video_id"]), ["old1"])
+        self.assertEqual(sorted(merged["video_id"]), ["new1", "old1"])
+        self.assertEqual(sorted(saved["video_id"]), ["new1", "old1"])
+        last = self.server.params[-1]
+        self.assertEqual(last["publishedAfter"], "2026-01-01T00:00:00Z")
+        self.assertEqual(last["order"], "date")
+        # La page contenait une video deja traitee: pas de page suivante
+        self.assertNotIn(("felix inc", "P2"), self.server.calls)
+        self.assertEqual(scan.load_high_water(), {"felix inc": "2026-02-01T00:00:00Z"})
+
+    def test_incremental_run_merges_only_into_todays_scan_report(self):
+        scan.QUERIES = ["felix inc"]
+        self.server.routes[("felix inc", None)] = (200, {"items": [_stub_video("inc1", "Felix maison Seoul")]})
+        with tempfile.TemporaryDirectory() as reports, patch.object(scan, "REPORTS_DIR", reports):
+            scan.ml_dox_hunter(incremental=True)
+            first = scan.find_latest_scan_report(reports)
+            # Rapports plus recents d'un autre processus: jamais reecrits
+            watch = Path(reports, "dox_report_29990101_0000_watch.parquet")
+            rescore = Path(reports, "dox_report_29990101_0000_rescore.parquet")
+            for other in (watch, rescore):
+                other.write_bytes(first.read_bytes())
+            before = {other: other.stat().st_mtime_ns for other in (watch, rescore)}
+            old_day = Path(reports, "dox_report_20000101_0000.parquet")
+            old_day.write_bytes(first.read_bytes())
+            os.utime(old_day, (0, 0))
+
+            scan.ml_dox_hunter(incremental=True)
+            merged = scan.find_latest_scan_report(reports)
+            with patch.dict(os.environ, {"INCREMENTAL_REPORT_MAX_ROWS": "1"}):
+                scan.ml_dox_hunter(incremental=True)
+            rotated = scan.find_latest_scan_report(reports)
+
+            self.assertEqual(merged, first)
+            self.assertEqual({other: other.stat().st_mtime_ns for other in (watch, rescore)}, before)
+            self.assertEqual(old_day.stat().st_mtime_ns, 0)
+            # Rapport du jour plein: nouveau rapport numerote, trie apres le premier
+            self.assertNotEqual(rotated, first)
+            self.assertGreater(rotated.stem, first.stem)
+
+    def test_high_water_stays_put_when_pagination_is_cut_short(self):
+        def video(video_id, day):
+            return dict(_stub_video(video_id, "Felix"), snippet={"title": "Felix", "publishedAt": f"2026-03-0{day}T00:00:00Z"})
+
+        self.server.delay = 0
+        self.server.routes[("felix pages", None)] = (200, {"items": [video("p1", 6), video("p2", 5)], "nextPageToken": "P2"})
+        self.server.routes[("felix pages", "P2")] = (200, {"items": [video("p3", 4), video("p4", 3)], "nextPageToken": "P3"})
+        self.server.routes[("felix pages", "P3")] = (200, {"items": [video("p5", 2), video("p6", 1)]})
+        session = scan.make_session(1)
+        try:
+            capped = scan.fetch_query_pages(
+                session, "felix pages", "TEST_KEY", 2, threading.Event(), published_after="2026-02-01T00:00:00Z"
+            )
+            full = scan.fetch_query_pages(
+                session, "felix pages", "TEST_KEY", 3, threading.Event(), published_after="2026-02-01T00:00:00Z"
+            )
+        finally:
+            session.close()
+
+        marks = {"felix pages": "2026-02-01T00:00:00Z"}
+        scan.advance_high_water(marks, capped)
+        first_run = {}
+        scan.advance_high_water(first_run, capped)
+
+        # p5/p6 pas encore vues: le repere ne doit pas les sauter
+        self.assertFalse(capped.complete)
+        self.assertEqual(marks, {"felix pages": "2026-02-01T00:00:00Z"})
+        self.assertEqual(first_run, {"felix pages": "2026-03-03T00:00:00Z"})
+        self.assertTrue(full.complete)
+        scan.advance_high_water(marks, full)
+        self.assertEqual(marks, {"felix pages": "2026-03-06T00:00:00Z"})
+        budget = scan.QueryFetch("felix pages", newest_published="2026-03-06T00:00:00Z", complete=True,
+                                 budget_exhausted=True)
+        scan.advance_high_water(first_run, budget)
+        self.assertEqual(first_run, {"felix pages": "2026-03-03T00:00:00Z"})
+
+    def test_quota_stops_in_flight_queries(self):
+        os.environ["MAX_FETCH_WORKERS"] = "2"
+        scan.QUERIES = ["felix ok", "felix quota"] + [f"felix later {i}" for i in range(5)]
+        self.server.routes[("felix ok", None)] = (200, {"items": [_stub_video("ok1", "Felix maison Seoul")]})
+        self.server.routes[("felix quota", None)] = (403, {"error": {"code": 403}})
+
+        with self.assertRaises(SystemExit):
+            scan.ml_dox_hunter()
+
+        requested = {q for q, _ in self.server.calls}
+        self.assertIn("felix ok", requested)
+        # Les queries en attente ne partent pas une fois le quota atteint
+        self.assertLess(len(requested), len(scan.QUERIES))
+
+
 if __name__ == "__main__":
     unittest.main()
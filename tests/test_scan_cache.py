@@ -0,0 +1,104 @@
+import sqlite3
+import tempfile
+import unittest
+from pathlib import Path
+
+from scan_cache import ScanCache, page_key, text_hash
+
+
+class FakeClock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class ScanCacheTests(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.clock = FakeClock()
+        self.cache = ScanCache(
+            Path(self._tmp.name, "cache.sqlite"),
+            page_ttl=60,
+            video_ttl=120,
+            max_pages=2,
+            max_videos=2,
+            clock=self.clock,
+        )
+
+    def tearDown(self):
+        self.cache.close()
+        self._tmp.cleanup()
+
+    def _scores(self, video_id, digest="h"):
+        return {
+            "video_id": video_id,
+            "text_hash": digest,
+            "snippet": {"title": video_id},
+            "ml_score": 0.5,
+            "rule_score": 0.25,
+            "dox_score": 0.35,
+            "severity": "HIGH",
+            "patterns": {"coords_gps": 1},
+        }
+
+    def test_page_key_ignores_api_key(self):
+        self.assertEqual(page_key({"q": "felix", "key": "A"}), page_key({"q": "felix", "key": "B"}))
+        self.assertNotEqual(page_key({"q": "felix"}), page_key({"q": "felix", "pageToken": "P2"}))
+
+    def test_page_ttl_expiry(self):
+        params = {"q": "felix", "key": "K"}
+        self.cache.put_page(params, {"items": [1]})
+        self.assertEqual(self.cache.get_page(params), {"items": [1]})
+
+        self.clock.now += 61
+        self.assertIsNone(self.cache.get_page(params))
+        self.assertEqual(self.cache.stats["page_hits"], 1)
+        self.assertEqual(self.cache.stats["page_misses"], 1)
+
+    def test_scores_require_same_text_and_version(self):
+        self.cache.put_scores([self._scores("v1", text_hash("t", "d"))], "ver1")
+
+        hit = self.cache.get_scores("v1", text_hash("t", "d"), "ver1")
+        self.assertEqual(hit["patterns"], {"coords_gps": 1})
+        self.assertIsNone(self.cache.get_scores("v1", text_hash("t", "changed"), "ver1"))
+        self.assertIsNone(self.cache.get_scores("v1", text_hash("t", "d"), "ver2"))
+
+    def test_per_target_scores_and_old_schema_migration(self):
+        targets = {"felix": {"ml_score": 0.5, "dox_score": 0.35, "severity": "HIGH", "match": True}}
+        self.cache.put_scores([dict(self._scores("v1"), targets=targets)], "ver")
+        self.assertEqual(self.cache.get_scores("v1", "h", "ver")["targets"], targets)
+
+        old_path = Path(self._tmp.name, "old.sqlite")
+        with sqlite3.connect(str(old_path)) as conn:
+            conn.execute(
+                "CREATE TABLE videos (video_id TEXT PRIMARY KEY, text_hash TEXT NOT NULL, "
+                "scoring_version TEXT NOT NULL, snippet TEXT, ml_score REAL, rule_score REAL, "
+                "dox_score REAL, severity TEXT, patterns TEXT, updated_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "INSERT INTO videos VALUES ('v1', 'h', 'ver', '{}', 0.5, 0.25, 0.35, 'HIGH', '{}', ?)",
+                (self.clock.now,),
+            )
+        conn.close()
+        old = ScanCache(old_path, clock=self.clock)
+        self.addCleanup(old.close)
+
+        self.assertIsNone(old.get_scores("v1", "h", "ver")["targets"])
+
+    def test_evict_applies_ttl_and_size_cap(self):
+        for i in range(4):
+            self.clock.now += 1
+            self.cache.put_scores([self._scores(f"v{i}")], "ver")
+        self.cache.evict()
+        self.assertIsNone(self.cache.get_scores("v0", "h", "ver"))
+        self.assertIsNotNone(self.cache.get_scores("v3", "h", "ver"))
+
+        self.clock.now += 500
+        self.cache.evict()
+        self.assertIsNone(self.cache.get_scores("v3", "h", "ver"))
+
+
+if __name__ == "__main__":
+    unittest.main()
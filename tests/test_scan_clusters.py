@@ -0,0 +1,116 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import pandas as pd
+
+import scan_kpop_doxhunter as scan
+from scan_clusters import ClusterIndex, minhash, shingles, similarity
+from scan_report import find_latest_report
+
+LEAK = "Felix maison Seoul adresse exacte quartier gangnam leak complet"
+
+
+def _text(raw):
+    return scan.normalize_text(raw)
+
+
+class MinHashTests(unittest.TestCase):
+    def test_signature_is_stable_and_estimates_similarity(self):
+        leak = minhash(_text(LEAK))
+        reupload = minhash(_text(LEAK + " REUPLOAD"))
+        other = minhash(_text("Stray Kids dance practice choreography"))
+
+        self.assertTrue((leak == minhash(_text(LEAK))).all())
+        self.assertGreater(similarity(leak, reupload), 0.7)
+        self.assertLess(similarity(leak, other), 0.2)
+
+    def test_short_and_empty_texts(self):
+        self.assertEqual(shingles("felix"), ["felix"])
+        self.assertEqual(shingles("a b c"), ["a b", "b c"])
+        self.assertIsNone(minhash(""))
+
+
+class ClusterIndexTests(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.path = Path(self._tmp.name, "clusters.sqlite")
+
+    def test_reuploads_join_the_first_upload_across_runs(self):
+        index = ClusterIndex(self.path)
+        self.assertEqual(index.assign("v1", minhash(_text(LEAK))), "v1")
+        self.assertEqual(index.assign("v2", minhash(_text(LEAK + " (reupload)"))), "v1")
+        self.assertEqual(index.assign("v3", minhash(_text("dance practice choreography"))), "v3")
+        index.close()
+
+        reopened = ClusterIndex(self.path)
+        self.addCleanup(reopened.close)
+        self.assertEqual(reopened.assign("v4", minhash(_text("REUPLOAD " + LEAK))), "v1")
+        self.assertEqual(reopened.cluster_of("v2"), "v1")
+        # Une video deja indexee garde son cluster
+        self.assertEqual(reopened.assign("v3", minhash(_text(LEAK))), "v3")
+
+    def test_video_without_text_is_its_own_cluster(self):
+        index = ClusterIndex(self.path)
+        self.addCleanup(index.close)
+
+        self.assertEqual(index.assign("empty", None), "empty")
+        self.assertIsNone(index.cluster_of("empty"))
+
+
+class ScanClusteringTests(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.reports = Path(tmp.name, "reports")
+        for patcher in (
+            patch.object(scan, "REPORTS_DIR", str(self.reports)),
+            patch.object(scan, "QUERIES", ["felix maison test"]),
+            patch.dict(os.environ, {"YOUTUBE_API_KEY": "TEST_KEY", "STATE_DIR": str(Path(tmp.name, "state"))}),
+            patch("builtins.print"),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    @staticmethod
+    def _response(items):
+        response = MagicMock()
+        response.status_code = 200
+        response.json.return_value = {"items": items}
+        return response
+
+    @staticmethod
+    def _video(video_id, title):
+        return {"id": {"videoId": video_id}, "snippet": {"title": title, "description": "adresse quartier Coree du Sud"}}
+
+    @patch("scan_kpop_doxhunter.requests.Session.get")
+    def test_report_rows_carry_cluster_id(self, mock_get):
+        mock_get.return_value = self._response([
+            self._video("orig", LEAK),
+            self._video("copy", LEAK + " REUPLOAD"),
+            self._video("gps", "Felix coordonnees 37.5665, 126.9780 maison"),
+        ])
+
+        scan.ml_dox_hunter()
+
+        df = pd.read_parquet(find_latest_report(self.reports)).set_index("video_id")
+        self.assertEqual(df.loc["copy", "cluster_id"], "orig")
+        self.assertEqual(df.loc["orig", "cluster_id"], "orig")
+        self.assertEqual(df.loc["gps", "cluster_id"], "gps")
+
+    @patch("scan_kpop_doxhunter.requests.Session.get")
+    def test_clustering_can_be_disabled(self, mock_get):
+        mock_get.return_value = self._response([self._video("orig", LEAK), self._video("copy", LEAK + " bis")])
+
+        with patch.dict(os.environ, {"CLUSTERS_ENABLED": "0"}):
+            scan.ml_dox_hunter()
+
+        df = pd.read_parquet(find_latest_report(self.reports))
+        self.assertEqual(list(df["cluster_id"]), list(df["video_id"]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,189 @@
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from datetime import datetime
+from pathlib import Path
+from unittest.mock import patch
+
+import pandas as pd
+
+import scan_enrich
+import scan_kpop_doxhunter as scan
+from scan_clusters import ClusterIndex
+from scan_metrics import load_summary
+from scan_report import find_latest_report
+
+FIXTURES = Path(__file__).parent / "fixtures" / "enrich"
+
+
+def _fixture(name):
+    return json.loads((FIXTURES / name).read_text(encoding="utf-8"))
+
+
+class _Response:
+    def __init__(self, status_code, body):
+        self.status_code = status_code
+        self._body = body
+        self.headers = {}
+
+    def json(self):
+        return self._body
+
+    def raise_for_status(self):
+        pass
+
+
+class FixtureSession:
+    """Rejoue les reponses enregistrees de search / videos / commentThreads."""
+
+    def __init__(self, overrides=None, delay=0.0):
+        self.calls = []
+        self.overrides = overrides or {}
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def get(self, url, params=None, timeout=None):
+        with self.lock:
+            self.calls.append((url, dict(params)))
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            time.sleep(self.delay)
+            return self._route(url, params)
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+    def _route(self, url, params):
+        if url in self.overrides:
+            return _Response(*self.overrides[url])
+        if url == scan.YOUTUBE_SEARCH_URL:
+            return _Response(200, _fixture("search_felix.json") if not params.get("pageToken") else {"items": []})
+        if url == scan.YOUTUBE_VIDEOS_URL:
+            recorded = _fixture("videos.json")
+            ids = params["id"].split(",")
+            # Comme l'API: les videos supprimees ne sont simplement pas renvoyees
+            recorded["items"] = [item for item in recorded["items"] if item["id"] in ids]
+            return _Response(200, recorded)
+        if url == scan.YOUTUBE_COMMENT_THREADS_URL:
+            path = FIXTURES / f"comment_threads_{params['videoId']}.json"
+            if path.exists():
+                return _Response(200, _fixture(path.name))
+            return _Response(403, _fixture("comments_disabled.json"))
+        raise AssertionError(f"unexpected url {url}")
+
+    def close(self):
+        pass
+
+    def urls(self, url):
+        return [params for called, params in self.calls if called == url]
+
+
+class EnrichScanTests(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.reports = Path(tmp.name, "reports")
+        for patcher in (
+            patch.object(scan, "REPORTS_DIR", str(self.reports)),
+            patch.object(scan, "QUERIES", ["Felix maison Seoul"]),
+            patch.dict(os.environ, {
+                "YOUTUBE_API_KEY": "TEST_KEY",
+                "STATE_DIR": str(Path(tmp.name, "state")),
+                "CACHE_ENABLED": "0",
+                "MAX_PAGES_PER_QUERY": "1",
+            }),
+            patch("builtins.print"),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _scan(self, session, enrich=True):
+        with patch.dict(os.environ, {"ENRICH_ENABLED": "1" if enrich else "0"}):
+            scan.ml_dox_hunter(session=session)
+        latest = find_latest_report(self.reports)
+        return pd.read_parquet(latest).set_index("video_id"), load_summary(latest)
+
+    def test_candidates_are_rescored_on_full_details_and_comments(self):
+        baseline, _ = self._scan(FixtureSession(), enrich=False)
+        session = FixtureSession()
+        df, summary = self._scan(session)
+
+        # Adresse + GPS seulement dans la description complete / un commentaire
+        self.assertNotIn("cand1", baseline.index)
+        self.assertIn("cand1", df.index)
+        self.assertEqual(df.loc["cand1", "severity"], "CRITICAL")
+        self.assertGreater(df.loc["cand1", "pat_coords_gps"], 0)
+        self.assertNotIn("cand2", df.index)
+        self.assertEqual(df.loc["hit1", "dox_score"], baseline.loc["hit1", "dox_score"])
+
+        videos_calls = session.urls(scan.YOUTUBE_VIDEOS_URL)
+        self.assertEqual(len(videos_calls), 1)
+        # Seuls les candidats (>= MIN_DOX_SCORE) sont enrichis
+        self.assertEqual(set(videos_calls[0]["id"].split(",")), {"cand1", "cand2", "hit1", "gone1"})
+        comment_ids = {p["videoId"] for p in session.urls(scan.YOUTUBE_COMMENT_THREADS_URL)}
+        self.assertEqual(comment_ids, {"cand1", "cand2", "hit1"})
+        self.assertEqual(summary["enrichment"]["videos_enriched"], 3)
+        self.assertFalse(summary["quota_blocked"])
+
+    def test_promoted_hits_join_the_cluster_index(self):
+        df, _ = self._scan(FixtureSession())
+
+        clusters = ClusterIndex(Path(os.environ["STATE_DIR"], "clusters.sqlite"))
+        self.addCleanup(clusters.close)
+        # cand1 n'etait pas un hit avant l'enrichissement
+        self.assertIsNotNone(clusters.cluster_of("cand1"))
+        self.assertEqual(df.loc["cand1", "cluster_id"], clusters.cluster_of("cand1"))
+        self.assertIsNone(clusters.cluster_of("cand2"))
+
+    def test_quota_error_stops_enrichment_but_keeps_the_report(self):
+        session = FixtureSession({scan.YOUTUBE_VIDEOS_URL: (403, _fixture("quota_exceeded.json"))})
+
+        # Comme pour la recherche: rapport partiel sauvegarde puis arret explicite
+        with self.assertRaises(SystemExit):
+            self._scan(session)
+        latest = find_latest_report(self.reports)
+        df, summary = pd.read_parquet(latest).set_index("video_id"), load_summary(latest)
+
+        self.assertIn("hit1", df.index)
+        self.assertNotIn("cand1", df.index)
+        self.assertTrue(summary["quota_blocked"])
+        self.assertEqual(len(session.urls(scan.YOUTUBE_VIDEOS_URL)), 1)
+        self.assertEqual(session.urls(scan.YOUTUBE_COMMENT_THREADS_URL), [])
+
+
+class EnricherTests(unittest.TestCase):
+    def _rows(self, n):
+        now = datetime.now()
+        score = {"ml_score": 0.5, "rule_score": 0.15, "dox_score": 0.29, "severity": "MEDIUM", "patterns": {}}
+        return [scan.make_report_row("q", f"v{i:03d}", "Felix maison", score, now) for i in range(n)]
+
+    def test_batches_of_50_ids_and_bounded_comment_concurrency(self):
+        session = FixtureSession(delay=0.01)
+        enricher = scan_enrich.Enricher(session, "KEY", scan.get_model(), workers=3)
+        with patch("builtins.print"):
+            rows = list(enricher.iter_rows(self._rows(120)))
+
+        self.assertEqual(len(rows), 120)
+        batches = [p["id"].split(",") for p in session.urls(scan.YOUTUBE_VIDEOS_URL)]
+        self.assertEqual([len(ids) for ids in batches], [50, 50, 20])
+        self.assertLessEqual(session.max_in_flight, 3)
+        # Aucun id inconnu des fixtures: pas d'appel commentThreads
+        self.assertEqual(session.urls(scan.YOUTUBE_COMMENT_THREADS_URL), [])
+
+    def test_rows_below_threshold_pass_through_without_calls(self):
+        session = FixtureSession()
+        enricher = scan_enrich.Enricher(session, "KEY", scan.get_model())
+        low = dict(self._rows(1)[0], dox_score=0.1)
+
+        self.assertEqual(list(enricher.iter_rows([low])), [low])
+        self.assertEqual(session.calls, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
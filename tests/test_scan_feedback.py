@@ -0,0 +1,254 @@
+import os
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import pandas as pd
+
+import dashboard
+import scan_kpop_doxhunter as scan
+from scan_feedback import FeedbackFilter, FeedbackLearner, FeedbackModel, FeedbackStore, model_path, store_path
+from scan_metrics import load_summary
+from scan_report import find_latest_report
+from test_dashboard import report_row, write_parquet_report
+from test_scan_enrich import FixtureSession
+
+FP_TITLES = ["Felix devant chez lui", "Felix devant la scene", "Felix chez lui en live", "Felix devant le fansign"]
+TP_TITLES = ["adresse appartement gps", "dortoir adresse exacte", "coordonnees gps maison", "numero de rue appartement"]
+
+
+def _train(learner):
+    for i, title in enumerate(FP_TITLES):
+        learner.label(f"fp{i}", "default", "fp", title)
+    for i, title in enumerate(TP_TITLES):
+        learner.label(f"tp{i}", "default", "tp", title)
+
+
+class FeedbackStoreTests(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = Path(tmp.name)
+        self.clock = iter(range(100)).__next__
+
+    def test_latest_label_wins_and_revision_changes(self):
+        store = FeedbackStore(self.dir / "feedback.sqlite", clock=self.clock)
+        self.addCleanup(store.close)
+        empty = store.revision()
+
+        store.add("v1", "felix", "tp", "Titre")
+        store.add("v1", "felix", "fp", "Titre")
+        store.add("v2", "felix", "tp", "Autre")
+
+        self.assertNotEqual(store.revision(), empty)
+        self.assertEqual(store.labels_for([("v1", "felix"), ("v2", "felix"), ("v1", "hyunjin")]),
+                         {("v1", "felix"): "fp", ("v2", "felix"): "tp"})
+        self.assertEqual(store.all(), [("Titre", 0), ("Autre", 1)])
+        with self.assertRaises(ValueError):
+            store.add("v3", "felix", "maybe", "Titre")
+
+    def test_labels_for_a_large_page(self):
+        store = FeedbackStore(self.dir / "feedback.sqlite", clock=self.clock)
+        self.addCleanup(store.close)
+        store.add("v0", "felix", "tp", "Titre")
+        store.add("v999", "felix", "fp", "Titre")
+
+        # 1000 lignes = 2000 variables: decoupe sous la limite SQLite
+        labels = store.labels_for((f"v{i}", "felix") for i in range(1000))
+
+        self.assertEqual(labels, {("v0", "felix"): "tp", ("v999", "felix"): "fp"})
+
+    def test_label_updates_model_and_running_filter_hot_swaps(self):
+        store = FeedbackStore(self.dir / "feedback.sqlite", clock=self.clock)
+        self.addCleanup(store.close)
+        path = self.dir / "feedback_model.joblib"
+        learner = FeedbackLearner(store, path)
+        running = FeedbackFilter(path, threshold=0.8, min_labels=4)
+        row = {"title": "felix devant chez lui", "fp_prob": None}
+
+        # Pas de modele pret: la ligne n'est pas modifiee
+        self.assertFalse(running.suppress(row))
+        self.assertIsNone(row["fp_prob"])
+
+        start = time.perf_counter()
+        _train(learner)
+        per_label = (time.perf_counter() - start) / 8
+
+        self.assertLess(per_label, 0.5)
+        self.assertTrue(running.suppress(row))
+        self.assertGreaterEqual(row["fp_prob"], 0.8)
+        self.assertFalse(running.suppress({"title": "adresse appartement gps", "fp_prob": None}))
+
+    def test_model_is_rebuilt_from_stored_labels(self):
+        store = FeedbackStore(self.dir / "feedback.sqlite", clock=self.clock)
+        self.addCleanup(store.close)
+        _train(FeedbackLearner(store, self.dir / "first.joblib"))
+
+        rebuilt = FeedbackLearner(store, self.dir / "missing.joblib").model
+
+        self.assertEqual(rebuilt.counts, {0: 4, 1: 4})
+        self.assertIsNotNone(FeedbackModel.load(self.dir / "missing.joblib"))
+        self.assertFalse(rebuilt.ready(min_labels=20))
+
+
+    def test_repeated_and_reversed_labels_count_once(self):
+        store = FeedbackStore(self.dir / "feedback.sqlite", clock=self.clock)
+        self.addCleanup(store.close)
+        path = self.dir / "feedback_model.joblib"
+        learner = FeedbackLearner(store, path)
+
+        for _ in range(25):
+            learner.label("v1", "default", "fp", FP_TITLES[0])
+        learner.label("v2", "default", "tp", TP_TITLES[0])
+        self.assertEqual(learner.model.counts, {0: 1, 1: 1})
+        self.assertFalse(learner.model.ready(min_labels=20))
+
+        _train(learner)
+        learner.label("fp1", "default", "tp", FP_TITLES[1])
+        reversed_model = FeedbackModel.load(path)
+        rebuilt = FeedbackModel.train(store.all())
+
+        self.assertEqual(store.counts(), {0: 4, 1: 6})
+        self.assertEqual(reversed_model.counts, {0: 4, 1: 6})
+        # Reentraine depuis le store: plus aucune trace de l'ancien label "fp"
+        self.assertEqual(list(reversed_model.fp_prob(FP_TITLES)), list(rebuilt.fp_prob(FP_TITLES)))
+
+
+class FeedbackScanTests(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.reports = Path(tmp.name, "reports")
+        for patcher in (
+            patch.object(scan, "REPORTS_DIR", str(self.reports)),
+            patch.object(scan, "QUERIES", ["Felix maison Seoul"]),
+            patch.dict(os.environ, {
+                "YOUTUBE_API_KEY": "TEST_KEY",
+                "STATE_DIR": str(Path(tmp.name, "state")),
+                "CACHE_ENABLED": "0",
+                "MAX_PAGES_PER_QUERY": "1",
+                "FEEDBACK_MIN_LABELS": "4",
+            }),
+            patch("builtins.print"),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _scan(self):
+        result = scan.ml_dox_hunter(session=FixtureSession())
+        latest = find_latest_report(self.reports)
+        if latest is None:
+            return result, None
+        df, summary = pd.read_parquet(latest).set_index("video_id"), load_summary(latest)
+        latest.unlink()
+        return df, summary
+
+    def test_likely_false_positives_are_suppressed(self):
+        before, summary = self._scan()
+        self.assertIn("hit1", before.index)
+        self.assertTrue(before["fp_prob"].isna().all())
+        self.assertEqual(summary["suppressed_false_positives"], 0)
+
+        store = FeedbackStore(store_path())
+        self.addCleanup(store.close)
+        _train(FeedbackLearner(store))
+        with patch.dict(os.environ, {"FP_THRESHOLD": "1.0"}):
+            scored, _ = self._scan()
+        suppressed, summary = self._scan()
+
+        self.assertGreaterEqual(scored.loc["hit1", "fp_prob"], 0.8)
+        # Seul hit du run supprime: pas de rapport
+        self.assertIsNone(summary)
+        self.assertTrue(suppressed.empty)
+
+    def test_disabled_feedback_keeps_every_hit(self):
+        store = FeedbackStore(store_path())
+        self.addCleanup(store.close)
+        _train(FeedbackLearner(store))
+
+        with patch.dict(os.environ, {"FEEDBACK_ENABLED": "0"}):
+            df, _ = self._scan()
+
+        self.assertIn("hit1", df.index)
+        self.assertTrue(os.path.exists(model_path()))
+
+
+class DashboardLabelTests(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.reports = Path(tmp.name, "reports")
+        self.reports.mkdir()
+        for patcher in (
+            patch.object(dashboard, "REPORTS_DIR", self.reports),
+            patch.object(dashboard, "_feedback", None),
+            patch.dict(os.environ, {"STATE_DIR": str(Path(tmp.name, "state"))}),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        dashboard.report_cache.clear()
+        self.addCleanup(dashboard.report_cache.clear)
+        self.addCleanup(lambda: dashboard._feedback and dashboard._feedback.store.close())
+        write_parquet_report(self.reports, "dox_report_20260101_1000", [report_row("vid1", 0.8, "CRITICAL")])
+        self.client = dashboard.app.test_client()
+
+    def _label(self, data, **headers):
+        headers.setdefault("Origin", "http://localhost")
+        return self.client.post("/label", data=data, headers=headers)
+
+    def test_label_is_stored_and_shown(self):
+        first = self.client.get("/")
+        self.assertFalse(os.path.exists(store_path()))
+
+        response = self._label({
+            "video_id": "vid1", "target": "default", "label": "fp", "next": "/?sort=ml_score",
+        })
+        page = self.client.get("/", headers={"If-None-Match": first.headers["ETag"]})
+
+        self.assertEqual(response.status_code, 303)
+        self.assertTrue(response.headers["Location"].endswith("/?sort=ml_score"))
+        self.assertEqual(dashboard._feedback.model.counts, {0: 1, 1: 0})
+        self.assertEqual(page.status_code, 200)
+        self.assertIn(b"false positive", page.data)
+
+    def test_label_makes_if_modified_since_stale(self):
+        report = self.reports / "dox_report_20260101_1000.parquet"
+        os.utime(report, (time.time() - 3600, time.time() - 3600))
+        first = self.client.get("/")
+
+        self._label({"video_id": "vid1", "target": "default", "label": "tp"})
+        page = self.client.get("/", headers={"If-Modified-Since": first.headers["Last-Modified"]})
+
+        self.assertEqual(page.status_code, 200)
+        self.assertIn(b"confirmed", page.data)
+        self.assertNotEqual(page.headers["Last-Modified"], first.headers["Last-Modified"])
+
+    def test_cross_site_label_is_rejected(self):
+        data = {"video_id": "vid1", "target": "default", "label": "fp"}
+
+        evil = self._label(data, Origin="http://evil.example")
+        no_origin = self.client.post("/label", data=data)
+        referer = self._label(data, Origin="", Referer="http://localhost/?page=2")
+
+        self.assertEqual(evil.status_code, 403)
+        self.assertEqual(no_origin.status_code, 403)
+        self.assertEqual(referer.status_code, 303)
+        self.assertEqual(dashboard._feedback.model.counts, {0: 1, 1: 0})
+
+    def test_bad_label_or_unknown_row_is_rejected(self):
+        bad = self._label({"video_id": "vid1", "target": "default", "label": "maybe"})
+        missing = self._label({"video_id": "nope", "target": "default", "label": "tp"})
+        offsite = self._label({
+            "video_id": "vid1", "target": "default", "label": "tp", "next": "//evil.example",
+        })
+
+        self.assertEqual(bad.status_code, 400)
+        self.assertEqual(missing.status_code, 404)
+        self.assertTrue(offsite.headers["Location"].endswith("/"))
+        self.assertNotIn("evil", offsite.headers["Location"])
+
+
+if __name__ == "__main__":
+    unittest.main()
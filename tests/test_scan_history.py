@@ -0,0 +1,155 @@
+import os
+import tempfile
+import unittest
+from datetime import date
+from pathlib import Path
+from unittest.mock import patch
+
+import dashboard
+import scan_kpop_doxhunter as scan
+from scan_history import HistoryStore, history_path, trend_slope
+from test_dashboard import report_row, write_parquet_report
+
+
+def row(video_id, score, severity, timestamp, target="felix"):
+    return dict(report_row(video_id, score, severity), target=target, timestamp=timestamp)
+
+
+class HistoryStoreTests(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.reports = Path(tmp.name, "reports")
+        self.reports.mkdir()
+        self.store = HistoryStore(Path(tmp.name, "history.sqlite"))
+        self.addCleanup(self.store.close)
+
+    def test_reports_are_aggregated_per_video_and_day(self):
+        write_parquet_report(self.reports, "dox_report_20260101_0800", [
+            row("a", 0.40, "MEDIUM", "2026-01-01 08:00:00"),
+            row("b", 0.70, "CRITICAL", "2026-01-01 08:00:00"),
+        ])
+        write_parquet_report(self.reports, "dox_report_20260101_2000", [
+            dict(row("a", 0.55, "HIGH", "2026-01-01 20:00:00"), display_title="Felix a (best)"),
+        ])
+        write_parquet_report(self.reports, "dox_report_20260103_0900", [
+            row("a", 0.30, "MEDIUM", "2026-01-03 09:00:00"),
+            row("a", 0.35, "MEDIUM", "2026-01-03 09:00:00", target="hyunjin"),
+        ])
+
+        self.assertEqual(self.store.ingest(self.reports), 5)
+
+        history = self.store.video_history("a")
+        self.assertEqual([(h["day"], h["target"]) for h in history],
+                         [("2026-01-01", "felix"), ("2026-01-03", "felix"), ("2026-01-03", "hyunjin")])
+        first = history[0]
+        self.assertEqual((first["first_seen"], first["last_seen"]), ("2026-01-01 08:00:00", "2026-01-01 20:00:00"))
+        self.assertEqual((first["dox_score"], first["severity"], first["title"]), (0.55, "HIGH", "Felix a (best)"))
+        self.assertEqual(self.store.video_history("nope"), [])
+        self.assertEqual(self.store.targets(), ["felix", "hyunjin"])
+
+    def test_unchanged_reports_are_skipped_and_rewritten_ones_reingested(self):
+        write_parquet_report(self.reports, "dox_report_20260101_0800", [row("a", 0.40, "MEDIUM", "2026-01-01 08:00:00")])
+        self.store.ingest(self.reports)
+
+        self.assertEqual(self.store.ingest(self.reports), 0)
+
+        # Run incremental: le dernier rapport est reecrit avec une ligne de plus
+        write_parquet_report(self.reports, "dox_report_20260101_0800", [
+            row("a", 0.40, "MEDIUM", "2026-01-01 08:00:00"),
+            row("c", 0.90, "CRITICAL", "2026-01-01 09:00:00"),
+        ])
+        self.assertEqual(self.store.ingest(self.reports), 2)
+        self.assertEqual(len(self.store.video_history("a")), 1)
+        self.assertEqual(len(self.store.video_history("c")), 1)
+
+    def test_legacy_csv_without_timestamp_uses_report_time(self):
+        (self.reports / "dox_report_20251215_2250.csv").write_text(
+            "query,title,video_id,dox_score\nq,Old,old1,0.72\n", encoding="utf-8"
+        )
+
+        self.store.ingest(self.reports)
+
+        (old,) = self.store.video_history("old1")
+        self.assertEqual((old["day"], old["target"], old["severity"]), ("2025-12-15", "default", "UNKNOWN"))
+
+    def test_trend_counts_per_day_and_slope(self):
+        rows = []
+        for day in range(1, 6):
+            rows += [row(f"d{day}v{i}", 0.3 + day / 20, "HIGH" if i else "CRITICAL", f"2026-01-0{day} 10:00:00")
+                     for i in range(day)]
+        rows.append(row("other", 0.9, "CRITICAL", "2026-01-05 10:00:00", target="hyunjin"))
+        write_parquet_report(self.reports, "dox_report_20260105_1000", rows)
+        self.store.ingest(self.reports)
+
+        points = self.store.trend("felix", days=3, today=date(2026, 1, 5))
+        everyone = self.store.trend(days=3, today=date(2026, 1, 5))
+
+        self.assertEqual([(p["day"], p["videos"], p["critical"], p["high"]) for p in points],
+                         [("2026-01-03", 3, 1, 2), ("2026-01-04", 4, 1, 3), ("2026-01-05", 5, 1, 4)])
+        self.assertEqual(everyone[-1]["videos"], 6)
+        self.assertAlmostEqual(trend_slope(points), 1.0)
+        self.assertGreater(trend_slope(points, "avg_score"), 0)
+        self.assertEqual(trend_slope(points[:1]), 0.0)
+
+    def test_queries_use_the_indexes(self):
+        plans = {
+            "history": "SELECT * FROM daily WHERE video_id = 'a'",
+            "target": "SELECT day FROM daily WHERE target = 'felix' AND day >= '2026-01-01'",
+            "day": "SELECT day FROM daily WHERE day >= '2026-01-01'",
+        }
+        for name, sql in plans.items():
+            with self.subTest(name):
+                (plan,) = [r[-1] for r in self.store._conn.execute(f"EXPLAIN QUERY PLAN {sql}")]
+                self.assertTrue(plan.startswith("SEARCH daily USING"), plan)
+
+
+class HistoryDashboardTests(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.reports = Path(tmp.name, "reports")
+        self.reports.mkdir()
+        for patcher in (
+            patch.object(dashboard, "REPORTS_DIR", self.reports),
+            patch.object(dashboard, "_history", None),
+            patch.dict(os.environ, {"STATE_DIR": str(Path(tmp.name, "state"))}),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(lambda: dashboard._history and dashboard._history.close())
+        dashboard.report_cache.clear()
+        self.addCleanup(dashboard.report_cache.clear)
+        today = date.today().isoformat()
+        write_parquet_report(self.reports, "dox_report_20260101_1000", [
+            row("vid1", 0.8, "CRITICAL", f"{today} 10:00:00"),
+            row("vid2", 0.4, "MEDIUM", f"{today} 10:00:00", target="hyunjin"),
+        ])
+        self.client = dashboard.app.test_client()
+
+    def test_history_and_trend_views(self):
+        history = self.client.get("/history/vid1")
+        missing = self.client.get("/history/nope")
+        trends = self.client.get("/trends?target=hyunjin&days=7")
+        index = self.client.get("/")
+
+        self.assertEqual(history.status_code, 200)
+        self.assertIn(b"First seen", history.data)
+        self.assertIn(b"CRITICAL", history.data)
+        self.assertEqual(missing.status_code, 404)
+        self.assertEqual(trends.status_code, 200)
+        self.assertIn(b"Trends for hyunjin", trends.data)
+        self.assertIn(b"0.400", trends.data)
+        self.assertNotIn(b"0.800", trends.data)
+        self.assertIn(b"/history/vid1", index.data)
+
+    def test_cli_ingests_into_state_dir(self):
+        with patch.object(scan, "REPORTS_DIR", str(self.reports)), patch("builtins.print"):
+            rows = scan.main(["history"])
+
+        self.assertEqual(rows, 2)
+        self.assertTrue(os.path.exists(history_path()))
+
+
+if __name__ == "__main__":
+    unittest.main()
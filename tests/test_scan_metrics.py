@@ -0,0 +1,88 @@
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+
+from scan_metrics import (
+    NULL_METRICS,
+    Metrics,
+    load_summary,
+    run_summary_to_prometheus,
+    save_summary,
+    summary_path,
+    to_prometheus,
+)
+
+
+class MetricsTests(unittest.TestCase):
+    def test_counters_and_histograms(self):
+        metrics = Metrics(buckets=(0.1, 1.0))
+        metrics.inc("retries_total", reason="network")
+        metrics.inc("retries_total", 2, reason="network")
+        for value in (0.05, 0.5, 5.0):
+            metrics.observe("http_request_seconds", value)
+
+        summary = metrics.summary()
+
+        self.assertEqual(metrics.counter("retries_total", reason="network"), 3)
+        hist = summary["histograms"][0]
+        self.assertEqual(hist["counts"], [1, 1, 1])
+        self.assertEqual(hist["count"], 3)
+        self.assertAlmostEqual(hist["sum"], 5.55)
+
+    def test_prometheus_format(self):
+        metrics = Metrics(buckets=(0.1, 1.0))
+        metrics.inc("hits_total", severity="HIGH")
+        metrics.observe("stage_seconds", 0.5, stage="tfidf")
+
+        text = to_prometheus(metrics.summary())
+
+        self.assertIn("# TYPE doxhunter_hits_total counter", text)
+        self.assertIn('doxhunter_hits_total{severity="HIGH"} 1', text)
+        self.assertIn('doxhunter_stage_seconds_bucket{stage="tfidf",le="0.1"} 0', text)
+        self.assertIn('doxhunter_stage_seconds_bucket{stage="tfidf",le="1"} 1', text)
+        self.assertIn('doxhunter_stage_seconds_bucket{stage="tfidf",le="+Inf"} 1', text)
+        self.assertIn('doxhunter_stage_seconds_count{stage="tfidf"} 1', text)
+
+    def test_thread_safe_counts(self):
+        metrics = Metrics()
+
+        def work():
+            for _ in range(1000):
+                metrics.inc("calls_total")
+                with metrics.timer("request_seconds"):
+                    pass
+
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(metrics.counter("calls_total"), 4000)
+        self.assertEqual(metrics.summary()["histograms"][0]["count"], 4000)
+
+    def test_null_metrics_records_nothing(self):
+        NULL_METRICS.inc("x")
+        with NULL_METRICS.timer("y", stage="z"):
+            pass
+
+        self.assertFalse(NULL_METRICS.enabled)
+        self.assertEqual(NULL_METRICS.summary(), {"counters": [], "histograms": []})
+
+    def test_summary_saved_next_to_report(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            report = Path(tmp, "dox_report_20260101_1000.parquet")
+            save_summary(report, {"videos_scored": 3, "quota_blocked": False, "hits_by_severity": {"HIGH": 2}})
+
+            self.assertEqual(summary_path(report), str(Path(tmp, "dox_report_20260101_1000.summary.json")))
+            summary = load_summary(report)
+            text = run_summary_to_prometheus(summary)
+
+        self.assertIn("doxhunter_last_run_videos_scored 3", text)
+        self.assertIn("doxhunter_last_run_quota_blocked 0", text)
+        self.assertIn('doxhunter_last_run_hits_by_severity{severity="HIGH"} 2', text)
+
+
+if __name__ == "__main__":
+    unittest.main()
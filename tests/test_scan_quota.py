@@ -0,0 +1,156 @@
+import random
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+
+import scan_kpop_doxhunter as scan
+from scan_quota import QuotaScheduler, parse_retry_after
+
+
+class FakeClock:
+    def __init__(self, now=1_767_225_600.0):  # 2026-01-01 00:00 UTC
+        self.now_value = now
+        self.sleeps = []
+
+    def now(self):
+        return self.now_value
+
+    def sleep(self, seconds, interrupt=None):
+        self.sleeps.append(seconds)
+        self.now_value += seconds
+
+
+class FakeResponse:
+    def __init__(self, status_code=200, body=None, headers=None):
+        self.status_code = status_code
+        self._body = body if body is not None else {"items": []}
+        self.headers = headers or {}
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self._body
+
+
+class FakeBackend:
+    """Repond dans l'ordre avec les reponses preparees."""
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.calls = []
+
+    def get(self, url, params=None, timeout=None):
+        self.calls.append(dict(params))
+        return self.responses.pop(0)
+
+
+def _page(video_id, next_token=None):
+    body = {"items": [{"id": {"videoId": video_id}, "snippet": {"title": video_id}}]}
+    if next_token:
+        body["nextPageToken"] = next_token
+    return body
+
+
+class QuotaSchedulerTests(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.path = str(Path(self._tmp.name, "quota.json"))
+        self.clock = FakeClock()
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_budget_persists_and_resets_next_day(self):
+        scheduler = QuotaScheduler(self.path, daily_budget=250, clock=self.clock)
+        self.assertTrue(scheduler.try_spend(100))
+        self.assertTrue(scheduler.try_spend(100))
+        self.assertFalse(scheduler.try_spend(100))
+        scheduler.save()
+
+        reloaded = QuotaScheduler(self.path, daily_budget=250, clock=self.clock)
+        self.assertEqual(reloaded.spent, 200)
+        self.assertEqual(reloaded.remaining(), 50)
+
+        self.clock.now_value += 24 * 3600
+        self.assertEqual(reloaded.spent, 0)
+        self.assertTrue(reloaded.try_spend(100))
+
+    def test_rank_prefers_productive_queries(self):
+        scheduler = QuotaScheduler(self.path, clock=self.clock)
+        scheduler.record_yield("dry", calls=4, hits=0)
+        scheduler.record_yield("rich", calls=2, hits=5)
+        self.assertEqual(scheduler.rank(["dry", "new", "rich"]), ["rich", "new", "dry"])
+
+    def test_backoff_honors_retry_after_and_jitter_cap(self):
+        scheduler = QuotaScheduler(clock=self.clock, rng=random.Random(0), backoff_base=2.0)
+        self.assertEqual(scheduler.backoff_delay(1, retry_after=7.0), 7.0)
+        for attempt in (1, 2, 3):
+            delay = scheduler.backoff_delay(attempt)
+            self.assertGreaterEqual(delay, 0)
+            self.assertLessEqual(delay, 2.0 * 2 ** (attempt - 1))
+
+    def test_parse_retry_after(self):
+        self.assertEqual(parse_retry_after("12", 0), 12.0)
+        self.assertEqual(parse_retry_after("Thu, 01 Jan 1970 00:00:30 GMT", 10.0), 20.0)
+        self.assertIsNone(parse_retry_after("soon", 0))
+        self.assertIsNone(parse_retry_after(None, 0))
+
+
+class FetchWithSchedulerTests(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.stop = threading.Event()
+
+    def test_429_waits_retry_after_then_succeeds(self):
+        backend = FakeBackend([
+            FakeResponse(429, {"error": {}}, headers={"Retry-After": "7"}),
+            FakeResponse(200, _page("v1")),
+        ])
+        scheduler = QuotaScheduler(clock=self.clock, daily_budget=1000)
+
+        result = scan.fetch_query_pages(backend, "felix", "KEY", 2, self.stop, scheduler=scheduler)
+
+        self.assertFalse(result.quota_blocked)
+        self.assertEqual(len(result.pages), 1)
+        self.assertEqual(self.clock.sleeps, [7.0])
+        self.assertEqual(result.network_calls, 2)
+        self.assertEqual(result.request_failures, 1)
+        self.assertEqual(scheduler.spent, 200)
+        self.assertFalse(self.stop.is_set())
+
+    def test_persistent_429_blocks_quota(self):
+        backend = FakeBackend([FakeResponse(429) for _ in range(scan.RETRY_ATTEMPTS)])
+        scheduler = QuotaScheduler(clock=self.clock, rng=random.Random(1))
+
+        result = scan.fetch_query_pages(backend, "felix", "KEY", 2, self.stop, scheduler=scheduler)
+
+        self.assertTrue(result.quota_blocked)
+        self.assertTrue(self.stop.is_set())
+        self.assertEqual(len(self.clock.sleeps), scan.RETRY_ATTEMPTS - 1)
+
+    def test_budget_exhaustion_stops_pagination(self):
+        backend = FakeBackend([FakeResponse(200, _page("v1", "P2")), FakeResponse(200, _page("v2"))])
+        scheduler = QuotaScheduler(clock=self.clock, daily_budget=100)
+
+        result = scan.fetch_query_pages(backend, "felix", "KEY", 5, self.stop, scheduler=scheduler)
+
+        self.assertTrue(result.budget_exhausted)
+        self.assertFalse(result.quota_blocked)
+        self.assertEqual(len(backend.calls), 1)
+        self.assertEqual(len(result.pages), 1)
+
+    def test_403_stops_without_retry(self):
+        backend = FakeBackend([FakeResponse(403)])
+        scheduler = QuotaScheduler(clock=self.clock)
+
+        result = scan.fetch_query_pages(backend, "felix", "KEY", 2, self.stop, scheduler=scheduler)
+
+        self.assertTrue(result.quota_blocked)
+        self.assertEqual(self.clock.sleeps, [])
+        self.assertEqual(result.request_failures, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,237 @@
+import gzip
+import json
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import pandas as pd
+import requests
+
+import scan_kpop_doxhunter as scan
+from scan_metrics import load_summary
+from scan_replay import RecordingSession, ReplayResponse, ReplaySession, load_cassette
+from scan_report import find_latest_report
+
+SEARCH = json.loads((Path(__file__).parent / "fixtures" / "enrich" / "search_felix.json").read_text(encoding="utf-8"))
+
+
+class PagedSession:
+    """Fausse API: deux pages de resultats chainees par nextPageToken."""
+
+    def __init__(self):
+        self.calls = []
+
+    def get(self, url, params=None, timeout=None):
+        self.calls.append(dict(params))
+        if params.get("pageToken") is None:
+            body = dict(SEARCH, nextPageToken="PAGE2")
+        else:
+            body = {"items": [dict(item, id={"videoId": item["id"]["videoId"] + "_p2"}) for item in SEARCH["items"]]}
+        return ReplayResponse(200, json.dumps(body), {"Content-Type": "application/json", "ETag": "x"}, url)
+
+    def close(self):
+        pass
+
+
+class FlakySession:
+    def get(self, url, params=None, timeout=None):
+        raise requests.ConnectionError("connection reset")
+
+    def close(self):
+        pass
+
+
+class LeakySession:
+    """Erreur reseau dont le message contient l'URL complete, cle comprise."""
+
+    def get(self, url, params=None, timeout=None):
+        raise requests.ConnectionError(f"Max retries exceeded with url: {url}?q=felix&key={params['key']} (reset)")
+
+    def close(self):
+        pass
+
+
+class ReplaySessionTests(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.cassette = str(Path(tmp.name, "run.jsonl.gz"))
+
+    def _record(self, inner, calls):
+        recorder = RecordingSession(inner, self.cassette)
+        for params in calls:
+            try:
+                recorder.get(scan.YOUTUBE_SEARCH_URL, params=dict(params, key="SECRET"))
+            except requests.RequestException:
+                pass
+        recorder.close()
+
+    def test_cassette_is_gzip_jsonl_without_the_api_key(self):
+        self._record(PagedSession(), [{"q": "felix"}, {"q": "felix", "pageToken": "PAGE2"}])
+
+        with gzip.open(self.cassette, "rt", encoding="utf-8") as fh:
+            text = fh.read()
+        entries = load_cassette(self.cassette)
+
+        self.assertNotIn("SECRET", text)
+        self.assertEqual([e["params"] for e in entries], [{"q": "felix"}, {"pageToken": "PAGE2", "q": "felix"}])
+        self.assertEqual(entries[0]["headers"], {"Content-Type": "application/json"})
+
+    def test_same_request_answers_in_order_then_repeats_last(self):
+        self._record(PagedSession(), [{"q": "felix"}])
+        replay = ReplaySession(self.cassette, strict=True)
+
+        first = replay.get(scan.YOUTUBE_SEARCH_URL, params={"q": "felix", "key": "OTHER"})
+        again = replay.get(scan.YOUTUBE_SEARCH_URL, params={"q": "felix"})
+        missing = ReplaySession(self.cassette).get(scan.YOUTUBE_SEARCH_URL, params={"q": "hyunjin"})
+
+        self.assertEqual(first.json()["nextPageToken"], "PAGE2")
+        self.assertEqual(again.json(), first.json())
+        self.assertEqual(missing.status_code, 404)
+        with self.assertRaises(LookupError):
+            replay.get(scan.YOUTUBE_SEARCH_URL, params={"q": "hyunjin"})
+
+    def test_recorded_network_errors_are_raised_again(self):
+        self._record(FlakySession(), [{"q": "felix"}])
+
+        with self.assertRaises(requests.ConnectionError):
+            ReplaySession(self.cassette).get(scan.YOUTUBE_SEARCH_URL, params={"q": "felix"})
+
+    def test_recorded_error_messages_do_not_leak_the_api_key(self):
+        self._record(LeakySession(), [{"q": "felix"}])
+
+        with gzip.open(self.cassette, "rt", encoding="utf-8") as fh:
+            text = fh.read()
+        with self.assertRaises(requests.ConnectionError) as ctx:
+            ReplaySession(self.cassette).get(scan.YOUTUBE_SEARCH_URL, params={"q": "felix"})
+
+        self.assertNotIn("SECRET", text)
+        self.assertIn("key=REDACTED", str(ctx.exception))
+
+    def test_truncated_cassette_keeps_complete_entries(self):
+        self._record(PagedSession(), [{"q": "felix"}, {"q": "felix", "pageToken": "PAGE2"}])
+        data = Path(self.cassette).read_bytes()
+        Path(self.cassette).write_bytes(data[:-12])  # run tue: pas de fin de flux gzip
+
+        with patch("builtins.print"):
+            entries = load_cassette(self.cassette)
+
+        self.assertEqual(len(entries), 2)
+
+    def test_latency_recorded_or_fixed(self):
+        self._record(PagedSession(), [{"q": "felix"}])
+        slept = []
+
+        ReplaySession(self.cassette, latency="recorded", sleep=slept.append).get(
+            scan.YOUTUBE_SEARCH_URL, params={"q": "felix"}
+        )
+        ReplaySession(self.cassette, latency=0.25, sleep=slept.append).get(
+            scan.YOUTUBE_SEARCH_URL, params={"q": "felix"}
+        )
+        ReplaySession(self.cassette, sleep=slept.append).get(scan.YOUTUBE_SEARCH_URL, params={"q": "felix"})
+
+        self.assertEqual(slept[0], load_cassette(self.cassette)[0]["elapsed"])
+        self.assertEqual(slept[1:], [0.25])
+
+    def test_quota_after_and_synthetic_pages(self):
+        self._record(PagedSession(), [{"q": "felix"}, {"q": "felix", "pageToken": "PAGE2"}])
+        replay = ReplaySession(self.cassette, pages=4, quota_after=3)
+
+        token, ids = None, []
+        for _ in range(3):
+            params = {"q": "felix"} if token is None else {"q": "felix", "pageToken": token}
+            body = replay.get(scan.YOUTUBE_SEARCH_URL, params=params).json()
+            ids += [item["id"]["videoId"] for item in body["items"]]
+            token = body.get("nextPageToken")
+        blocked = replay.get(scan.YOUTUBE_SEARCH_URL, params={"q": "felix", "pageToken": token})
+
+        self.assertEqual(token, "replay:3")
+        self.assertEqual(len(ids), 15)
+        self.assertEqual(len(set(ids)), 15)
+        self.assertIn("cand1~2", ids)
+        self.assertEqual(blocked.status_code, 403)
+        self.assertEqual(blocked.json()["error"]["errors"][0]["reason"], "quotaExceeded")
+
+
+class ReplayScanTests(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = Path(tmp.name)
+        self.cassette = str(self.tmp / "scan.jsonl.gz")
+        env = {
+            "STATE_DIR": str(self.tmp / "state"),
+            "CACHE_ENABLED": "0",
+            "MAX_PAGES_PER_QUERY": "2",
+        }
+        for patcher in (
+            patch.object(scan, "QUERIES", ["Felix maison Seoul"]),
+            patch.dict(os.environ, env),
+            patch("builtins.print"),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        os.environ.pop("YOUTUBE_API_KEY", None)
+
+    def _scan(self, name, session=None, quota_blocked=False, **env):
+        reports = self.tmp / name
+        with patch.object(scan, "REPORTS_DIR", str(reports)), patch.dict(os.environ, env):
+            if quota_blocked:
+                # Resultats partiels sauvegardes, puis sortie en erreur
+                with self.assertRaises(SystemExit):
+                    scan.ml_dox_hunter(session=session)
+            else:
+                scan.ml_dox_hunter(session=session)
+        # Un rejeu ecrit dans son propre sous-dossier
+        latest = find_latest_report(reports / "replay" if "REPLAY_CASSETTE" in env else reports)
+        return pd.read_parquet(latest).drop(columns="timestamp"), load_summary(latest)
+
+    def test_recorded_scan_replays_identically_without_network_or_key(self):
+        live = PagedSession()
+        recorded, _ = self._scan("live", RecordingSession(live, self.cassette), YOUTUBE_API_KEY="TEST_KEY")
+
+        replayed, summary = self._scan("replay", REPLAY_CASSETTE=self.cassette)
+
+        self.assertEqual(len(live.calls), 2)
+        pd.testing.assert_frame_equal(replayed, recorded)
+        self.assertEqual(summary["network_calls"], {"Felix maison Seoul": 2})
+
+    def test_replay_with_more_pages_and_quota_exhaustion(self):
+        self._scan("live", RecordingSession(PagedSession(), self.cassette), YOUTUBE_API_KEY="TEST_KEY")
+
+        _, many = self._scan("many", REPLAY_CASSETTE=self.cassette, REPLAY_PAGES="6", MAX_PAGES_PER_QUERY="6")
+        _, blocked = self._scan(
+            "blocked", quota_blocked=True, REPLAY_CASSETTE=self.cassette, REPLAY_PAGES="6", MAX_PAGES_PER_QUERY="6",
+            REPLAY_QUOTA_AFTER="3",
+        )
+
+        self.assertEqual(many["videos_scored"], 30)
+        self.assertFalse(many["quota_blocked"])
+        self.assertEqual(blocked["videos_scored"], 15)
+        self.assertTrue(blocked["quota_blocked"])
+
+    def test_replay_leaves_real_state_and_reports_alone(self):
+        self._scan("live", RecordingSession(PagedSession(), self.cassette), YOUTUBE_API_KEY="TEST_KEY")
+        state = self.tmp / "state"
+        quota_before = (state / "quota.json").read_text(encoding="utf-8")
+
+        _, summary = self._scan(
+            "live", REPLAY_CASSETTE=self.cassette, REPLAY_PAGES="6", MAX_PAGES_PER_QUERY="6",
+            DAILY_QUOTA_UNITS="300", CACHE_ENABLED="1", INCREMENTAL="1",
+        )
+
+        # Budget illimite et en memoire, pas de cache, etat et rapports a part
+        self.assertEqual(summary["videos_scored"], 30)
+        self.assertFalse(summary["budget_exhausted"])
+        self.assertEqual((state / "quota.json").read_text(encoding="utf-8"), quota_before)
+        self.assertFalse((state / "scan_cache.sqlite").exists())
+        self.assertFalse((state / "replay" / "scan_cache.sqlite").exists())
+        self.assertFalse((state / "replay" / "quota.json").exists())
+        self.assertTrue((state / "replay" / "high_water.json").exists())
+        self.assertEqual(len(list((self.tmp / "live").glob("dox_report_*.parquet"))), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
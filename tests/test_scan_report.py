@@ -0,0 +1,79 @@
+import csv
+import random
+import tempfile
+import unittest
+from pathlib import Path
+
+from scan_report import ReportWriter
+
+
+def _read(path):
+    with open(path, newline="", encoding="utf-8") as fh:
+        return list(csv.DictReader(fh))
+
+
+class ReportWriterTests(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.path = str(Path(self._tmp.name, "dox_report_test.csv"))
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _row(self, video_id, score):
+        return {"video_id": video_id, "dox_score": score, "title": f"t {video_id}"}
+
+    def test_external_sort_over_several_runs(self):
+        rng = random.Random(3)
+        scores = [round(rng.random(), 3) for _ in range(57)]
+        writer = ReportWriter(self.path, columns=["video_id", "dox_score", "title"], chunk_rows=4, sort_memory_rows=10)
+        for i, score in enumerate(scores):
+            writer.append(self._row(f"v{i}", score))
+
+        self.assertEqual(writer.close(), 57)
+        saved = [float(r["dox_score"]) for r in _read(self.path)]
+        self.assertEqual(saved, sorted(scores, reverse=True))
+
+    def test_partial_report_is_valid_after_crash(self):
+        with self.assertRaises(RuntimeError):
+            with ReportWriter(self.path, columns=["video_id", "dox_score", "title"], chunk_rows=100) as writer:
+                writer.append(self._row("a", 0.4))
+                writer.append(self._row("b", 0.9))
+                raise RuntimeError("killed")
+
+        self.assertEqual([r["video_id"] for r in _read(self.path)], ["a", "b"])
+
+    def test_merge_widens_old_header_and_dedupes(self):
+        with open(self.path, "w", newline="", encoding="utf-8") as fh:
+            fh.write("video_id,dox_score\nold,0.5\nsame,0.3\n")
+
+        writer = ReportWriter(self.path, columns=["video_id", "dox_score", "title"], merge=True)
+        writer.append(self._row("same", 0.8))
+        writer.append(self._row("new", 0.6))
+        self.assertEqual(writer.close(dedupe_on="video_id"), 3)
+
+        rows = _read(self.path)
+        self.assertEqual([r["video_id"] for r in rows], ["same", "new", "old"])
+        self.assertEqual(rows[0]["title"], "t same")
+        self.assertEqual(rows[2]["title"], "")
+
+    def test_dedupe_on_several_columns(self):
+        writer = ReportWriter(self.path, columns=["video_id", "target", "dox_score"])
+        writer.extend([
+            {"video_id": "a", "target": "felix", "dox_score": 0.4},
+            {"video_id": "a", "target": "hyunjin", "dox_score": 0.5},
+            {"video_id": "a", "target": "felix", "dox_score": 0.9},
+        ])
+        self.assertEqual(writer.close(dedupe_on=("video_id", "target")), 2)
+
+        rows = _read(self.path)
+        self.assertEqual([(r["target"], r["dox_score"]) for r in rows], [("felix", "0.9"), ("hyunjin", "0.5")])
+
+    def test_nothing_written_creates_no_file(self):
+        writer = ReportWriter(self.path)
+        self.assertEqual(writer.close(), 0)
+        self.assertFalse(Path(self.path).exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
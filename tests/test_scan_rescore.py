@@ -0,0 +1,95 @@
+import json
+import os
+import tempfile
+import unittest
+from datetime import datetime
+from pathlib import Path
+from unittest.mock import patch
+
+import pandas as pd
+
+import scan_kpop_doxhunter as scan
+import scan_rescore
+
+DOX_TEXT = "adresse Felix quartier Coree du Sud"
+
+
+def _records():
+    return [
+        {"id": {"videoId": "raw1"}, "snippet": {"title": "Felix maison Seoul", "description": DOX_TEXT}},
+        {"video_id": "flat1", "title": "Felix &amp; Han appartement", "description": "coordonnees 37.5665, 126.9780"},
+        {"video_id": "clean1", "title": "Stray Kids dance practice", "description": "choreography"},
+        {"video_id": "flat2", "title": "Felix vit ici", "description": DOX_TEXT, "query": "archive"},
+    ]
+
+
+class RescoreTests(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.dir = Path(self._tmp.name)
+        patcher = patch.dict(os.environ, {"STATE_DIR": str(self.dir / "state")})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.jsonl = self.dir / "dump.jsonl"
+        lines = [json.dumps(r) for r in _records()]
+        lines.insert(2, "{not json")
+        self.jsonl.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+    def _report(self, name, **kwargs):
+        path, _, _ = scan_rescore.rescore([self.jsonl], output=str(self.dir / name), **kwargs)
+        return pd.read_parquet(path).drop(columns=["timestamp"])
+
+    def test_reads_raw_and_flat_records(self):
+        snippets = list(scan_rescore.iter_snippets([self.jsonl]))
+
+        self.assertEqual([s[0] for s in snippets], ["raw1", "flat1", "clean1", "flat2"])
+        self.assertEqual(snippets[0][3], scan_rescore.DEFAULT_QUERY)
+        self.assertEqual(snippets[3][3], "archive")
+
+    def test_scores_match_live_scoring(self):
+        df = self._report("out.parquet", workers=1).set_index("video_id")
+
+        for video_id, title, description, query in scan_rescore.iter_snippets([self.jsonl]):
+            text = f"{scan.normalize_text(title)} {scan.normalize_text(description)}".strip()
+            score = scan.score_batch([text]).to_dict("records")[0]
+            row = scan.make_report_row(query, video_id, title, score, datetime.now())
+            if not scan.is_hit(row):
+                self.assertNotIn(video_id, df.index)
+                continue
+            self.assertEqual(df.loc[video_id, "dox_score"], row["dox_score"])
+            self.assertEqual(df.loc[video_id, "severity"], row["severity"])
+            self.assertEqual(df.loc[video_id, "display_title"], row["display_title"])
+
+    def test_process_pool_matches_single_process(self):
+        single = self._report("single.parquet", workers=1, chunk_size=1)
+        pooled = self._report("pooled.parquet", workers=2, chunk_size=1)
+
+        pd.testing.assert_frame_equal(single, pooled)
+        self.assertEqual(list(pooled["dox_score"]), sorted(pooled["dox_score"], reverse=True))
+
+    def test_parquet_dump_and_dedupe(self):
+        dump = self.dir / "dump.parquet"
+        records = [r for r in _records() if "video_id" in r]
+        pd.DataFrame(records + [dict(records[0], title="Felix maison Seoul")]).to_parquet(dump)
+
+        path, scored, hits = scan_rescore.rescore([dump], output=str(self.dir / "out.parquet"), workers=1)
+        df = pd.read_parquet(path)
+
+        self.assertEqual(scored, 4)
+        self.assertEqual(len(df), df["video_id"].nunique())
+        self.assertEqual(hits, len(df))
+
+    def test_no_hits_writes_no_report(self):
+        clean = self.dir / "clean.jsonl"
+        clean.write_text(json.dumps({"video_id": "c", "title": "dance practice"}) + "\n", encoding="utf-8")
+
+        path, scored, hits = scan_rescore.rescore([clean], output=str(self.dir / "out.parquet"), workers=1)
+
+        self.assertIsNone(path)
+        self.assertEqual((scored, hits), (1, 0))
+        self.assertEqual(list(self.dir.glob("out.*")), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
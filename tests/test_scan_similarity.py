@@ -0,0 +1,86 @@
+import os
+import random
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.metrics.pairwise import cosine_similarity
+
+import scan_kpop_doxhunter as scan
+from scan_similarity import ExactIndex, PrunedIndex, build_index, get_similarity_index, index_version
+from scan_targets import DEFAULT_TARGET, Target
+
+WORDS = (
+    "felix hyunjin maison appartement adresse quartier gangnam seoul dorm rue gps stalker suivre "
+    "fenetre voiture parking ecole cafe metro station sortie hotel aeroport concert fansign dance "
+    "practice stage comeback fancam live cover vlog"
+).split()
+
+
+def _corpus(n, seed=0):
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(WORDS) for _ in range(rng.randint(4, 12))) for _ in range(n)]
+
+
+class IndexTests(unittest.TestCase):
+    def setUp(self):
+        self.corpus = _corpus(400)
+        self.queries = _corpus(60, seed=1) + ["", "mot inconnu"]
+        self.vectorizer = TfidfVectorizer()
+        self.X = self.vectorizer.fit_transform(self.corpus)
+        self.vecs = self.vectorizer.transform(self.queries)
+        self.dense = cosine_similarity(self.X, self.vecs)
+
+    def test_exact_top_k_matches_dense_brute_force(self):
+        scores, ids = ExactIndex(self.X, block_texts=16).search(self.vecs, k=5)
+
+        np.testing.assert_array_equal(scores[:, 0], self.dense.max(axis=0))
+        for i in range(60):
+            expected = sorted(range(len(self.corpus)), key=lambda d: (-self.dense[d, i], d))[:5]
+            self.assertEqual(list(ids[i]), expected)
+        # Aucun terme commun: pas de voisin
+        self.assertEqual(list(ids[-1]), [-1] * 5)
+        self.assertEqual(list(scores[-2]), [0.0] * 5)
+
+    def test_pruned_index_finds_most_exact_neighbours(self):
+        exact_scores, exact_ids = ExactIndex(self.X).search(self.vecs, k=1)
+        scores, ids = PrunedIndex(self.X, terms_per_doc=8, query_terms=6).search(self.vecs, k=3)
+
+        recall = np.mean(ids[:60, 0] == exact_ids[:60, 0])
+        self.assertGreater(recall, 0.9)
+        # Les scores renvoyes sont exacts (re-classement), jamais au-dessus du vrai maximum
+        found = ids[:60, 0] >= 0
+        np.testing.assert_allclose(scores[:60, 0][found], self.dense[ids[:60, 0][found], np.arange(60)[found]])
+        self.assertTrue(np.all(scores[:, 0] <= exact_scores[:, 0] + 1e-12))
+        self.assertTrue(np.all(np.diff(scores[:60], axis=1) <= 0))
+        self.assertEqual(list(ids[-1]), [-1] * 3)
+
+    def test_index_kind_from_env(self):
+        with patch.dict(os.environ, {"SIMILARITY_INDEX": "pruned"}):
+            self.assertIsInstance(build_index(self.X), PrunedIndex)
+            self.assertNotEqual(index_version(), index_version("exact"))
+        with patch.dict(os.environ, {"SIMILARITY_INDEX": "nope"}), patch("builtins.print"):
+            self.assertEqual(get_similarity_index(), "exact")
+        self.assertIsInstance(build_index(self.X), ExactIndex)
+
+
+class MatchedExampleTests(unittest.TestCase):
+    def test_score_batch_reports_the_closest_example(self):
+        text = scan.normalize_text(scan.DOX_CORPUS[3] + " video")
+        target = Target(DEFAULT_TARGET, tuple(scan.QUERIES), tuple(scan.DOX_CORPUS))
+
+        for kind in ("exact", "pruned"):
+            with self.subTest(kind=kind):
+                model = scan.get_target_model((target,), kind)
+                score = scan.score_batch([text, "zzz"], model).to_dict("records")
+
+                self.assertEqual(score[0]["example"], scan.DOX_CORPUS[3])
+                self.assertEqual(score[0]["targets"][DEFAULT_TARGET]["example"], scan.DOX_CORPUS[3])
+                self.assertEqual(score[1]["example"], "")
+                row = next(scan.iter_target_rows("q", "v1", "Titre", score[0], None))
+                self.assertEqual(row["matched_example"], scan.DOX_CORPUS[3][:100])
+
+
+if __name__ == "__main__":
+    unittest.main()
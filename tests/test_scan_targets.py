@@ -0,0 +1,192 @@
+import json
+import os
+import tempfile
+import threading
+import unittest
+from http.server import ThreadingHTTPServer
+from pathlib import Path
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+
+import scan_kpop_doxhunter as scan
+from scan_report import find_latest_report
+from scan_targets import DEFAULT_TARGET, Target, load_targets, parse_targets, stack_corpora, targets_by_query
+from test_scan import _stub_video, _StubYouTubeHandler
+
+CONFIG = {
+    "targets": [
+        {
+            "name": "felix",
+            "queries": ["Felix maison Seoul", "Stray Kids dorm"],
+            "aliases": ["Felix", "Lee Felix", "용복"],
+        },
+        {
+            "name": "hyunjin",
+            "queries": ["Hyunjin address", "Stray Kids dorm"],
+            "corpus": ["hyunjin habite dans un appartement a gangnam", "adresse de hyunjin a seoul"],
+            "aliases": ["Hyunjin"],
+            "min_dox_score": 0.05,
+        },
+    ]
+}
+
+
+class TargetConfigTests(unittest.TestCase):
+    def test_parse_defaults_and_normalized_aliases(self):
+        with patch("builtins.print"):
+            felix, hyunjin = parse_targets(CONFIG, scan.DOX_CORPUS, scan.normalize_text)
+
+        self.assertEqual(felix.corpus, tuple(scan.DOX_CORPUS))
+        # Alias hangul vide une fois normalise: ignore
+        self.assertEqual(felix.aliases, ("felix", "lee felix"))
+        self.assertIsNone(felix.min_dox_score)
+        self.assertEqual(hyunjin.min_dox_score, 0.05)
+        self.assertTrue(felix.matches("lee felix maison"))
+        self.assertFalse(felix.matches("felixe maison"))
+        self.assertTrue(Target("all", ("q",), ("c",)).matches("anything"))
+
+    def test_invalid_configs_raise(self):
+        bad = [
+            {},
+            {"targets": []},
+            {"targets": [{"name": "a"}]},
+            {"targets": [{"name": "a", "queries": ["q"]}, {"name": "a", "queries": ["q"]}]},
+            {"targets": [{"name": "a", "queries": ["q"], "min_dox_score": 2}]},
+            {"targets": [{"name": "a", "queries": ["q"], "corpus": "text"}]},
+        ]
+        for config in bad:
+            with self.subTest(config=config), self.assertRaises(ValueError):
+                parse_targets(config, scan.DOX_CORPUS, scan.normalize_text)
+
+    def test_missing_file_gives_default_target(self):
+        targets = load_targets("does/not/exist.json", ["q1"], ["doc"], scan.normalize_text)
+
+        self.assertEqual(targets, [Target(DEFAULT_TARGET, ("q1",), ("doc",))])
+
+    def test_queries_and_corpora_are_shared(self):
+        a = Target("a", ("q1", "shared"), ("d1", "d2"))
+        b = Target("b", ("shared",), ("d2", "d3"))
+
+        self.assertEqual(targets_by_query([a, b]), {"q1": ("a",), "shared": ("a", "b")})
+        self.assertEqual(stack_corpora([a, b]), (("d1", "d2", "d3"), [0, 1, 1, 2], [0, 2]))
+
+
+class TargetScoringTests(unittest.TestCase):
+    def test_default_target_scores_like_single_model(self):
+        texts = [scan.normalize_text(t) for t in ("Felix maison Seoul gangnam", "dance practice", "")]
+        target_model = scan.get_target_model((Target(DEFAULT_TARGET, tuple(scan.QUERIES), tuple(scan.DOX_CORPUS)),))
+
+        single = scan.score_batch(texts, scan.get_model())
+        multi = scan.score_batch(texts, target_model)
+
+        np.testing.assert_array_equal(multi["ml_score"].to_numpy(), single["ml_score"].to_numpy())
+        self.assertEqual(list(multi["severity"]), list(single["severity"]))
+        self.assertEqual(multi["targets"][0][DEFAULT_TARGET]["ml_score"], single["ml_score"][0])
+
+    def test_report_frame_expands_targets_like_iter_target_rows(self):
+        with patch("builtins.print"):
+            targets = tuple(parse_targets(CONFIG, scan.DOX_CORPUS, scan.normalize_text))
+        model = scan.get_target_model(targets)
+        query_targets = targets_by_query(targets)
+        raw = [
+            ("Stray Kids dorm", "dorm1", "Stray Kids dorm adresse appartement gangnam"),
+            ("Hyunjin address", "hj1", "Hyunjin adresse appartement gangnam"),
+            ("Felix maison Seoul", "fx1", "Lee Felix maison quartier Seoul"),
+            ("Felix maison Seoul", "none1", "dance practice"),
+        ]
+        texts = [scan.normalize_text(title) for _, _, title in raw]
+        scores = scan.score_batch(texts, model)
+        now = pd.Timestamp("2026-01-01 12:00")
+
+        frame = scan.report_frame(
+            [q for q, _, _ in raw], [v for _, v, _ in raw], [t for _, _, t in raw], scores, now, query_targets
+        )
+        expected = [
+            row
+            for (query, video_id, title), score in zip(raw, scores.to_dict("records"))
+            for row in scan.iter_target_rows(query, video_id, title, score, now, query_targets)
+        ]
+
+        self.assertEqual(scan.report_records(frame), expected)
+        self.assertEqual(list(frame.index), [0, 0, 1, 2, 3])
+        self.assertEqual(list(scan.hit_mask(frame, model)), [scan.is_hit(row, model) for row in expected])
+
+    def test_each_target_compared_to_its_own_corpus(self):
+        with patch("builtins.print"):
+            targets = tuple(parse_targets(CONFIG, scan.DOX_CORPUS, scan.normalize_text))
+        model = scan.get_target_model(targets)
+        text = scan.normalize_text("Hyunjin adresse appartement gangnam")
+
+        score = scan.score_batch([text], model).to_dict("records")[0]
+
+        per_target = score["targets"]
+        self.assertGreater(per_target["hyunjin"]["ml_score"], per_target["felix"]["ml_score"])
+        self.assertEqual(score["ml_score"], per_target["hyunjin"]["ml_score"])
+        self.assertTrue(per_target["hyunjin"]["match"])
+        self.assertFalse(per_target["felix"]["match"])
+
+
+class MultiTargetScanTests(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _StubYouTubeHandler)
+        self.server.routes = {}
+        self.server.calls = []
+        self.server.params = []
+        self.server.delay = 0
+        self.server.lock = threading.Lock()
+        self.server.in_flight = 0
+        self.server.max_in_flight = 0
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.reports = Path(tmp.name, "reports")
+        targets_file = Path(tmp.name, "targets.json")
+        targets_file.write_text(json.dumps(CONFIG), encoding="utf-8")
+        host, port = self.server.server_address
+        for patcher in (
+            patch.object(scan, "YOUTUBE_SEARCH_URL", f"http://{host}:{port}/youtube/v3/search"),
+            patch.object(scan, "REPORTS_DIR", str(self.reports)),
+            patch.dict(os.environ, {
+                "YOUTUBE_API_KEY": "TEST_KEY",
+                "STATE_DIR": str(Path(tmp.name, "state")),
+                "TARGETS_FILE": str(targets_file),
+            }),
+            patch("builtins.print"),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_rows_are_tagged_per_target_and_videos_fetched_once(self):
+        self.server.routes[("Felix maison Seoul", None)] = (
+            200, {"items": [_stub_video("f1", "Felix maison Seoul adresse gangnam")]}
+        )
+        self.server.routes[("Stray Kids dorm", None)] = (
+            200, {"items": [
+                _stub_video("d1", "Stray Kids dorm adresse appartement gangnam", "quartier de gangnam"),
+                _stub_video("f1", "Felix maison Seoul adresse gangnam"),
+            ]}
+        )
+        self.server.routes[("Hyunjin address", None)] = (
+            200, {"items": [_stub_video("h1", "Hyunjin adresse appartement gangnam", "quartier de gangnam")]}
+        )
+
+        scan.ml_dox_hunter()
+
+        self.assertEqual(sorted(q for q, _ in self.server.calls), ["Felix maison Seoul", "Hyunjin address", "Stray Kids dorm"])
+        df = pd.read_parquet(find_latest_report(self.reports))
+        pairs = set(zip(df["video_id"], df["target"]))
+        self.assertIn(("f1", "felix"), pairs)
+        self.assertIn(("h1", "hyunjin"), pairs)
+        self.assertNotIn(("h1", "felix"), pairs)
+        # Query partagee: la video est rapportee pour les deux cibles, scoree une fois
+        self.assertEqual({t for v, t in pairs if v == "d1"}, {"felix", "hyunjin"})
+        self.assertFalse(df.duplicated(["video_id", "target"]).any())
+
+
+if __name__ == "__main__":
+    unittest.main()
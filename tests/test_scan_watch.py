@@ -0,0 +1,193 @@
+import json
+import os
+import tempfile
+import threading
+import unittest
+from datetime import datetime
+from http.server import ThreadingHTTPServer
+from pathlib import Path
+from unittest.mock import patch
+
+import pandas as pd
+
+import scan_kpop_doxhunter as scan
+import scan_watch
+from scan_report import find_latest_report
+from test_scan import _stub_video, _StubYouTubeHandler
+from test_scan_quota import FakeClock
+
+
+class WatchIntervalTests(unittest.TestCase):
+    def test_interval_follows_recent_hits(self):
+        self.assertEqual(scan_watch.watch_interval(1.0, base=1800, low=300, high=21600), 1800)
+        self.assertEqual(scan_watch.watch_interval(3.0, base=1800, low=300, high=21600), 600)
+        self.assertEqual(scan_watch.watch_interval(100.0, base=1800, low=300, high=21600), 300)
+        self.assertEqual(scan_watch.watch_interval(0.0, base=1800, low=300, high=21600), 21600)
+
+
+class WatcherTests(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _StubYouTubeHandler)
+        self.server.routes = {}
+        self.server.calls = []
+        self.server.params = []
+        self.server.delay = 0
+        self.server.lock = threading.Lock()
+        self.server.in_flight = 0
+        self.server.max_in_flight = 0
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.reports = Path(tmp.name, "reports")
+        self.state_dir = Path(tmp.name, "state")
+        host, port = self.server.server_address
+        for patcher in (
+            patch.object(scan, "YOUTUBE_SEARCH_URL", f"http://{host}:{port}/youtube/v3/search"),
+            patch.object(scan, "REPORTS_DIR", str(self.reports)),
+            patch.dict(os.environ, {"YOUTUBE_API_KEY": "TEST_KEY", "STATE_DIR": str(self.state_dir)}),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.server.routes[("felix hot", None)] = (
+            200, {"items": [_stub_video("hot1", "Felix maison Seoul"), _stub_video("hot2", "Felix appartement")]}
+        )
+        self.server.routes[("felix cold", None)] = (
+            200, {"items": [_stub_video("cold1", "Stray Kids dance practice", "choreography")]}
+        )
+        self.clock = FakeClock()
+
+    def _watcher(self):
+        watcher = scan_watch.Watcher(queries=["felix hot", "felix cold"], clock=self.clock)
+        self.addCleanup(watcher.close)
+        return watcher
+
+    def test_cycle_publishes_report_and_schedules_by_hit_rate(self):
+        watcher = self._watcher()
+
+        hits = watcher.scan_cycle(watcher.due_queries())
+
+        self.assertEqual(hits, 2)
+        report = find_latest_report(self.reports)
+        self.assertEqual(report.suffix, ".parquet")
+        self.assertEqual(sorted(pd.read_parquet(report)["video_id"]), ["hot1", "hot2"])
+        self.assertTrue(report.with_suffix(".summary.json").exists())
+        self.assertEqual(watcher.due_queries(), [])
+        self.assertLess(watcher.interval("felix hot"), watcher.interval("felix cold"))
+
+        state = json.loads((self.state_dir / "watch.json").read_text(encoding="utf-8"))
+        self.assertEqual(state["report"], report.stem)
+        self.assertEqual(set(state["queries"]), {"felix hot", "felix cold"})
+
+    def test_next_cycles_merge_into_the_same_report(self):
+        watcher = self._watcher()
+        watcher.scan_cycle(watcher.due_queries())
+
+        self.server.routes[("felix hot", None)] = (
+            200, {"items": [_stub_video("hot3", "Felix maison Seoul bis"), _stub_video("hot1", "Felix maison Seoul")]}
+        )
+        self.clock.now_value += watcher.interval("felix hot")
+        self.assertEqual(watcher.due_queries(), ["felix hot"])
+        watcher.scan_cycle(watcher.due_queries())
+
+        reports = list(self.reports.glob("dox_report_*.parquet"))
+        self.assertEqual(len(reports), 1)
+        self.assertEqual(sorted(pd.read_parquet(reports[0])["video_id"]), ["hot1", "hot2", "hot3"])
+
+    def test_report_rotates_when_full_or_on_a_new_day(self):
+        watcher = self._watcher()
+        with patch.dict(os.environ, {"WATCH_REPORT_MAX_ROWS": "2"}):
+            watcher.scan_cycle(watcher.due_queries())
+            first = watcher.state["report"]
+            self.server.routes[("felix hot", None)] = (200, {"items": [_stub_video("hot3", "Felix maison Seoul bis")]})
+            self.clock.now_value += watcher.interval("felix hot")
+            watcher.scan_cycle(watcher.due_queries())
+        full = watcher.state["report"]
+        watcher.state["report"] = "dox_report_20000101_0000_watch"
+        watcher._rotate_report()
+
+        self.assertGreater(full, first)  # meme minute: suffixe "_2", toujours apres par nom
+        self.assertEqual(sorted(pd.read_parquet(self.reports / f"{first}.parquet")["video_id"]), ["hot1", "hot2"])
+        # Le nouveau rapport ne relit pas l'ancien
+        self.assertEqual(list(pd.read_parquet(self.reports / f"{full}.parquet")["video_id"]), ["hot3"])
+        self.assertEqual(watcher.state["report_rows"], 0)
+        self.assertTrue(watcher.state["report"].startswith(f"dox_report_{datetime.now():%Y%m%d}_"))
+
+    def test_restart_keeps_schedule_and_republishes_spool(self):
+        watcher = self._watcher()
+        watcher.scan_cycle(watcher.due_queries())
+        watcher.close()
+        spool = next(self.reports.glob("dox_report_*.csv"))
+        # Process tue apres avoir ecrit un hit dans le spool, avant la publication
+        with open(spool, "a", encoding="utf-8") as fh:
+            fh.write("felix hot,default,Late,Late,late1,late1,0.5,,0.5,0.9,CRITICAL,,2026-01-01 00:00:00" + ",0" * 6 + "\n")
+        later = spool.with_suffix(".parquet").stat().st_mtime + 10
+        os.utime(spool, (later, later))
+
+        restarted = self._watcher()
+
+        self.assertEqual(restarted.due_queries(), [])
+        report = find_latest_report(self.reports)
+        self.assertEqual(pd.read_parquet(report)["video_id"].iloc[0], "late1")
+
+    def test_quota_pauses_all_queries(self):
+        self.server.routes[("felix hot", None)] = (403, {"error": "quotaExceeded"})
+        watcher = self._watcher()
+
+        watcher.scan_cycle(watcher.due_queries())
+
+        self.assertEqual(watcher.due_queries(), [])
+        self.assertGreaterEqual(watcher.seconds_until_due(), scan_watch.QUOTA_PAUSE_SECONDS - 1)
+
+    def test_stop_ends_run_and_saves_state(self):
+        watcher = self._watcher()
+
+        def stop_after_first_hit(row, model=None):
+            watcher.stop()
+            return True
+
+        with patch.object(scan, "is_hit", side_effect=stop_after_first_hit):
+            watcher.run()
+
+        self.assertEqual(watcher.cycles, 1)
+        state = json.loads((self.state_dir / "watch.json").read_text(encoding="utf-8"))
+        # Le cycle interrompu ne marque comme scannees que les queries traitees
+        self.assertEqual(len([q for q in state["queries"].values() if q["last_scan"]]), 1)
+
+    def test_stop_mid_cycle_writes_the_query_before_saving_its_mark(self):
+        def video(video_id, day):
+            item = _stub_video(video_id, "Felix maison Seoul")
+            item["snippet"]["publishedAt"] = f"2026-03-0{day}T00:00:00Z"
+            return item
+
+        self.server.routes[("felix hot", None)] = (200, {"items": [video("hot1", 3), video("hot2", 2), video("hot3", 1)]})
+        watcher = self._watcher()
+        real_is_hit = scan.is_hit
+
+        def stop_after_first_hit(row, model=None):
+            watcher.stop()
+            return real_is_hit(row, model)
+
+        with patch.object(scan, "is_hit", side_effect=stop_after_first_hit):
+            watcher.run()
+
+        report = find_latest_report(self.reports)
+        # Les 3 hits de la query sont ecrits avant que son repere ne passe apres eux
+        self.assertEqual(sorted(pd.read_parquet(report)["video_id"]), ["hot1", "hot2", "hot3"])
+        self.assertEqual(scan.load_high_water(), {"felix hot": "2026-03-03T00:00:00Z"})
+
+    def test_idle_loop_sleeps_until_next_due_query(self):
+        watcher = self._watcher()
+
+        watcher.run(max_cycles=2)
+
+        # 2 hits au premier scan: moyenne mobile 1.5 hit/scan
+        self.assertEqual(watcher.cycles, 2)
+        self.assertEqual(self.clock.sleeps, [scan_watch.BASE_INTERVAL_SECONDS / 1.5])
+
+
+if __name__ == "__main__":
+    unittest.main()